@@ -1,7 +1,12 @@
+import asyncio
 import jwt
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple, Union
+import numpy as np
+from auth.voice_index import EmbeddingIndex
+from auth.voiceprint import VoiceprintExtractor
 from config.settings import settings
+from utils.audio import SAMPLE_RATE
 
 class TokenValidator:
     def __init__(self):
@@ -28,22 +33,66 @@ class TokenValidator:
         return jwt.encode(payload, self.secret, algorithm=self.algorithm)
 
 class VoiceBiometric:
-    """Voice fingerprinting for passive authentication"""
+    """
+    Voice fingerprinting for passive authentication
     
-    def __init__(self):
-        self.voice_profiles = {}  # In production, use a database
+    Audio is reduced to a speaker embedding (VoiceprintExtractor) and only
+    that is kept, in the EmbeddingIndex. Feature extraction and 1:N scoring
+    run in the default executor so a large index doesn't stall the loop.
+    """
+    
+    def __init__(self, index: Optional[EmbeddingIndex] = None):
+        self.index = index if index is not None else EmbeddingIndex(settings.VOICE_INDEX_PATH or None)
+        self.threshold = settings.VOICE_MATCH_THRESHOLD
+        self.min_speech_ms = settings.VOICE_MIN_SPEECH_MS
+    
+    def extractor(self, sample_rate: int = SAMPLE_RATE) -> VoiceprintExtractor:
+        """Incremental extractor for audio as it streams in"""
+        return VoiceprintExtractor(sample_rate)
+    
+    def embed(self, audio_data: Union[bytes, np.ndarray], sample_rate: int = SAMPLE_RATE) -> Optional[np.ndarray]:
+        """Embedding of 16-bit mono PCM (None if it holds too little speech)"""
+        extractor = self.extractor(sample_rate)
+        extractor.push(audio_data)
+        return extractor.embedding(self.min_speech_ms)
+    
+    def is_enrolled(self, user_id: str) -> bool:
+        return user_id in self.index
+    
+    def verify_embedding(self, user_id: str, embedding: Optional[np.ndarray]) -> float:
+        """Cosine score against the user's profile, 0.0 when there is nothing to compare"""
+        if embedding is None:
+            return 0.0
+        score = self.index.verify(user_id, embedding)
+        return max(0.0, score) if score is not None else 0.0
     
     async def verify_voice(self, audio_data: bytes, user_id: str) -> float:
         """
         Verify voice against stored profile
-        Returns confidence score (0.0 to 1.0)
+        Returns confidence score (0.0 to 1.0); VOICE_MATCH_THRESHOLD and above is a match
         """
-        # TODO: Implement actual voice biometric verification
-        # Using Azure Speaker Recognition or similar service
-        # For now, return mock confidence
-        return 0.95
-    
-    async def enroll_voice(self, audio_data: bytes, user_id: str):
-        """Enroll a new voice profile"""
-        # TODO: Implement voice enrollment
-        self.voice_profiles[user_id] = audio_data
\ No newline at end of file
+        if not self.is_enrolled(user_id):
+            return 0.0
+        embedding = await asyncio.get_event_loop().run_in_executor(None, self.embed, audio_data)
+        return self.verify_embedding(user_id, embedding)
+    
+    async def identify_voice(self, audio_data: bytes, top_k: int = 1) -> List[Tuple[str, float]]:
+        """Enrolled users closest to the voice, best first, as (user_id, score) at or above the threshold"""
+        def identify():
+            embedding = self.embed(audio_data)
+            return self.index.identify(embedding, top_k) if embedding is not None else []
+        
+        matches = await asyncio.get_event_loop().run_in_executor(None, identify)
+        return [(user_id, score) for user_id, score in matches if score >= self.threshold]
+    
+    async def enroll_voice(self, audio_data: bytes, user_id: str) -> bool:
+        """Enroll (or refine) a voice profile; False if the audio holds too little speech"""
+        def enroll():
+            embedding = self.embed(audio_data)
+            if embedding is None:
+                return False
+            self.index.add(user_id, embedding)
+            self.index.save()
+            return True
+        
+        return await asyncio.get_event_loop().run_in_executor(None, enroll)
\ No newline at end of file
@@ -0,0 +1,248 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import numpy as np
+from auth.voiceprint import EMBEDDING_DIM
+from utils.log import get_logger
+
+logger = get_logger("auth.voice_index")
+
+MATRIX_FILE = "embeddings.f16"
+USERS_FILE = "users.json"
+CHANGES_FILE = "users.{generation}.log"
+
+# A change to the user list: ("add", user_id) enrolls (or re-enrolls), ("remove", user_id)
+Change = Tuple[str, str]
+
+
+class EmbeddingIndex:
+    """
+    Enrolled speaker embeddings in one contiguous float16 matrix
+    
+    Row i belongs to users[i]. With a path the matrix is a memory-mapped
+    file (embeddings.f16, rows x dim float16 with no header) next to
+    users.json (row order, enrollment counts), so a restart maps it back
+    instead of loading it, and the OS pages in only what scoring touches.
+    Without a path it lives in memory. Capacity doubles as users enroll.
+    
+    save() appends the changes since the last save to a log (users.<n>.log,
+    JSON lines) rather than rewriting users.json, so it costs the same at
+    any size. Once the log has more entries than there are users it is
+    folded into a new users.json (generation n + 1), which keeps loading
+    time and the amortized cost per change bounded.
+    
+    Scoring converts blocks of rows to float32 for BLAS, so 1:N identify
+    is a few matrix-vector products however many users are enrolled, and
+    several probes can be scored in one pass. Only embeddings are stored.
+    """
+    
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        dim: int = EMBEDDING_DIM,
+        initial_capacity: int = 1024,
+        block_rows: int = 32768
+    ):
+        self.path = Path(path) if path else None
+        self.dim = dim
+        self.block_rows = block_rows
+        self._lock = threading.Lock()
+        
+        self.users: List[str] = []
+        self.enrollments: List[int] = []
+        self._rows: Dict[str, int] = {}
+        self.matrix = None
+        
+        self.generation = 0
+        self._pending: List[Change] = []  # Not yet in the log
+        self._logged = 0  # Changes in the current log
+        
+        if self.path and (self.path / USERS_FILE).exists():
+            self._load()
+        else:
+            self._allocate(initial_capacity)
+            if self.path:
+                self._fold()  # An empty user list for the log to build on
+    
+    def __len__(self) -> int:
+        return len(self.users)
+    
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._rows
+    
+    @property
+    def capacity(self) -> int:
+        return self.matrix.shape[0]
+    
+    def _allocate(self, capacity: int):
+        """(Re)create the matrix with room for `capacity` rows, keeping existing rows"""
+        old = self.matrix
+        if self.path is None:
+            self.matrix = np.zeros((capacity, self.dim), dtype=np.float16)
+            if old is not None:
+                self.matrix[:len(self)] = old[:len(self)]
+            return
+        
+        self.path.mkdir(parents=True, exist_ok=True)
+        matrix_path = self.path / MATRIX_FILE
+        if old is not None:
+            old.flush()
+        with open(matrix_path, "ab") as f:
+            f.truncate(capacity * self.dim * 2)
+        self.matrix = np.memmap(matrix_path, dtype=np.float16, mode="r+", shape=(capacity, self.dim))
+    
+    def _log_path(self, generation: int) -> Path:
+        return self.path / CHANGES_FILE.format(generation=generation)
+    
+    def _load(self):
+        with open(self.path / USERS_FILE) as f:
+            meta = json.load(f)
+        if meta["dim"] != self.dim:
+            raise ValueError(f"Index at {self.path} has {meta['dim']}-dim embeddings, expected {self.dim}")
+        self.users = meta["users"]
+        self.enrollments = meta["enrollments"]
+        self._rows = {user_id: row for row, user_id in enumerate(self.users)}
+        self.generation = meta.get("generation", 0)
+        
+        torn = False
+        log_path = self._log_path(self.generation)
+        if log_path.exists():
+            with open(log_path) as f:
+                for line in f:
+                    try:
+                        change = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Cut short by a crash mid-save; its rows were flushed, but it never completed
+                        logger.warning("Ignoring a torn entry at the end of %s", log_path)
+                        torn = True
+                        break
+                    self._apply(tuple(change))
+                    self._logged += 1
+        for stale in self.path.glob(CHANGES_FILE.format(generation="*")):
+            if stale != log_path:
+                stale.unlink(missing_ok=True)  # Left by a crash while folding
+        
+        matrix_path = self.path / MATRIX_FILE
+        rows = os.path.getsize(matrix_path) // (self.dim * 2)
+        if rows < len(self.users):
+            raise ValueError(f"Index at {self.path} has {rows} rows for {len(self.users)} users")
+        self.matrix = np.memmap(matrix_path, dtype=np.float16, mode="r+", shape=(rows, self.dim))
+        if torn:
+            self._fold()
+        logger.info("Loaded %d voice profiles from %s", len(self), self.path)
+    
+    def _apply(self, change: Change) -> Optional[int]:
+        """Apply a change to the user list (not the matrix); the row it enrolled or vacated"""
+        op, user_id = change
+        if op == "add":
+            row = self._rows.get(user_id)
+            if row is None:
+                row = len(self.users)
+                self._rows[user_id] = row
+                self.users.append(user_id)
+                self.enrollments.append(0)
+            self.enrollments[row] += 1
+            return row
+        
+        row = self._rows.pop(user_id, None)
+        if row is None:
+            return None
+        last = len(self.users) - 1
+        if row != last:
+            self.users[row] = self.users[last]
+            self.enrollments[row] = self.enrollments[last]
+            self._rows[self.users[row]] = row
+        self.users.pop()
+        self.enrollments.pop()
+        return row
+    
+    def _change(self, change: Change) -> Optional[int]:
+        if self.path is not None:
+            self._pending.append(change)
+        return self._apply(change)
+    
+    def add(self, user_id: str, embedding: np.ndarray):
+        """Enroll an embedding; repeat enrollments are averaged into the user's profile"""
+        embedding = np.asarray(embedding, dtype=np.float32)
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                if len(self) == self.capacity:
+                    self._allocate(self.capacity * 2)
+            else:
+                embedding = self.matrix[row].astype(np.float32) * self.enrollments[row] + embedding
+            row = self._change(("add", user_id))
+            self.matrix[row] = embedding / (np.linalg.norm(embedding) or 1)
+    
+    def remove(self, user_id: str) -> bool:
+        """Drop a user's profile, moving the last row into its place"""
+        with self._lock:
+            if user_id not in self._rows:
+                return False
+            last = len(self) - 1
+            row = self._change(("remove", user_id))
+            if row != last:
+                self.matrix[row] = self.matrix[last]
+            self.matrix[last] = 0
+            return True
+    
+    def save(self):
+        """Write the matrix and the changes since the last save through to disk (no-op in memory)"""
+        if self.path is None:
+            return
+        with self._lock:
+            # Rows first, so the log never names a row that isn't on disk
+            self.matrix.flush()
+            if self._logged + len(self._pending) > len(self.users):
+                self._fold()
+            elif self._pending:
+                with open(self._log_path(self.generation), "a") as f:
+                    f.write("".join(json.dumps(change) + "\n" for change in self._pending))
+                self._logged += len(self._pending)
+            self._pending.clear()
+    
+    def _fold(self):
+        """Write the whole user list as the next generation and drop the old log"""
+        generation = self.generation + 1
+        meta = {"dim": self.dim, "generation": generation, "users": self.users, "enrollments": self.enrollments}
+        temporary = self.path / (USERS_FILE + ".tmp")
+        with open(temporary, "w") as f:
+            json.dump(meta, f)
+        os.replace(temporary, self.path / USERS_FILE)
+        self._log_path(self.generation).unlink(missing_ok=True)
+        self.generation = generation
+        self._logged = 0
+    
+    def get(self, user_id: str) -> Optional[np.ndarray]:
+        row = self._rows.get(user_id)
+        return None if row is None else self.matrix[row].astype(np.float32)
+    
+    def verify(self, user_id: str, embedding: np.ndarray) -> Optional[float]:
+        """Cosine similarity with the user's profile (None if not enrolled)"""
+        profile = self.get(user_id)
+        if profile is None:
+            return None
+        return float(profile @ np.asarray(embedding, dtype=np.float32))
+    
+    def scores(self, probes: np.ndarray) -> np.ndarray:
+        """Cosine similarity of every enrolled user with each probe: (users,) or (users, probes)"""
+        probes = np.asarray(probes, dtype=np.float32)
+        with self._lock:
+            matrix, count = self.matrix, len(self)
+        out = np.empty((count,) + probes.shape[:-1], dtype=np.float32)
+        for start in range(0, count, self.block_rows):
+            block = matrix[start:min(start + self.block_rows, count)].astype(np.float32)
+            out[start:start + len(block)] = block @ probes.T
+        return out
+    
+    def identify(self, embedding: np.ndarray, top_k: int = 1) -> List[Tuple[str, float]]:
+        """The top_k closest enrolled users as (user_id, score), best first"""
+        scores = self.scores(embedding)
+        if not len(scores):
+            return []
+        top_k = min(top_k, len(scores))
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [(self.users[row], float(scores[row])) for row in best]
@@ -0,0 +1,142 @@
+from typing import Optional, Union
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from utils.audio import SAMPLE_RATE
+
+FRAME_MS = 25
+HOP_MS = 10
+N_FFT = 512
+N_MELS = 64
+N_CEPSTRA = 32  # c1..c32; c0 (loudness) says nothing about the speaker
+PRE_EMPHASIS = 0.97
+
+# Mean, spread and rate of change of the cepstra, plus the long-term spectrum in 32 bands
+EMBEDDING_DIM = 4 * N_CEPSTRA
+
+
+def mel_filterbank(sample_rate: int, n_fft: int, n_mels: int, low_hz: float = 50.0, high_hz: float = None) -> np.ndarray:
+    """Triangular filters on the mel scale, shape (n_mels, n_fft // 2 + 1)"""
+    high_hz = high_hz or sample_rate / 2 - 200
+    to_mel = lambda hz: 2595 * np.log10(1 + hz / 700)
+    to_hz = lambda mel: 700 * (10 ** (mel / 2595) - 1)
+    edges = to_hz(np.linspace(to_mel(low_hz), to_mel(high_hz), n_mels + 2))
+    bins = np.fft.rfftfreq(n_fft, 1 / sample_rate)
+    
+    lower, center, upper = edges[:-2, None], edges[1:-1, None], edges[2:, None]
+    rising = (bins - lower) / (center - lower)
+    falling = (upper - bins) / (upper - center)
+    return np.maximum(0, np.minimum(rising, falling)).astype(np.float32)
+
+
+def dct_matrix(n_in: int, n_out: int, first: int = 1) -> np.ndarray:
+    """Orthonormal DCT-II rows first..first + n_out - 1, shape (n_out, n_in)"""
+    k = np.arange(first, first + n_out)[:, None]
+    n = np.arange(n_in)[None, :]
+    return (np.sqrt(2 / n_in) * np.cos(np.pi * k * (2 * n + 1) / (2 * n_in))).astype(np.float32)
+
+
+class VoiceprintExtractor:
+    """
+    Incremental log-mel/MFCC features and a fixed-size speaker embedding
+    
+    PCM is pushed as it streams in; frames that straddle chunks are
+    completed from a small carry-over, so chunking doesn't change the
+    result. Only running sums per dimension are kept (no frames, no audio),
+    and frames quieter than min_energy_db are skipped as non-speech.
+    
+    The embedding concatenates four blocks, each scaled to unit length so
+    they weigh the same: the mean cepstrum (vocal tract shape), its
+    per-coefficient spread, the spread of frame-to-frame differences (how
+    the voice moves) and the long-term average spectrum with its overall
+    level removed. The result is unit length, ready for cosine scoring.
+    """
+    
+    _filters = {}
+    
+    def __init__(self, sample_rate: int = SAMPLE_RATE, min_energy_db: float = -50.0):
+        self.sample_rate = sample_rate
+        self.frame_size = sample_rate * FRAME_MS // 1000
+        self.hop = sample_rate * HOP_MS // 1000
+        self.min_energy = (10 ** (min_energy_db / 10)) * self.frame_size
+        
+        if sample_rate not in self._filters:
+            self._filters[sample_rate] = (
+                np.hamming(self.frame_size).astype(np.float32),
+                mel_filterbank(sample_rate, N_FFT, N_MELS),
+                dct_matrix(N_MELS, N_CEPSTRA)
+            )
+        self.window, self.mel, self.dct = self._filters[sample_rate]
+        
+        self._carry = np.zeros(0, dtype=np.float32)
+        self._last_sample = 0.0
+        self._previous: Optional[np.ndarray] = None  # Last voiced frame's cepstra, for differences
+        
+        self.frames = 0
+        self.voiced_frames = 0
+        self._sum = np.zeros(N_CEPSTRA, dtype=np.float64)
+        self._sum_squares = np.zeros(N_CEPSTRA, dtype=np.float64)
+        self._delta_squares = np.zeros(N_CEPSTRA, dtype=np.float64)
+        self._deltas = 0
+        self._spectrum = np.zeros(N_MELS, dtype=np.float64)
+    
+    @property
+    def voiced_ms(self) -> int:
+        return self.voiced_frames * HOP_MS
+    
+    def push(self, pcm: Union[bytes, memoryview, np.ndarray]):
+        """Add 16-bit mono PCM at sample_rate"""
+        samples = np.frombuffer(pcm, dtype=np.int16) if not isinstance(pcm, np.ndarray) else pcm
+        if not len(samples):
+            return
+        samples = samples.astype(np.float32) / 32768
+        
+        # Pre-emphasis, continued across chunks
+        emphasized = np.empty_like(samples)
+        emphasized[0] = samples[0] - PRE_EMPHASIS * self._last_sample
+        emphasized[1:] = samples[1:] - PRE_EMPHASIS * samples[:-1]
+        self._last_sample = float(samples[-1])
+        
+        buffer = np.concatenate([self._carry, emphasized]) if len(self._carry) else emphasized
+        if len(buffer) < self.frame_size:
+            self._carry = buffer
+            return
+        frames = sliding_window_view(buffer, self.frame_size)[::self.hop]
+        self._carry = buffer[len(frames) * self.hop:].copy()
+        self._add_frames(frames)
+    
+    def _add_frames(self, frames: np.ndarray):
+        self.frames += len(frames)
+        energy = np.einsum("ij,ij->i", frames, frames)
+        frames = frames[energy >= self.min_energy]
+        if not len(frames):
+            return
+        
+        power = np.abs(np.fft.rfft(frames * self.window, N_FFT)) ** 2
+        log_mel = np.log(power @ self.mel.T + 1e-10)
+        cepstra = log_mel @ self.dct.T
+        
+        self.voiced_frames += len(cepstra)
+        self._sum += cepstra.sum(axis=0)
+        self._sum_squares += (cepstra.astype(np.float64) ** 2).sum(axis=0)
+        self._spectrum += log_mel.sum(axis=0)
+        
+        chain = cepstra if self._previous is None else np.vstack([self._previous, cepstra])
+        deltas = np.diff(chain, axis=0)
+        self._delta_squares += (deltas.astype(np.float64) ** 2).sum(axis=0)
+        self._deltas += len(deltas)
+        self._previous = cepstra[-1:]
+    
+    def embedding(self, min_voiced_ms: int = 500) -> Optional[np.ndarray]:
+        """Unit-length float32 embedding of everything pushed so far (None if too little speech)"""
+        if self.voiced_ms < max(min_voiced_ms, 2 * HOP_MS):
+            return None
+        n = self.voiced_frames
+        mean = self._sum / n
+        spread = np.sqrt(np.maximum(self._sum_squares / n - mean ** 2, 0))
+        movement = np.sqrt(self._delta_squares / max(1, self._deltas))
+        spectrum = self._spectrum / n
+        spectrum = (spectrum - spectrum.mean()).reshape(N_CEPSTRA, -1).mean(axis=1)
+        
+        blocks = [mean, spread - spread.mean(), movement - movement.mean(), spectrum]
+        vector = np.concatenate([block / (np.linalg.norm(block) or 1) for block in blocks])
+        return (vector / np.linalg.norm(vector)).astype(np.float32)
@@ -0,0 +1,127 @@
+"""
+Benchmark the client-link audio codecs
+Encode/decode throughput, audio quality and bytes on the wire per codec
+
+The test signal is synthetic speech-like audio (a gliding harmonic voice
+with a syllable-rate envelope, pauses and background noise), so results
+are deterministic and need no recordings. It is encoded two ways: in
+streamed TTS chunks (--chunk-ms) and as whole sentences, which is how
+cache hits are encoded.
+
+Run from backend/:
+    python bench_codecs.py --seconds 30
+"""
+import argparse
+import json
+import time
+from typing import Callable, Dict, List
+import numpy as np
+from utils.audio import CODECS, CODEC_PCM16, SAMPLE_RATE, create_codec
+from websocket.protocol import HEADER_SIZE
+
+
+def speech_like(seconds: float, seed: int = 7) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 12))
+    syllables = np.clip(np.sin(2 * np.pi * 4 * t), 0, None) ** 0.5
+    pauses = (np.sin(2 * np.pi * 0.25 * t) > -0.6).astype(float)
+    audio = voice * syllables * pauses * 6000 + rng.normal(0, 150, len(t))
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+
+def split(pcm: bytes, chunk_ms: int) -> List[bytes]:
+    step = SAMPLE_RATE * chunk_ms // 1000 * 2
+    return [pcm[offset:offset + step] for offset in range(0, len(pcm), step)]
+
+
+def best_time(run: Callable[[], object], repeat: int) -> float:
+    """Best wall time of `repeat` runs, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def snr_db(reference: np.ndarray, decoded: np.ndarray) -> float:
+    decoded = decoded[:len(reference)].astype(np.float64)
+    noise = np.mean((reference.astype(np.float64) - decoded) ** 2)
+    if noise == 0:
+        return float("inf")
+    return 10 * np.log10(np.mean(reference.astype(np.float64) ** 2) / noise)
+
+
+def bench_codec(name: str, pcm: bytes, chunks: List[bytes], repeat: int) -> Dict:
+    seconds = len(pcm) / 2 / SAMPLE_RATE
+    codec = create_codec(name)
+    
+    encoded_chunks = [codec.encode(chunk) for chunk in chunks] + [codec.flush()]
+    encoded_chunks = [chunk for chunk in encoded_chunks if chunk]
+    encoded_whole = codec.encode(pcm) + codec.flush()
+    
+    decoder = create_codec(name)
+    decoded = b"".join(decoder.decode(chunk) for chunk in encoded_chunks)
+    
+    # Stateful codecs (Opus) keep per-stream state, so time fresh instances
+    encode_chunks = best_time(lambda: [create_codec(name).encode(chunk) for chunk in chunks], repeat)
+    encode_whole = best_time(lambda: create_codec(name).encode(pcm), repeat)
+    decode_chunks = best_time(lambda: [create_codec(name).decode(chunk) for chunk in encoded_chunks], repeat)
+    
+    payload = sum(len(chunk) for chunk in encoded_chunks)
+    binary = payload + HEADER_SIZE * len(encoded_chunks)
+    as_json = sum(
+        len(json.dumps({"type": "audio", "codec": name, "data": list(chunk)}))
+        for chunk in encoded_chunks
+    )
+    return {
+        "encode_chunks_x": seconds / encode_chunks,
+        "encode_whole_x": seconds / encode_whole,
+        "decode_x": seconds / decode_chunks,
+        "encode_us_per_chunk": encode_chunks / len(chunks) * 1e6,
+        "snr_db": snr_db(np.frombuffer(pcm, dtype=np.int16), np.frombuffer(decoded, dtype=np.int16)),
+        "kbit_s": payload * 8 / seconds / 1000,
+        "binary_kb": binary / 1024,
+        "json_kb": as_json / 1024,
+        "whole_kb": len(encoded_whole) / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=30.0, help="Length of the test signal")
+    parser.add_argument("--chunk-ms", type=int, default=100, help="Size of streamed TTS chunks")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs per measurement (best is kept)")
+    args = parser.parse_args()
+    
+    pcm = speech_like(args.seconds).tobytes()
+    chunks = split(pcm, args.chunk_ms)
+    results = {name: bench_codec(name, pcm, chunks, args.repeat) for name in CODECS}
+    reference = results[CODEC_PCM16]
+    
+    print("=" * 100)
+    print(f"Audio Codec Benchmark ({args.seconds:.0f}s of speech-like audio, {args.chunk_ms} ms chunks)")
+    print("=" * 100)
+    print(
+        f"{'codec':<10} {'enc x RT':>9} {'enc us/chk':>10} {'whole x RT':>10} {'dec x RT':>9} {'SNR dB':>7} "
+        f"{'kbit/s':>7} {'binary KB':>10} {'JSON KB':>9} {'vs JSON PCM':>11}"
+    )
+    print("-" * 100)
+    for name, r in results.items():
+        print(
+            f"{name:<10} {r['encode_chunks_x']:>9.0f} {r['encode_us_per_chunk']:>10.1f} {r['encode_whole_x']:>10.0f} "
+            f"{r['decode_x']:>9.0f} {r['snr_db']:>7.1f} {r['kbit_s']:>7.1f} {r['binary_kb']:>10.1f} "
+            f"{r['json_kb']:>9.1f} {reference['json_kb'] / r['binary_kb']:>10.1f}x"
+        )
+    print()
+    print("x RT: seconds of audio processed per second of CPU (one core)")
+    print("enc: streamed chunks as TTS produces them; whole: one sentence at a time, as on a cache hit")
+    print("binary/JSON KB: total size of the audio messages in each protocol (binary includes frame headers)")
+    print("vs JSON PCM: how much smaller than the legacy JSON protocol with raw PCM")
+
+
+if __name__ == "__main__":
+    main()
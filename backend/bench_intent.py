@@ -0,0 +1,143 @@
+"""
+Benchmark local intent classification against LLM-only extraction
+Accuracy, LLM fallback rate and latency of IntentClassifier/IntentResolver
+
+Trains on llm/intents.jsonl and scores the held-out utterances in
+bench_data/intent_eval.jsonl. Those labelled "unknown" are out of scope
+for the local model: the right outcome for them is a fallback to the LLM.
+The LLM itself isn't called; --llm-ms is its assumed round trip (the
+gpt-3.5-turbo call every turn used to make), used to estimate the mean
+intent latency at each threshold.
+
+Run from backend/:
+    python bench_intent.py --llm-ms 400
+"""
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+import numpy as np
+from config.settings import settings
+from llm.intent import TRAINING_PATH, IntentClassifier, IntentResolver
+
+EVAL_PATH = Path(__file__).parent / "bench_data" / "intent_eval.jsonl"
+
+THRESHOLDS = [0.0, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8]
+
+
+def load(path: Path) -> List[Tuple[str, str]]:
+    with open(path) as f:
+        return [(record["text"], record["intent"]) for record in map(json.loads, f)]
+
+
+def percentiles_us(samples: List[float]) -> Tuple[float, float]:
+    p50, p99 = np.percentile(np.asarray(samples) * 1e6, [50, 99])
+    return float(p50), float(p99)
+
+
+def time_calls(run, texts: List[str], repeat: int) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            run(text)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def score(results: List[Tuple[Dict, str]], threshold: float, llm_ms: float) -> Dict:
+    in_scope = [(result, label) for result, label in results if label != "unknown"]
+    accepted = [(result, label) for result, label in in_scope if result["confidence"] >= threshold]
+    out_of_scope = [result for result, label in results if label == "unknown"]
+    fallbacks = sum(1 for result, _ in results if result["confidence"] < threshold)
+    return {
+        "coverage": len(accepted) / len(in_scope),
+        "precision": sum(result["intent"] == label for result, label in accepted) / max(1, len(accepted)),
+        "out_of_scope_kept": sum(1 for result in out_of_scope if result["confidence"] >= threshold),
+        "out_of_scope": len(out_of_scope),
+        "llm_share": fallbacks / len(results),
+        "mean_ms": fallbacks / len(results) * llm_ms
+    }
+
+
+async def memo_hit_us(classifier: IntentClassifier, texts: List[str], repeat: int) -> List[float]:
+    async def never_called(_text):
+        raise AssertionError("memo miss")
+    
+    resolver = IntentResolver(classifier, threshold=0.0, max_entries=len(texts))
+    for text in texts:
+        await resolver.resolve(text, never_called)
+    samples = []
+    for _ in range(repeat):
+        for text in texts:
+            start = time.perf_counter()
+            await resolver.resolve(text, never_called)
+            samples.append(time.perf_counter() - start)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--train", type=Path, default=TRAINING_PATH, help="Labeled training utterances")
+    parser.add_argument("--eval", type=Path, default=EVAL_PATH, help="Labeled held-out utterances")
+    parser.add_argument("--llm-ms", type=float, default=400.0, help="Assumed LLM intent round trip")
+    parser.add_argument("--repeat", type=int, default=50, help="Timing passes over the eval set")
+    parser.add_argument("--errors", action="store_true", help="List misclassified utterances at the configured threshold")
+    args = parser.parse_args()
+    
+    examples = load(args.train)
+    evaluation = load(args.eval)
+    texts = [text for text, _ in evaluation]
+    
+    start = time.perf_counter()
+    classifier = IntentClassifier(examples)
+    train_ms = (time.perf_counter() - start) * 1000
+    results = [(classifier.classify(text), label) for text, label in evaluation]
+    
+    rules = [text for text, (result, _) in zip(texts, results) if result["source"] == "rules"]
+    model = [text for text, (result, _) in zip(texts, results) if result["source"] == "local"]
+    
+    print("=" * 84)
+    print(
+        f"Intent Benchmark ({len(examples)} training utterances, {len(classifier.labels)} intents, "
+        f"{len(evaluation)} eval utterances, trained in {train_ms:.0f} ms)"
+    )
+    print("=" * 84)
+    print(f"{'threshold':>9} {'coverage':>9} {'precision':>10} {'out-of-scope kept':>18} {'LLM calls':>10} {'mean ms':>8}")
+    print("-" * 84)
+    for threshold in sorted(set(THRESHOLDS + [settings.INTENT_LOCAL_THRESHOLD])):
+        s = score(results, threshold, args.llm_ms)
+        marker = " <- INTENT_LOCAL_THRESHOLD" if threshold == settings.INTENT_LOCAL_THRESHOLD else ""
+        print(
+            f"{threshold:>9.2f} {s['coverage']:>9.0%} {s['precision']:>10.1%} "
+            f"{s['out_of_scope_kept']:>10}/{s['out_of_scope']:<7} {s['llm_share']:>10.0%} {s['mean_ms']:>8.0f}{marker}"
+        )
+    print(f"{'LLM only':>9} {'':>9} {'':>10} {'':>18} {1:>10.0%} {args.llm_ms:>8.0f}")
+    print()
+    
+    print(f"{'path':<22} {'p50 us':>8} {'p99 us':>8}")
+    print("-" * 40)
+    for name, samples in [
+        ("rules", time_calls(classifier.classify, rules, args.repeat)),
+        ("model", time_calls(classifier.classify, model, args.repeat)),
+        ("memo hit (resolver)", asyncio.run(memo_hit_us(classifier, texts, args.repeat)))
+    ]:
+        p50, p99 = percentiles_us(samples)
+        print(f"{name:<22} {p50:>8.1f} {p99:>8.1f}")
+    print()
+    print("coverage: in-scope utterances answered locally; precision: how many of those are right")
+    print("out-of-scope kept: utterances no local intent fits that were not passed to the LLM (lower is better)")
+    print("mean ms: expected intent latency per turn when every fallback costs --llm-ms")
+    
+    if args.errors:
+        print()
+        for text, (result, label) in zip(texts, results):
+            accepted = result["confidence"] >= settings.INTENT_LOCAL_THRESHOLD
+            if accepted and result["intent"] != label:
+                print(f"  {text!r}: {result['intent']} ({result['confidence']:.2f}), expected {label}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+"""
+Benchmark sample rate conversion
+Compares StreamingResampler with the previous linear-interpolation AudioProcessor.resample
+
+For each conversion it reports throughput on a whole buffer and on
+browser-sized chunks, passband accuracy (SNR of a multi-tone signal against
+the exact tones at the output rate), how much of the content the output
+rate can't represent leaks back in as aliases or images, and the error at
+chunk boundaries (chunked output against whole-buffer output).
+
+Test signals are synthetic tones, so results are deterministic.
+
+Run from backend/:
+    python bench_resampler.py --seconds 10
+"""
+import argparse
+import time
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+from utils.audio import StreamingResampler
+
+CONVERSIONS = [(48000, 16000), (44100, 16000), (16000, 48000), (16000, 44100), (16000, 24000)]
+
+# The browser's 4096-sample ScriptProcessor buffer at 48 kHz
+CHUNK_SECONDS = 4096 / 48000
+
+
+def legacy_resample(audio: np.ndarray, orig_rate: int, target_rate: int) -> np.ndarray:
+    """The AudioProcessor.resample StreamingResampler replaced"""
+    if orig_rate == target_rate:
+        return audio
+    
+    duration = len(audio) / orig_rate
+    target_length = int(duration * target_rate)
+    
+    indices = np.linspace(0, len(audio) - 1, target_length)
+    return np.interp(indices, np.arange(len(audio)), audio)
+
+
+def streaming_resample(chunks: List[np.ndarray], orig_rate: int, target_rate: int) -> np.ndarray:
+    resampler = StreamingResampler(orig_rate, target_rate, align=True)
+    out = [resampler.process(chunk) for chunk in chunks]
+    out.append(resampler.flush(np.float32))
+    return np.concatenate(out)
+
+
+def tones(frequencies: List[float], seconds: float, rate: int) -> np.ndarray:
+    t = np.arange(int(seconds * rate)) / rate
+    return sum(np.sin(2 * np.pi * f * t + f) for f in frequencies) / len(frequencies) * 0.5
+
+
+def split(audio: np.ndarray, rate: int) -> List[np.ndarray]:
+    step = int(rate * CHUNK_SECONDS)
+    return [audio[offset:offset + step] for offset in range(0, len(audio), step)]
+
+
+def best_time(run: Callable[[], object], repeat: int) -> float:
+    """Best wall time of `repeat` runs, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def snr_db(reference: np.ndarray, output: np.ndarray, margin: int) -> float:
+    """SNR away from the ends, where both resamplers see zeros past the signal"""
+    length = min(len(reference), len(output))
+    reference, output = reference[margin:length - margin], output[margin:length - margin]
+    noise = np.mean((reference - output) ** 2)
+    if noise == 0:
+        return float("inf")
+    return 10 * np.log10(np.mean(reference ** 2) / noise)
+
+
+def band_power_db(audio: np.ndarray, rate: int, low: float, high: float) -> float:
+    """Power between low and high Hz relative to the signal's total power"""
+    spectrum = np.abs(np.fft.rfft(audio * np.hanning(len(audio)))) ** 2
+    frequencies = np.fft.rfftfreq(len(audio), 1 / rate)
+    band = spectrum[(frequencies >= low) & (frequencies < high)].sum()
+    return 10 * np.log10(band / spectrum.sum() + 1e-20)
+
+
+def leak_db(convert: Callable[[np.ndarray, int, int], np.ndarray], orig_rate: int, target_rate: int, seconds: float) -> float:
+    """
+    Downsampling: output power of tones above the target Nyquist frequency
+    (ideally removed) relative to their input power. Upsampling: output power
+    above the input Nyquist frequency (images of the passband) relative to
+    the output's total.
+    """
+    if target_rate < orig_rate:
+        nyquist = target_rate / 2
+        frequencies = list(np.linspace(nyquist * 1.1, orig_rate / 2 * 0.95, 6))
+        audio = tones(frequencies, seconds, orig_rate)
+        out = convert(audio, orig_rate, target_rate)
+        return 10 * np.log10(np.mean(out ** 2) / np.mean(audio ** 2) + 1e-20)
+    
+    audio = tones([440, 1800, 4100, 6900], seconds, orig_rate)
+    out = convert(audio, orig_rate, target_rate)
+    return band_power_db(out, target_rate, orig_rate / 2, target_rate / 2)
+
+
+def bench_conversion(orig_rate: int, target_rate: int, seconds: float, repeat: int) -> Dict[str, Dict]:
+    passband = [200, 700, 1500, 2900, min(orig_rate, target_rate) * 0.4]
+    audio = tones(passband, seconds, orig_rate)
+    chunks = split(audio, orig_rate)
+    expected = tones(passband, seconds, target_rate)
+    margin = target_rate // 100
+    
+    implementations: Dict[str, Tuple[Callable, Callable]] = {
+        "linear": (
+            lambda x, a, b: legacy_resample(x, a, b),
+            lambda parts, a, b: np.concatenate([legacy_resample(part, a, b) for part in parts])
+        ),
+        "polyphase": (
+            lambda x, a, b: streaming_resample([x], a, b),
+            streaming_resample
+        )
+    }
+    
+    results = {}
+    for name, (whole, chunked) in implementations.items():
+        whole_out = whole(audio, orig_rate, target_rate)
+        chunked_out = chunked(chunks, orig_rate, target_rate)
+        results[name] = {
+            "whole_x": seconds / best_time(lambda: whole(audio, orig_rate, target_rate), repeat),
+            "chunked_x": seconds / best_time(lambda: chunked(chunks, orig_rate, target_rate), repeat),
+            "snr_db": snr_db(expected, chunked_out, margin),
+            "leak_db": leak_db(whole, orig_rate, target_rate, min(seconds, 2.0)),
+            "seam_db": snr_db(whole_out, chunked_out, margin),
+            "samples": len(chunked_out),
+            "expected_samples": len(expected)
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0, help="Length of the test signal")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing runs per measurement (best is kept)")
+    args = parser.parse_args()
+    
+    print("=" * 96)
+    print(f"Resampler Benchmark ({args.seconds:.0f}s of audio, {CHUNK_SECONDS * 1000:.0f} ms chunks)")
+    print("=" * 96)
+    print(
+        f"{'conversion':<15} {'resampler':<10} {'whole x RT':>10} {'chunk x RT':>10} {'SNR dB':>7} "
+        f"{'alias dB':>9} {'seam SNR':>9} {'samples':>12}"
+    )
+    print("-" * 96)
+    for orig_rate, target_rate in CONVERSIONS:
+        results = bench_conversion(orig_rate, target_rate, args.seconds, args.repeat)
+        for name, r in results.items():
+            print(
+                f"{f'{orig_rate}->{target_rate}':<15} {name:<10} {r['whole_x']:>10.0f} {r['chunked_x']:>10.0f} "
+                f"{r['snr_db']:>7.1f} {r['leak_db']:>9.1f} {r['seam_db']:>9.1f} "
+                f"{r['samples'] - r['expected_samples']:>+12d}"
+            )
+    print()
+    print("x RT: seconds of audio converted per second of CPU (one core)")
+    print("SNR: chunked output against the exact tones at the output rate (higher is better)")
+    print("alias: leaked power above the lower rate's Nyquist frequency (lower is better)")
+    print("seam SNR: chunked against whole-buffer output; inf means chunking changes nothing")
+    print("samples: output length against duration * output rate")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+"""
+Benchmark LLM-to-TTS text segmentation on recorded token streams
+Compares TextSegmenter with the previous "flush when a chunk contains .!?" splitter
+
+Replays bench_data/token_streams.jsonl (token text plus inter-token delay)
+on a virtual clock, so results are deterministic and need no API key.
+
+Record more streams from the live model with:
+    python bench_segmenter.py --record "What's the weather like in Paris?"
+"""
+import argparse
+import asyncio
+import json
+import time
+from pathlib import Path
+from statistics import mean
+from typing import Dict, List, Tuple
+from speech.segmenter import TextSegmenter, ABBREVIATIONS, TITLE_ABBREVIATIONS
+
+STREAMS_PATH = Path(__file__).parent / "bench_data" / "token_streams.jsonl"
+
+# (arrival time in seconds, token text)
+Stream = List[Tuple[float, str]]
+
+
+def load_streams(path: Path) -> Dict[str, Stream]:
+    streams = {}
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            clock = 0.0
+            tokens = []
+            for delay_ms, text in record["tokens"]:
+                clock += delay_ms / 1000
+                tokens.append((clock, text))
+            streams[record["name"]] = tokens
+    return streams
+
+
+def legacy_segments(stream: Stream) -> List[Tuple[float, str]]:
+    """The splitter TextSegmenter replaced"""
+    segments = []
+    buffer = ""
+    for at, chunk in stream:
+        buffer += chunk
+        if any(p in chunk for p in [".", "!", "?", "\n"]):
+            if buffer.strip():
+                segments.append((at, buffer))
+            buffer = ""
+    if buffer.strip():
+        segments.append((stream[-1][0], buffer))
+    return segments
+
+
+def segmenter_segments(stream: Stream, **options) -> List[Tuple[float, str]]:
+    segmenter = TextSegmenter(**options)
+    segments = []
+    for at, chunk in stream:
+        # Fire the first-segment timeout if it falls before this token arrives
+        deadline = segmenter.timeout_at()
+        if deadline is not None and deadline < at:
+            segments += [(deadline, s) for s in segmenter.poll(deadline)]
+        segments += [(at, s) for s in segmenter.feed(chunk, at)]
+    segments += [(stream[-1][0], s) for s in segmenter.flush()]
+    return segments
+
+
+def bad_splits(segments: List[Tuple[float, str]]) -> int:
+    """Splits after an abbreviation or inside a number ("Dr." | "Smith", "3." | "5")"""
+    count = 0
+    for (_, text), (_, following) in zip(segments, segments[1:]):
+        text, following = text.rstrip(), following.lstrip()
+        last_word = text.split()[-1].rstrip(".").lower() if text.split() else ""
+        if text.endswith(".") and (
+            last_word in TITLE_ABBREVIATIONS
+            or (last_word in ABBREVIATIONS and following[:1].islower())
+            or (last_word[-1:].isdigit() and following[:1].isdigit())
+        ):
+            count += 1
+    return count
+
+
+def summarize(segments: List[Tuple[float, str]]) -> Dict:
+    return {
+        "first_ms": segments[0][0] * 1000,
+        "first_words": len(segments[0][1].split()),
+        "segments": len(segments),
+        "mean_chars": mean(len(text.strip()) for _, text in segments),
+        "bad_splits": bad_splits(segments)
+    }
+
+
+async def record(prompt: str, name: str):
+    """Append a live token stream from the configured OpenAI model"""
+    from llm.openai_client import LLMClient
+    
+    llm = LLMClient(cache=None)
+    tokens = []
+    last = time.monotonic()
+    async for chunk in llm.generate_response(prompt):
+        now = time.monotonic()
+        tokens.append([round((now - last) * 1000), chunk])
+        last = now
+    
+    with open(STREAMS_PATH, "a") as f:
+        f.write(json.dumps({"name": name, "tokens": tokens}) + "\n")
+    print(f"Recorded {len(tokens)} tokens as '{name}'")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", metavar="PROMPT", help="Record a live token stream instead of benchmarking")
+    parser.add_argument("--name", default="recorded", help="Name for the recorded stream")
+    parser.add_argument("--streams", type=Path, default=STREAMS_PATH)
+    args = parser.parse_args()
+    
+    if args.record:
+        asyncio.run(record(args.record, args.name))
+        return
+    
+    streams = load_streams(args.streams)
+    
+    print("=" * 78)
+    print("Text Segmentation Benchmark")
+    print("=" * 78)
+    print(f"{'stream':<12} {'splitter':<10} {'first ms':>9} {'1st words':>9} {'segments':>9} {'avg chars':>10} {'bad':>5}")
+    print("-" * 78)
+    
+    totals = {"legacy": [], "segmenter": []}
+    for name, stream in streams.items():
+        for label, segments in (("legacy", legacy_segments(stream)), ("segmenter", segmenter_segments(stream))):
+            summary = summarize(segments)
+            totals[label].append(summary)
+            print(
+                f"{name:<12} {label:<10} {summary['first_ms']:>9.0f} {summary['first_words']:>9} "
+                f"{summary['segments']:>9} {summary['mean_chars']:>10.1f} {summary['bad_splits']:>5}"
+            )
+    
+    print("-" * 78)
+    for label, summaries in totals.items():
+        print(
+            f"{'ALL':<12} {label:<10} {mean(s['first_ms'] for s in summaries):>9.0f} "
+            f"{mean(s['first_words'] for s in summaries):>9.1f} {sum(s['segments'] for s in summaries):>9} "
+            f"{mean(s['mean_chars'] for s in summaries):>10.1f} {sum(s['bad_splits'] for s in summaries):>5}"
+        )
+    print()
+    print("first ms: time from request until the first segment is handed to TTS")
+    print("segments: TTS requests; bad: splits after an abbreviation or inside a number")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,15 +18,192 @@ class Settings:
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
     
+    # Intent extraction: "blocking" (before the response, the default), "concurrent" (alongside
+    # it) or "deferred" (after it). Non-blocking results are used as context on the next turn.
+    INTENT_MODE: str = os.getenv("INTENT_MODE", "blocking")
+    
+    # Intents are classified in-process (rules, then a model trained from INTENT_TRAINING_FILE,
+    # by default llm/intents.jsonl); the LLM is asked only below INTENT_LOCAL_THRESHOLD confidence.
+    # Results are memoized for up to INTENT_CACHE_SIZE distinct utterances.
+    INTENT_LOCAL_ENABLED: bool = os.getenv("INTENT_LOCAL_ENABLED", "true").lower() == "true"
+    INTENT_LOCAL_THRESHOLD: float = float(os.getenv("INTENT_LOCAL_THRESHOLD", "0.5"))
+    INTENT_TRAINING_FILE: str = os.getenv("INTENT_TRAINING_FILE", "")
+    INTENT_CACHE_SIZE: int = int(os.getenv("INTENT_CACHE_SIZE", "5000"))
+    
+    # LLM response cache (opt-in): "memory" or "redis" backend, entry TTL in seconds,
+    # max entries for the memory backend, and the context fields that are part of the key
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "false").lower() == "true"
+    LLM_CACHE_BACKEND: str = os.getenv("LLM_CACHE_BACKEND", "memory")
+    LLM_CACHE_TTL: int = int(os.getenv("LLM_CACHE_TTL", "3600"))
+    LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+    LLM_CACHE_CONTEXT_KEYS: str = os.getenv("LLM_CACHE_CONTEXT_KEYS", "intent.intent,name")
+    
+    # Conversation memory (opt-in): estimated token budget for earlier turns sent with each
+    # request (older ones are summarized in the background, with extra LLM calls), and the
+    # summary's max length in tokens. With memory on, the response cache only serves a
+    # conversation's first turn, since a cached answer can't account for the history.
+    LLM_MEMORY_ENABLED: bool = os.getenv("LLM_MEMORY_ENABLED", "false").lower() == "true"
+    LLM_MEMORY_MAX_TOKENS: int = int(os.getenv("LLM_MEMORY_MAX_TOKENS", "1500"))
+    LLM_MEMORY_SUMMARY_TOKENS: int = int(os.getenv("LLM_MEMORY_SUMMARY_TOKENS", "150"))
+    
+    # LLM request policy: with hedging on (opt-in, as it pays for a duplicate request on about
+    # 100 - LLM_HEDGE_PERCENTILE % of turns), if no token has arrived after the LLM_HEDGE_PERCENTILE
+    # of recent first-token latencies (clamped to LLM_HEDGE_MIN_MS..LLM_HEDGE_MAX_MS;
+    # LLM_HEDGE_DELAY_MS until there are enough), a duplicate request is sent and the first to
+    # stream wins. Transient failures are retried up to LLM_MAX_RETRIES times with jittered
+    # exponential backoff from LLM_RETRY_BACKOFF_MS. The first token is due within
+    # LLM_FIRST_TOKEN_TIMEOUT_MS (or the turn's budget, if sooner), and a stream silent for
+    # LLM_STALL_TIMEOUT_MS is ended.
+    LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_PERCENTILE: float = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    LLM_HEDGE_DELAY_MS: int = int(os.getenv("LLM_HEDGE_DELAY_MS", "1500"))
+    LLM_HEDGE_MIN_MS: int = int(os.getenv("LLM_HEDGE_MIN_MS", "300"))
+    LLM_HEDGE_MAX_MS: int = int(os.getenv("LLM_HEDGE_MAX_MS", "3000"))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", "2"))
+    LLM_RETRY_BACKOFF_MS: int = int(os.getenv("LLM_RETRY_BACKOFF_MS", "200"))
+    LLM_FIRST_TOKEN_TIMEOUT_MS: int = int(os.getenv("LLM_FIRST_TOKEN_TIMEOUT_MS", "5000"))
+    LLM_STALL_TIMEOUT_MS: int = int(os.getenv("LLM_STALL_TIMEOUT_MS", "5000"))
+    
+    # Voice biometrics: embedding index directory (empty = in memory only), cosine score that
+    # counts as a match, and the least speech an embedding is made from. Passive verification
+    # scores an enrolled user's first VOICE_VERIFY_SPEECH_MS of speech against their profile.
+    # At 0.94 about 5% of impostors are accepted (bench_voiceprint.py), so a match is a hint,
+    # not authentication.
+    VOICE_INDEX_PATH: str = os.getenv("VOICE_INDEX_PATH", "")
+    VOICE_MATCH_THRESHOLD: float = float(os.getenv("VOICE_MATCH_THRESHOLD", "0.94"))
+    VOICE_MIN_SPEECH_MS: int = int(os.getenv("VOICE_MIN_SPEECH_MS", "1000"))
+    VOICE_VERIFY_ENABLED: bool = os.getenv("VOICE_VERIFY_ENABLED", "false").lower() == "true"
+    VOICE_VERIFY_SPEECH_MS: int = int(os.getenv("VOICE_VERIFY_SPEECH_MS", "3000"))
+    
+    # Barge-in (opt-in): interrupt the current response on the user's next final transcript
+    # instead of ignoring it, or already on a partial of BARGE_IN_MIN_WORDS with BARGE_IN_ON_PARTIAL
+    BARGE_IN_ENABLED: bool = os.getenv("BARGE_IN_ENABLED", "false").lower() == "true"
+    BARGE_IN_ON_PARTIAL: bool = os.getenv("BARGE_IN_ON_PARTIAL", "false").lower() == "true"
+    BARGE_IN_MIN_WORDS: int = int(os.getenv("BARGE_IN_MIN_WORDS", "2"))  # Partial length that counts as speech
+    
+    # Voice activity detection in front of STT (opt-in)
+    # Mode: "off" (events only, audio untouched), "gate" (drop silence) or "compress" (forward
+    # 1 in N silent frames); gate and compress change what the recognizer hears and so its endpointing
+    VAD_ENABLED: bool = os.getenv("VAD_ENABLED", "false").lower() == "true"
+    VAD_MODE: str = os.getenv("VAD_MODE", "off")
+    VAD_FRAME_MS: int = int(os.getenv("VAD_FRAME_MS", "20"))
+    VAD_THRESHOLD_DB: float = float(os.getenv("VAD_THRESHOLD_DB", "10"))  # Above noise floor
+    VAD_MIN_ENERGY_DB: float = float(os.getenv("VAD_MIN_ENERGY_DB", "-55"))  # Absolute dBFS
+    VAD_ONSET_MS: int = int(os.getenv("VAD_ONSET_MS", "60"))
+    VAD_HANGOVER_MS: int = int(os.getenv("VAD_HANGOVER_MS", "400"))
+    VAD_PREROLL_MS: int = int(os.getenv("VAD_PREROLL_MS", "300"))
+    VAD_TAIL_MS: int = int(os.getenv("VAD_TAIL_MS", "800"))  # Silence forwarded so STT can endpoint
+    VAD_NOISE_ADAPT_RATE: float = float(os.getenv("VAD_NOISE_ADAPT_RATE", "0.05"))
+    VAD_COMPRESS_RATIO: int = int(os.getenv("VAD_COMPRESS_RATIO", "8"))
+    
+    # Speech-to-Text input: audio goes to the recognizer in batches of at least STT_FRAME_MS
+    # from a per-session ring buffer of STT_BUFFER_MS (the oldest audio is dropped
+    # when it overruns, e.g. while the recognizer is starting)
+    STT_FRAME_MS: int = int(os.getenv("STT_FRAME_MS", "40"))
+    STT_BUFFER_MS: int = int(os.getenv("STT_BUFFER_MS", "2000"))
+    # Recognizers built and connected ahead of time, per worker (0 = build one per session),
+    # replaced after STT_POOL_MAX_AGE_S so the service doesn't close them for being idle. Each
+    # pooled recognizer holds an Azure connection (and counts against its quota) even when idle.
+    STT_POOL_SIZE: int = int(os.getenv("STT_POOL_SIZE", "0"))
+    STT_POOL_MAX_AGE_S: float = float(os.getenv("STT_POOL_MAX_AGE_S", "30"))
+    
+    # Blocking Speech SDK calls (building synthesizers and recognizers, starting and stopping
+    # recognition) run on SPEECH_SDK_WORKERS dedicated threads per worker, most urgent first:
+    # a response's first segment before later ones (false = in arrival order)
+    SPEECH_SDK_WORKERS: int = int(os.getenv("SPEECH_SDK_WORKERS", "8"))
+    SPEECH_SDK_PRIORITY: bool = os.getenv("SPEECH_SDK_PRIORITY", "true").lower() == "true"
+    
+    # Text-to-Speech
+    # Number of sentences synthesized concurrently while the LLM keeps streaming (1 = sequential)
+    TTS_PIPELINE_DEPTH: int = int(os.getenv("TTS_PIPELINE_DEPTH", "3"))
+    # Forward audio as the service produces it instead of once per finished sentence
+    TTS_STREAMING: bool = os.getenv("TTS_STREAMING", "true").lower() == "true"
+    
+    # LLM text segmentation for TTS: a short first segment for fast first audio
+    # (cut at a clause once it has MIN_WORDS, or at a word boundary after
+    # MAX_WORDS / TIMEOUT_MS), then sentences merged to MIN_CHARS..MAX_CHARS
+    TTS_SEGMENT_FIRST_MIN_WORDS: int = int(os.getenv("TTS_SEGMENT_FIRST_MIN_WORDS", "3"))
+    TTS_SEGMENT_FIRST_MAX_WORDS: int = int(os.getenv("TTS_SEGMENT_FIRST_MAX_WORDS", "12"))
+    TTS_SEGMENT_FIRST_TIMEOUT_MS: int = int(os.getenv("TTS_SEGMENT_FIRST_TIMEOUT_MS", "400"))
+    TTS_SEGMENT_MIN_CHARS: int = int(os.getenv("TTS_SEGMENT_MIN_CHARS", "60"))
+    TTS_SEGMENT_MAX_CHARS: int = int(os.getenv("TTS_SEGMENT_MAX_CHARS", "250"))
+    
+    # Shared synthesizer pool: max voice/format keys kept, idle synthesizers kept per key
+    TTS_POOL_MAX_VOICES: int = int(os.getenv("TTS_POOL_MAX_VOICES", "4"))
+    TTS_POOL_MAX_IDLE: int = int(os.getenv("TTS_POOL_MAX_IDLE", "16"))
+    
+    # TTS audio cache: in-process LRU budget in bytes (0 disables) plus an optional
+    # persistent layer ("disk", "redis" or empty for none). Persistent entries expire after
+    # TTS_CACHE_TTL seconds; on disk the files are also capped at TTS_CACHE_DISK_MAX_BYTES
+    # per worker, oldest deleted first (0 = no limit for either)
+    TTS_CACHE_MAX_BYTES: int = int(os.getenv("TTS_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    TTS_CACHE_BACKEND: str = os.getenv("TTS_CACHE_BACKEND", "")
+    TTS_CACHE_DIR: str = os.getenv("TTS_CACHE_DIR", "tts_cache")
+    TTS_CACHE_TTL: int = int(os.getenv("TTS_CACHE_TTL", str(7 * 24 * 3600)))
+    TTS_CACHE_DISK_MAX_BYTES: int = int(os.getenv("TTS_CACHE_DISK_MAX_BYTES", str(512 * 1024 * 1024)))
+    TTS_CACHE_MAX_TEXT_CHARS: int = int(os.getenv("TTS_CACHE_MAX_TEXT_CHARS", "200"))
+    
+    # Upstream admission (opt-in), per worker process: concurrent calls per backend, rate limits
+    # per minute (requests, and OpenAI tokens / Azure TTS characters) and per-user quotas on
+    # OpenAI calls; 0 = unlimited. A call queues for at most ADMISSION_MAX_WAIT_MS. With
+    # TURN_BUDGET_MS set (0 = off), a turn's calls to OpenAI are refused once that long has
+    # passed since the end of speech without audio, and its first LLM token is due by then.
+    ADMISSION_ENABLED: bool = os.getenv("ADMISSION_ENABLED", "false").lower() == "true"
+    ADMISSION_MAX_WAIT_MS: int = int(os.getenv("ADMISSION_MAX_WAIT_MS", "3000"))
+    ADMISSION_MAX_QUEUE: int = int(os.getenv("ADMISSION_MAX_QUEUE", "256"))
+    TURN_BUDGET_MS: int = int(os.getenv("TURN_BUDGET_MS", "0"))
+    OPENAI_MAX_CONCURRENT: int = int(os.getenv("OPENAI_MAX_CONCURRENT", "32"))
+    OPENAI_RPM: int = int(os.getenv("OPENAI_RPM", "0"))
+    OPENAI_TPM: int = int(os.getenv("OPENAI_TPM", "0"))
+    AZURE_TTS_MAX_CONCURRENT: int = int(os.getenv("AZURE_TTS_MAX_CONCURRENT", "32"))
+    AZURE_TTS_RPM: int = int(os.getenv("AZURE_TTS_RPM", "0"))
+    AZURE_TTS_CPM: int = int(os.getenv("AZURE_TTS_CPM", "0"))
+    TENANT_RPM: int = int(os.getenv("TENANT_RPM", "0"))
+    TENANT_TPM: int = int(os.getenv("TENANT_TPM", "0"))
+    
     # WebSocket Server
     WS_HOST: str = os.getenv("WS_HOST", "localhost")
     WS_PORT: int = int(os.getenv("WS_PORT", "8765"))
     
+    # Multi-worker mode: processes sharing WS_PORT via SO_REUSEPORT (1 = single process)
+    WS_WORKERS: int = int(os.getenv("WS_WORKERS", "1"))
+    WS_MAX_CONNECTIONS_PER_WORKER: int = int(os.getenv("WS_MAX_CONNECTIONS_PER_WORKER", "0"))  # 0 = unlimited
+    WS_DRAIN_TIMEOUT: float = float(os.getenv("WS_DRAIN_TIMEOUT", "30"))  # Seconds live calls get on shutdown
+    WS_WORKER_HEARTBEAT_TIMEOUT: float = float(os.getenv("WS_WORKER_HEARTBEAT_TIMEOUT", "15"))
+    WS_WORKER_RESTART_DELAY: float = float(os.getenv("WS_WORKER_RESTART_DELAY", "1"))
+    
+    # Per-connection outbound queue: audio frames buffered before synthesis is
+    # made to wait, and how long a client may stop reading before it is shed
+    WS_SEND_QUEUE_MAX: int = int(os.getenv("WS_SEND_QUEUE_MAX", "64"))
+    WS_SLOW_CONSUMER_TIMEOUT: float = float(os.getenv("WS_SLOW_CONSUMER_TIMEOUT", "10"))
+    WS_SLOW_CONSUMER_POLICY: str = os.getenv("WS_SLOW_CONSUMER_POLICY", "close")  # close | block
+    
+    # Session resumption: a client that drops without "stop" and reconnects with the same
+    # token within SESSION_RESUME_WINDOW_S gets its session back (0 = off); at most
+    # SESSION_RESUME_MAX sessions are kept per worker, and only that worker can resume them.
+    # A kept session holds on to its recognizer (and Azure connection) for the whole window.
+    SESSION_RESUME_WINDOW_S: float = float(os.getenv("SESSION_RESUME_WINDOW_S", "0"))
+    SESSION_RESUME_MAX: int = int(os.getenv("SESSION_RESUME_MAX", "1000"))
+    
+    # Audio codecs the client may negotiate for the link (opus needs opuslib);
+    # clients that don't offer any get raw PCM
+    AUDIO_CODECS: str = os.getenv("AUDIO_CODECS", "pcm16,mulaw,alaw,ima-adpcm,opus")
+    
     # Redis Cache (optional)
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
     REDIS_DB: int = int(os.getenv("REDIS_DB", "0"))
     
+    # Per-turn latency traces exported as JSON lines (empty = histograms only)
+    TRACE_FILE: str = os.getenv("TRACE_FILE", "")
+    
+    # Logging
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    # Records/sec per logger category; warnings and errors are never limited
+    LOG_RATE_LIMITS: str = os.getenv("LOG_RATE_LIMITS", "voice.stt.partial=5,voice.audio=2,voice.tts.chunk=5")
+    # Azure Speech SDK trace log, per connection (empty = disabled)
+    AZURE_SPEECH_LOG_FILE: str = os.getenv("AZURE_SPEECH_LOG_FILE", "")
+    
     # JWT Secret
     JWT_SECRET: str = os.getenv("JWT_SECRET", "")
     JWT_ALGORITHM: str = os.getenv("JWT_ALGORITHM", "HS256")
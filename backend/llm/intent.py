@@ -0,0 +1,218 @@
+import json
+import re
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from config.settings import settings
+from llm.response_cache import normalize_input
+from utils.log import get_logger
+from utils.metrics import metrics
+
+logger = get_logger("llm.intent")
+
+TRAINING_PATH = Path(__file__).parent / "intents.jsonl"
+
+# Unambiguous phrasings, matched against normalized text before the model runs
+RULES = [
+    ("cancel", r"^(?:stop|cancel|abort|never ?mind|forget (?:it|that)|scratch that)(?: it| that| please)?$"),
+    ("affirm", r"^(?:yes|yeah|yep|yup|sure|ok|okay|correct|absolutely)(?: please| sure| thanks)?$"),
+    ("deny", r"^(?:no|nope|nah)(?: thanks| thank you)?$"),
+    ("greeting", r"^(?:hi|hello|hey)(?: there)?$"),
+    ("thanks", r"^(?:thanks|thank you)(?: so much| very much| a lot)?$"),
+    ("alarm", r"\b(?:set|start) (?:an? |my )?(?:\w+ )?(?:alarm|timer)\b"),
+    ("reminder", r"\bremind me\b"),
+    ("weather", r"\b(?:weather|forecast)\b")
+]
+RULE_CONFIDENCE = 0.95
+
+_NUMBER = r"\d+|one|two|three|four|five|six|seven|eight|nine|ten|eleven|twelve|fifteen|twenty|thirty|forty|fifty|sixty"
+
+# Matched against the lower-cased utterance (normalizing would split "6:45")
+ENTITY_PATTERNS = {
+    "time": r"\b(?:\d{1,2}(?::\d{2})? ?(?:am|pm|a\.m\.|p\.m\.)|\d{1,2}:\d{2}|noon|midnight|(?<=at )(?:" + _NUMBER + r")(?: thirty| fifteen| forty five| o'clock)?)\b",
+    "date": r"\b(?:today|tonight|tomorrow|this (?:morning|afternoon|evening|weekend)|(?:on |next )?(?:monday|tuesday|wednesday|thursday|friday|saturday|sunday))\b",
+    "duration": r"\b(?:" + _NUMBER + r")(?: |-)(?:seconds?|minutes?|hours?|days?)\b",
+    "party_size": r"\b(?<=for )(?:" + _NUMBER + r")(?= people| persons| of us|$| at| on| tonight| tomorrow)"
+}
+
+
+def _hash(feature: str, dim: int) -> int:
+    # crc32 rather than hash(): stable across processes, so a trained model means the same everywhere
+    return zlib.crc32(feature.encode("utf-8")) % dim
+
+
+_ENTITY_REGEXES = {name: re.compile(pattern) for name, pattern in ENTITY_PATTERNS.items()}
+
+
+def extract_entities(text: str) -> Dict[str, str]:
+    lowered = text.lower()
+    entities = {}
+    for name, pattern in _ENTITY_REGEXES.items():
+        match = pattern.search(lowered)
+        if match:
+            entities[name] = match.group(0).strip()
+    return entities
+
+
+class IntentClassifier:
+    """
+    In-process intent classification: a regex rule table, then a nearest-centroid model
+    
+    The model hashes word unigrams, word bigrams and character 4-grams
+    (which tolerate recognizer misspellings and inflections) into `dim`
+    buckets, weights them by sublinear TF-IDF and compares the unit vector
+    with one centroid per intent. Confidence is the softmax of the cosine
+    similarities, scaled down when even the best match is weak, so
+    out-of-scope requests score low and can go to the LLM instead.
+    """
+    
+    def __init__(
+        self,
+        examples: Sequence[Tuple[str, str]],
+        rules: Sequence[Tuple[str, str]] = RULES,
+        dim: int = 2 ** 14,
+        temperature: float = 0.05,
+        min_similarity: float = 0.3
+    ):
+        self.dim = dim
+        self.temperature = temperature
+        self.min_similarity = min_similarity
+        self.rules = [(intent, re.compile(pattern)) for intent, pattern in rules]
+        self.labels: List[str] = sorted({intent for _, intent in examples})
+        
+        counts = [self._counts(text) for text, _ in examples]
+        document_frequency = np.zeros(dim, dtype=np.float32)
+        for buckets, _ in counts:
+            document_frequency[buckets] += 1
+        self.idf = (np.log((1 + len(examples)) / (1 + document_frequency)) + 1).astype(np.float32)
+        
+        label_index = {label: index for index, label in enumerate(self.labels)}
+        centroids = np.zeros((len(self.labels), dim), dtype=np.float32)
+        for (buckets, weights), (_, intent) in zip(counts, examples):
+            centroids[label_index[intent], buckets] += self._unit(buckets, weights)
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        self.centroids = centroids / np.maximum(norms, 1e-12)
+    
+    @classmethod
+    def from_file(cls, path: Path = TRAINING_PATH, **kwargs) -> "IntentClassifier":
+        """Train from a JSON-lines file of {"text": ..., "intent": ...} records"""
+        with open(path) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        examples = [(record["text"], record["intent"]) for record in records if record]
+        return cls(examples, **kwargs)
+    
+    def _counts(self, text: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Hashed feature buckets of a text and their sublinear term frequencies"""
+        words = normalize_input(text).split()
+        features = [f"w:{word}" for word in words]
+        features += [f"b:{first} {second}" for first, second in zip(words, words[1:])]
+        for word in words:
+            padded = f" {word} "
+            features += [f"c:{padded[i:i + 4]}" for i in range(max(1, len(padded) - 3))]
+        if not features:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        
+        buckets, counts = np.unique([_hash(feature, self.dim) for feature in features], return_counts=True)
+        return buckets, (1 + np.log(counts)).astype(np.float32)
+    
+    def _unit(self, buckets: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        weights = weights * self.idf[buckets]
+        norm = np.linalg.norm(weights)
+        return weights / norm if norm else weights
+    
+    def match_rules(self, normalized: str) -> Optional[str]:
+        for intent, pattern in self.rules:
+            if pattern.search(normalized):
+                return intent
+        return None
+    
+    def scores(self, text: str) -> np.ndarray:
+        """Cosine similarity of the text with each intent's centroid (order of `labels`)"""
+        buckets, weights = self._counts(text)
+        if not len(buckets):
+            return np.zeros(len(self.labels), dtype=np.float32)
+        return self.centroids[:, buckets] @ self._unit(buckets, weights)
+    
+    def classify(self, text: str) -> Dict:
+        """Same shape as LLMClient.extract_intent, plus the source of the answer"""
+        entities = extract_entities(text)
+        intent = self.match_rules(normalize_input(text))
+        if intent:
+            return {"intent": intent, "entities": entities, "confidence": RULE_CONFIDENCE, "source": "rules"}
+        
+        similarities = self.scores(text)
+        best = int(np.argmax(similarities))
+        exp = np.exp((similarities - similarities[best]) / self.temperature)
+        confidence = float(1 / exp.sum()) * min(1.0, float(similarities[best]) / self.min_similarity)
+        return {
+            "intent": self.labels[best],
+            "entities": entities,
+            "confidence": round(confidence, 3),
+            "source": "local"
+        }
+
+
+class IntentResolver:
+    """
+    Local classification first, the LLM only when it isn't confident enough
+    
+    Results are memoized per normalized utterance (LRU), whichever side
+    produced them, so repeats of an unclear phrasing ask the LLM once.
+    Failed LLM calls are not memoized.
+    """
+    
+    def __init__(self, classifier: Optional[IntentClassifier], threshold: float, max_entries: int):
+        self.classifier = classifier
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    async def resolve(self, text: str, ask_llm: Callable[[str], Awaitable[Optional[Dict]]]) -> Dict:
+        key = normalize_input(text)
+        result = self._entries.get(key)
+        if result is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            metrics.incr("intent.memo_hit")
+            return result
+        self.misses += 1
+        
+        local = self.classifier.classify(text) if self.classifier else None
+        if local and local["confidence"] >= self.threshold:
+            result = local
+        else:
+            result = await ask_llm(text)
+            if result is None:
+                # A low-confidence guess is no answer; not memoized so the next repeat asks again
+                metrics.incr("intent.source.failed")
+                entities = local["entities"] if local else extract_entities(text)
+                return {"intent": "unknown", "entities": entities, "confidence": 0.0, "source": "none"}
+        
+        metrics.incr(f"intent.source.{result['source']}")
+        self._entries[key] = result
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return result
+    
+    def stats(self) -> Dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def create_intent_resolver() -> IntentResolver:
+    """Build the resolver from settings (LLM-only when local classification is off or can't load)"""
+    classifier = None
+    if settings.INTENT_LOCAL_ENABLED:
+        path = settings.INTENT_TRAINING_FILE or TRAINING_PATH
+        try:
+            classifier = IntentClassifier.from_file(path)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Could not train the intent classifier from %s: %s", path, e)
+    return IntentResolver(classifier, settings.INTENT_LOCAL_THRESHOLD, settings.INTENT_CACHE_SIZE)
+
+
+# Create a singleton instance (shared by every connection in the process)
+intent_resolver = create_intent_resolver()
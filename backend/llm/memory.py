@@ -0,0 +1,173 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from utils.log import get_logger
+from utils.metrics import metrics
+
+logger = get_logger("llm.memory")
+
+# One exchange: (user utterance, assistant reply)
+Turn = Tuple[str, str]
+
+# Chat formats add a few tokens of framing to every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about four characters per token for English text"""
+    return (len(text) + 3) // 4
+
+
+def message_tokens(message: Dict) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def turn_messages(turn: Turn) -> List[Dict]:
+    user, assistant = turn
+    return [{"role": "user", "content": user}, {"role": "assistant", "content": assistant}]
+
+
+def turn_tokens(turn: Turn) -> int:
+    return sum(message_tokens(message) for message in turn_messages(turn))
+
+
+class ConversationMemory:
+    """
+    Earlier turns of one conversation, kept within an estimated token budget
+    
+    Prompts are laid out from the most to the least stable part: system
+    prompt, summary of older turns, recent turns oldest first, then the
+    per-turn context and the new utterance. Between summaries every prompt
+    starts with the previous one's messages, so provider-side prompt
+    caching can reuse the whole history.
+    
+    When the turns outgrow max_tokens, the oldest are evicted down to
+    low_water of the budget (in one go rather than one per turn, which
+    would shift the prefix every turn) and folded into the summary by
+    `summarize` in a background task. Until that finishes they stay in the
+    prompt, which may then briefly carry up to twice the budget, so normally
+    nothing is forgotten while the summary is being written.
+    """
+    
+    def __init__(
+        self,
+        summarize: Optional[Callable[[str, List[Turn]], Awaitable[str]]] = None,
+        max_tokens: int = 1500,
+        low_water: float = 0.6
+    ):
+        self.summarize = summarize
+        self.max_tokens = max_tokens
+        self.low_water = low_water
+        
+        self.summary = ""
+        self.turns: List[Turn] = []
+        self.evicted: List[Turn] = []  # Waiting to be summarized; still sent meanwhile
+        self._turn_tokens: List[int] = []
+        self._task: Optional[asyncio.Task] = None
+        
+        self.evictions = 0
+        self.summaries = 0
+        self.summary_failures = 0
+    
+    def is_empty(self) -> bool:
+        return not (self.summary or self.turns or self.evicted)
+    
+    def _window_tokens(self) -> int:
+        summary = message_tokens(self.summary_message()) if self.summary else 0
+        return summary + sum(self._turn_tokens)
+    
+    def _evicted_tokens(self) -> int:
+        return sum(turn_tokens(turn) for turn in self.evicted)
+    
+    def pending(self) -> List[Turn]:
+        """Evicted turns still sent; left out if turns pile up faster than they are summarized"""
+        if self._window_tokens() + self._evicted_tokens() > 2 * self.max_tokens:
+            return []
+        return self.evicted
+    
+    def tokens(self) -> int:
+        """Estimated tokens the memory adds to a prompt"""
+        return self._window_tokens() + (self._evicted_tokens() if self.pending() else 0)
+    
+    def summary_message(self) -> Dict:
+        return {"role": "system", "content": f"Summary of the conversation so far: {self.summary}"}
+    
+    def build_messages(self, system_prompt: str, user_input: str, context: Optional[str] = None) -> List[Dict]:
+        """Messages for the next request, stable prefix first"""
+        messages = [{"role": "system", "content": system_prompt}]
+        if self.summary:
+            messages.append(self.summary_message())
+        for turn in self.pending() + self.turns:
+            messages.extend(turn_messages(turn))
+        
+        # Changes every turn, so it goes after everything worth caching
+        if context:
+            messages.append({"role": "system", "content": context})
+        messages.append({"role": "user", "content": user_input})
+        return messages
+    
+    def add_turn(self, user_input: str, reply: str):
+        """Record a finished (or interrupted) exchange, evicting old turns if over budget"""
+        turn = (user_input, reply)
+        self.turns.append(turn)
+        self._turn_tokens.append(turn_tokens(turn))
+        
+        # Turns waiting to be summarized don't count: evicting again for them would shift the prefix
+        remaining = self._window_tokens()
+        if remaining <= self.max_tokens:
+            return
+        
+        # Always keep the latest exchange, however long: the next utterance refers to it
+        target = self.max_tokens * self.low_water
+        count = 0
+        while count < len(self.turns) - 1 and remaining > target:
+            remaining -= self._turn_tokens[count]
+            count += 1
+        if not count:
+            return
+        
+        self.evicted.extend(self.turns[:count])
+        del self.turns[:count]
+        del self._turn_tokens[:count]
+        self.evictions += count
+        metrics.incr("llm.memory.evicted_turns", count)
+        
+        if self.summarize is None:
+            self.evicted.clear()
+        elif self._task is None:
+            self._task = asyncio.ensure_future(self._summarize_evicted())
+    
+    async def _summarize_evicted(self):
+        # Turns evicted while a summary is being written wait for the next round
+        try:
+            while self.evicted:
+                batch = list(self.evicted)
+                try:
+                    summary = await self.summarize(self.summary, batch)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Drop the turns anyway: the budget matters more than their details
+                    logger.warning("Summarization failed, dropping %d turns: %s", len(batch), e)
+                    self.summary_failures += 1
+                    metrics.incr("llm.memory.summary_failed")
+                else:
+                    self.summary = summary.strip() or self.summary
+                    self.summaries += 1
+                    metrics.incr("llm.memory.summaries")
+                del self.evicted[:len(batch)]
+        finally:
+            self._task = None
+    
+    def close(self):
+        if self._task:
+            self._task.cancel()
+    
+    def stats(self) -> Dict:
+        return {
+            "turns": len(self.turns),
+            "tokens": self.tokens(),
+            "summary_tokens": estimate_tokens(self.summary),
+            "evictions": self.evictions,
+            "summaries": self.summaries,
+            "summary_failures": self.summary_failures
+        }
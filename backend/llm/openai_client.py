@@ -2,17 +2,46 @@ from openai import AsyncOpenAI
 from typing import AsyncGenerator, List, Dict, Optional
 import json
 from config.settings import settings
+from utils.admission import AdmissionError, openai_limiter
+from utils.log import get_logger
+from utils.metrics import metrics
+from llm.intent import IntentResolver, intent_resolver
+from llm.memory import ConversationMemory, Turn, estimate_tokens, message_tokens
+from llm.request_policy import LLMTimeout, RequestPolicy, request_policy
+from llm.response_cache import ResponseCache, response_cache
+
+logger = get_logger("llm")
+
+RESPONSE_MAX_TOKENS = 150  # Keep responses concise for voice
 
 class LLMClient:
-    def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        cache: Optional[ResponseCache] = response_cache,
+        intents: IntentResolver = intent_resolver,
+        policy: RequestPolicy = request_policy
+    ):
+        # Pass a shared client to reuse its keep-alive connection pool across connections
+        self.client = client or AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        # Responses are retried and hedged by the policy, within the turn's deadline, so the
+        # SDK's own retries (with their longer backoff) are off for them
+        self.response_client = self.client.with_options(max_retries=0)
         self.model = settings.OPENAI_MODEL
+        self.cache = cache
+        self.intents = intents
+        self.policy = policy
         
         # System prompt for voice assistant
         self.system_prompt = """You are a helpful voice assistant. 
         Keep your responses concise and conversational. 
         Avoid using markdown, bullet points, or special formatting.
         Speak naturally as if in a conversation."""
+        
+        # Earlier turns of this connection's conversation
+        self.memory = None
+        if settings.LLM_MEMORY_ENABLED:
+            self.memory = ConversationMemory(self.summarize, max_tokens=settings.LLM_MEMORY_MAX_TOKENS)
     
     async def generate_response(
         self, 
@@ -23,62 +52,192 @@ class LLMClient:
         """
         Generate LLM response with streaming
         
+        The request goes through self.policy (hedged when the first token is
+        slow, retried on transient errors, bounded by the turn's deadline).
+        If it fails before any text, a short apology saying why is yielded
+        instead; if it fails midway, the answer ends where it got to.
+        
         Args:
             user_input: User's transcribed speech
             context: Optional context from database/previous turns
             stream: Whether to stream the response
         """
-        messages = [
-            {"role": "system", "content": self.system_prompt}
-        ]
+        context_str = f"Context: {json.dumps(context)}" if context else None
+        if self.memory:
+            messages = self.memory.build_messages(self.system_prompt, user_input, context_str)
+        else:
+            messages = [{"role": "system", "content": self.system_prompt}]
+            if context_str:
+                messages.append({"role": "system", "content": context_str})
+            messages.append({"role": "user", "content": user_input})
         
-        # Add context if available
-        if context:
-            context_str = f"Context: {json.dumps(context)}"
-            messages.append({"role": "system", "content": context_str})
+        prompt_tokens = sum(message_tokens(message) for message in messages)
+        metrics.observe("llm.prompt_tokens", prompt_tokens)
         
-        messages.append({"role": "user", "content": user_input})
+        chunks = []
+        cache_key = None
+        # A cached answer ignores the history, so it only stands in for a conversation's first turn
+        if self.cache and (self.memory is None or self.memory.is_empty()):
+            cache_key = self.cache.key(user_input, self.model, context)
+            cached = await self.cache.get(cache_key)
+            if cached is not None:
+                # Replay the stored chunks so downstream sentence splitting is unchanged
+                try:
+                    for chunk in cached:
+                        chunks.append(chunk)
+                        yield chunk
+                finally:
+                    self.remember(user_input, chunks)
+                return
         
+        failed = False
+        replies = self.policy.stream(
+            lambda: self.request_reply(messages, prompt_tokens, stream),
+            can_hedge=openai_limiter.has_capacity
+        )
         try:
-            response = await self.client.chat.completions.create(
+            async for text in replies:
+                chunks.append(text)
+                yield text
+        except Exception as e:
+            if isinstance(e, AdmissionError):
+                logger.warning("LLM request not admitted: %s", e)
+                apology = "I'm sorry, I'm a little busy right now. Please ask me again in a moment."
+            elif isinstance(e, LLMTimeout):
+                logger.warning("LLM request timed out: %s", e)
+                apology = "I'm sorry, that's taking longer than it should. Could you ask me again?"
+            else:
+                logger.error("LLM Error: %s", e)
+                apology = "I'm sorry, I encountered an error processing your request."
+            # Text already handed on for synthesis stands; the answer just ends there
+            if not chunks:
+                failed = True
+                yield apology
+            return
+        finally:
+            await replies.aclose()
+            # Interrupted answers are remembered as far as they got; failed turns are not
+            if not failed:
+                self.remember(user_input, chunks)
+        
+        # Only complete answers are cached, never the error fallback
+        if cache_key and chunks:
+            await self.cache.set(cache_key, chunks)
+    
+    async def request_reply(self, messages: List[Dict], prompt_tokens: int, stream: bool) -> AsyncGenerator[str, None]:
+        """One request for the reply, admitted by openai_limiter; yields its text as it arrives"""
+        # Reserves the most the request can use; corrected from the reported usage
+        async with openai_limiter.admit(prompt_tokens + RESPONSE_MAX_TOKENS) as admission:
+            extra = {"stream_options": {"include_usage": True}} if stream else {}
+            response = await self.response_client.chat.completions.create(
                 model=self.model,
                 messages=messages,
                 stream=stream,
                 temperature=0.7,
-                max_tokens=150  # Keep responses concise for voice
+                max_tokens=RESPONSE_MAX_TOKENS,
+                **extra
             )
             
-            if stream:
+            if not stream:
+                if response.usage:
+                    self.record_usage(response.usage, prompt_tokens)
+                    admission.charge(response.usage.total_tokens)
+                if response.choices[0].message.content:
+                    yield response.choices[0].message.content
+                return
+            
+            try:
                 async for chunk in response:
-                    if chunk.choices[0].delta.content:
+                    # With include_usage the last chunk has no choices, only the token counts
+                    if chunk.usage:
+                        self.record_usage(chunk.usage, prompt_tokens)
+                        admission.charge(chunk.usage.total_tokens)
+                    if chunk.choices and chunk.choices[0].delta.content:
                         yield chunk.choices[0].delta.content
-            else:
-                yield response.choices[0].message.content
-                
-        except Exception as e:
-            print(f"LLM Error: {e}")
-            yield "I'm sorry, I encountered an error processing your request."
+            finally:
+                # Release the HTTP stream immediately if the consumer stops early (barge-in, lost hedge)
+                await response.close()
+    
+    def remember(self, user_input: str, chunks: List[str]):
+        if self.memory and chunks:
+            self.memory.add_turn(user_input, "".join(chunks))
+    
+    def record_usage(self, usage, estimated: int):
+        """Report the provider's prompt token count, and how much of it was served from its prompt cache"""
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", None) or 0) if details else 0
+        metrics.observe("llm.prompt_tokens_reported", usage.prompt_tokens)
+        metrics.observe("llm.prompt_cached_tokens", cached)
+        logger.debug(
+            "Prompt: %d tokens (%d cached, estimated %d), memory: %s",
+            usage.prompt_tokens, cached, estimated, self.memory.stats() if self.memory else None
+        )
+    
+    async def summarize(self, summary: str, turns: List[Turn]) -> str:
+        """Fold turns that left the memory window into the running summary"""
+        transcript = "\n".join(f"User: {user}\nAssistant: {reply}" for user, reply in turns)
+        prompt = f"""Update the summary of a voice conversation with the turns below.
+        Keep names, facts, requests and decisions; drop small talk.
+        Reply with the summary only, in under {settings.LLM_MEMORY_SUMMARY_TOKENS * 3 // 4} words.
+        
+        Summary so far: {summary or "(none)"}
+        
+        Turns:
+        {transcript}"""
+        
+        # Background work: the turn that triggered it has no say in how long it may wait
+        tokens = estimate_tokens(prompt) + settings.LLM_MEMORY_SUMMARY_TOKENS
+        async with openai_limiter.admit(tokens, bounded=False):
+            response = await self.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0,
+                max_tokens=settings.LLM_MEMORY_SUMMARY_TOKENS
+            )
+        text = response.choices[0].message.content or ""
+        logger.debug("Summarized %d turns into %d tokens", len(turns), estimate_tokens(text))
+        return text
+    
+    def close(self):
+        if self.memory:
+            self.memory.close()
     
     async def extract_intent(self, text: str) -> Dict:
         """
-        Extract intent from user input using a smaller, faster model
+        Extract intent from user input: in-process when the local classifier
+        is confident, otherwise with a smaller, faster model
         """
-        # For production, use a fine-tuned classification model
-        # For now, use simple keyword matching or a fast LLM call
-        
+        return await self.intents.resolve(text, self.llm_intent)
+    
+    async def llm_intent(self, text: str) -> Optional[Dict]:
+        """Ask the LLM for the intent; None if the call or its JSON fails"""
         intent_prompt = f"""Extract the intent from this text in JSON format:
         Text: "{text}"
         
         Return only JSON with fields: intent, entities, confidence"""
         
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-3.5-turbo",  # Faster model for intent
-                messages=[{"role": "user", "content": intent_prompt}],
-                temperature=0,
-                max_tokens=100
-            )
+            async with openai_limiter.admit(estimate_tokens(intent_prompt) + 100):
+                response = await self.client.chat.completions.create(
+                    model="gpt-3.5-turbo",  # Faster model for intent
+                    messages=[{"role": "user", "content": intent_prompt}],
+                    temperature=0,
+                    max_tokens=100
+                )
             
-            return json.loads(response.choices[0].message.content)
-        except:
-            return {"intent": "unknown", "entities": [], "confidence": 0.5}
\ No newline at end of file
+            result = json.loads(response.choices[0].message.content)
+        except json.JSONDecodeError as e:
+            logger.warning("Intent response is not JSON: %s", e)
+            return None
+        except AdmissionError as e:
+            logger.warning("Intent request not admitted: %s", e)
+            return None
+        except Exception as e:
+            logger.warning("Intent request failed: %s", e)
+            return None
+        
+        if not isinstance(result, dict) or "intent" not in result:
+            logger.warning("Intent response has no intent: %s", result)
+            return None
+        result["source"] = "llm"
+        return result
\ No newline at end of file
@@ -0,0 +1,232 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import AsyncGenerator, AsyncIterator, Callable, Deque, Dict, Optional, Tuple
+import numpy as np
+import openai
+from config.settings import settings
+from utils.admission import turn_deadline_var
+from utils.log import get_logger
+from utils.metrics import metrics
+
+logger = get_logger("llm.policy")
+
+# Status codes worth another try: timeout, conflict, rate limited, and server errors
+RETRYABLE_STATUS = {408, 409, 429}
+
+
+class LLMTimeout(Exception):
+    """No first token by the deadline, or the stream stalled"""
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Transient failures: the connection, rate limits, overload and server errors"""
+    if isinstance(error, openai.APIConnectionError):  # Includes APITimeoutError
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS or error.status_code >= 500
+    return False
+
+
+class RequestPolicy:
+    """
+    Hedging, retries and deadlines for streamed LLM requests
+    
+    stream() takes a factory of attempts (async iterators of text chunks,
+    each one a complete request) and yields the text of whichever attempt
+    produces a first chunk first:
+    
+    - if the first attempt hasn't produced a token after the hedge delay,
+      a second one is started; the first to stream wins and the other is
+      cancelled (its HTTP stream closed)
+    - the hedge delay is hedge_percentile of recent first-token latencies,
+      clamped to hedge_min_ms..hedge_max_ms (hedge_default_ms until
+      min_samples are in), so about (100 - percentile)% of turns hedge
+    - attempts that fail before their first token with a transient error
+      are retried up to max_retries times, after a full-jitter exponential
+      backoff, if the retry can still make the deadline
+    - the first token is due within first_token_timeout_ms, or sooner if
+      the turn's deadline (see utils.admission) comes first; after that a
+      gap of stall_timeout_ms between chunks ends the stream
+    
+    Once text has been yielded nothing is retried: it may have been spoken.
+    Shared by every connection, so the latency window reflects the whole process.
+    """
+    
+    def __init__(
+        self,
+        hedge_percentile: float = 95,
+        hedge_default_ms: float = 1500,
+        hedge_min_ms: float = 300,
+        hedge_max_ms: float = 3000,
+        max_retries: int = 2,
+        backoff_ms: float = 200,
+        first_token_timeout_ms: float = 5000,
+        stall_timeout_ms: float = 5000,
+        hedging: bool = True,
+        window: int = 512,
+        min_samples: int = 20
+    ):
+        self.hedge_percentile = hedge_percentile
+        self.hedge_default = hedge_default_ms / 1000
+        self.hedge_min = hedge_min_ms / 1000
+        self.hedge_max = hedge_max_ms / 1000
+        self.max_retries = max_retries
+        self.backoff_base = backoff_ms / 1000
+        self.first_token_timeout = first_token_timeout_ms / 1000
+        self.stall_timeout = stall_timeout_ms / 1000
+        self.hedging = hedging
+        self.min_samples = min_samples
+        self._first_token_latencies: Deque[float] = deque(maxlen=window)
+    
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait for a first token before hedging (None = never hedge)"""
+        if not self.hedging:
+            return None
+        if len(self._first_token_latencies) < self.min_samples:
+            return self.hedge_default
+        delay = float(np.percentile(self._first_token_latencies, self.hedge_percentile))
+        return min(self.hedge_max, max(self.hedge_min, delay))
+    
+    def backoff(self, retry: int) -> float:
+        """Full jitter: anywhere up to base * 2^retry, so retrying clients spread out"""
+        return random.uniform(0, self.backoff_base * 2 ** retry)
+    
+    def first_token_deadline(self) -> float:
+        timeout = self.first_token_timeout
+        turn = turn_deadline_var.get()
+        remaining = turn.remaining() if turn else None
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+        return time.monotonic() + timeout
+    
+    async def stream(
+        self,
+        start: Callable[[], AsyncIterator[str]],
+        can_hedge: Optional[Callable[[], bool]] = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Yield the text of the winning attempt
+        
+        Args:
+            start: Starts a new attempt (the same request every time)
+            can_hedge: Checked before hedging, e.g. so a saturated backend
+                       isn't sent duplicate requests
+        
+        Raises:
+            LLMTimeout: no first token in time, or the stream stalled
+            The last attempt's error, when every attempt failed
+        """
+        deadline = self.first_token_deadline()
+        retry = 0
+        while True:
+            try:
+                winner, first = await self._first_token(start, deadline, can_hedge)
+                break
+            except LLMTimeout:
+                metrics.incr("llm.timeouts")
+                raise
+            except Exception as e:
+                delay = self.backoff(retry)
+                if retry >= self.max_retries or not is_retryable(e) or time.monotonic() + delay >= deadline:
+                    raise
+                retry += 1
+                metrics.incr("llm.retries")
+                logger.warning("LLM request failed (%s), retry %d in %.0f ms", e, retry, delay * 1000)
+                await asyncio.sleep(delay)
+        
+        if winner is None:
+            return
+        try:
+            yield first
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(winner.__anext__(), self.stall_timeout)
+                except StopAsyncIteration:
+                    return
+                except asyncio.TimeoutError:
+                    metrics.incr("llm.stalls")
+                    raise LLMTimeout(f"no text for {self.stall_timeout:.1f} s")
+                yield chunk
+        finally:
+            await winner.aclose()
+    
+    async def _first_token(
+        self,
+        start: Callable[[], AsyncIterator[str]],
+        deadline: float,
+        can_hedge: Optional[Callable[[], bool]]
+    ) -> Tuple[Optional[AsyncIterator[str]], Optional[str]]:
+        """Race attempts to a first chunk: (winning attempt, its chunk), or (None, None) for an empty reply"""
+        started = time.monotonic()
+        hedge_delay = self.hedge_delay()
+        hedge_at = None if hedge_delay is None else started + hedge_delay
+        attempts: Dict[asyncio.Future, Tuple[AsyncIterator[str], float]] = {}
+        
+        def launch() -> AsyncIterator[str]:
+            attempt = start()
+            attempts[asyncio.ensure_future(attempt.__anext__())] = (attempt, time.monotonic())
+            return attempt
+        
+        primary = launch()
+        hedged = racing = False
+        error: Optional[BaseException] = None
+        try:
+            while attempts:
+                now = time.monotonic()
+                wake = deadline if hedged or hedge_at is None else min(deadline, hedge_at)
+                done, _ = await asyncio.wait(attempts, timeout=max(0.0, wake - now), return_when=asyncio.FIRST_COMPLETED)
+                
+                for task in done:
+                    attempt, attempt_start = attempts.pop(task)
+                    if task.exception() is None:
+                        elapsed = time.monotonic() - attempt_start
+                        self._first_token_latencies.append(elapsed)
+                        metrics.observe("llm.first_token_ms", elapsed * 1000)
+                        if racing:
+                            metrics.incr("llm.hedge.lost" if attempt is primary else "llm.hedge.won")
+                        return attempt, task.result()
+                    if isinstance(task.exception(), StopAsyncIteration):
+                        return None, None
+                    error = task.exception()
+                    logger.debug("LLM attempt failed before its first token: %s", error)
+                
+                if done:
+                    continue
+                if time.monotonic() >= deadline:
+                    raise LLMTimeout(f"no first token within {deadline - started:.1f} s")
+                hedged = True
+                if can_hedge is None or can_hedge():
+                    metrics.incr("llm.hedge.fired")
+                    launch()
+                    racing = True
+                else:
+                    metrics.incr("llm.hedge.skipped")
+            raise error
+        finally:
+            # Losers and abandoned attempts: stop waiting on them and close their streams
+            for task in attempts:
+                task.cancel()
+            if attempts:
+                await asyncio.wait(attempts)
+            for attempt, _ in attempts.values():
+                await attempt.aclose()
+
+
+def create_request_policy() -> RequestPolicy:
+    return RequestPolicy(
+        hedge_percentile=settings.LLM_HEDGE_PERCENTILE,
+        hedge_default_ms=settings.LLM_HEDGE_DELAY_MS,
+        hedge_min_ms=settings.LLM_HEDGE_MIN_MS,
+        hedge_max_ms=settings.LLM_HEDGE_MAX_MS,
+        max_retries=settings.LLM_MAX_RETRIES,
+        backoff_ms=settings.LLM_RETRY_BACKOFF_MS,
+        first_token_timeout_ms=settings.LLM_FIRST_TOKEN_TIMEOUT_MS,
+        stall_timeout_ms=settings.LLM_STALL_TIMEOUT_MS,
+        hedging=settings.LLM_HEDGE_ENABLED
+    )
+
+
+# Create a singleton instance (shared by every connection in the process)
+request_policy = create_request_policy()
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import re
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+from config.settings import settings
+from utils.log import get_logger
+from utils.metrics import metrics
+from utils.redis_client import get_redis
+
+logger = get_logger("cache.llm")
+
+_PUNCTUATION = re.compile(r"[^\w\s']")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_input(text: str) -> str:
+    """Fold case, punctuation and spacing so near-exact repeats share a key"""
+    text = _PUNCTUATION.sub(" ", text.casefold())
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def _lookup(context: Dict, path: str):
+    """Resolve a dotted path such as 'intent.intent' in a context dict"""
+    value = context
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+class MemoryResponseBackend:
+    """In-process backend with TTL and LRU size eviction"""
+    
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.evictions = 0
+    
+    async def get(self, key: str) -> Optional[List[str]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, chunks = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return chunks
+    
+    async def set(self, key: str, chunks: List[str], ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, chunks)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+            metrics.incr("llm_cache.eviction")
+
+
+class RedisResponseBackend:
+    """
+    Redis backend built from the REDIS_* settings
+    
+    Entries expire via TTL; size eviction is left to the server's
+    maxmemory-policy (e.g. allkeys-lru).
+    """
+    
+    def __init__(self, client, prefix: str = "llm:"):
+        self.client = client
+        self.prefix = prefix
+    
+    async def get(self, key: str) -> Optional[List[str]]:
+        raw = await self.client.get(self.prefix + key)
+        return json.loads(raw) if raw is not None else None
+    
+    async def set(self, key: str, chunks: List[str], ttl: int):
+        await self.client.set(self.prefix + key, json.dumps(chunks), ex=ttl)
+
+
+class ResponseCache:
+    """
+    Cache of complete LLM answers, stored as the streamed chunks so a hit
+    can be replayed through the same async-generator interface
+    """
+    
+    def __init__(self, backend, ttl: int, context_keys: Sequence[str] = ()):
+        self.backend = backend
+        self.ttl = ttl
+        self.context_keys = list(context_keys)
+        self.hits = 0
+        self.misses = 0
+    
+    def key(self, user_input: str, model: str, context: Optional[Dict]) -> str:
+        """Key on normalized input, model and the configured context fields"""
+        context = context or {}
+        fields = {path: _lookup(context, path) for path in self.context_keys}
+        raw = json.dumps([model, normalize_input(user_input), fields], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    
+    async def get(self, key: str) -> Optional[List[str]]:
+        try:
+            chunks = await self.backend.get(key)
+        except Exception as e:
+            logger.warning("Lookup failed: %s", e)
+            chunks = None
+        
+        if chunks is None:
+            self.misses += 1
+            metrics.incr("llm_cache.miss")
+        else:
+            self.hits += 1
+            metrics.incr("llm_cache.hit")
+        return chunks
+    
+    async def set(self, key: str, chunks: List[str]):
+        try:
+            await self.backend.set(key, chunks, self.ttl)
+        except Exception as e:
+            logger.warning("Store failed: %s", e)
+
+
+def create_response_cache() -> Optional[ResponseCache]:
+    """Build the response cache from settings (None when disabled)"""
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    
+    backend = None
+    if settings.LLM_CACHE_BACKEND.lower() == "redis":
+        client = get_redis()
+        if client is not None:
+            backend = RedisResponseBackend(client)
+        else:
+            logger.warning("redis package not installed, using in-memory cache")
+    if backend is None:
+        backend = MemoryResponseBackend(settings.LLM_CACHE_MAX_ENTRIES)
+    
+    context_keys = [k.strip() for k in settings.LLM_CACHE_CONTEXT_KEYS.split(",") if k.strip()]
+    return ResponseCache(backend, settings.LLM_CACHE_TTL, context_keys)
+
+
+# Create a singleton instance (shared by every connection in the process)
+response_cache = create_response_cache()
@@ -0,0 +1,253 @@
+"""
+Simulated voice client
+
+Speaks the same auth/audio/stop protocol as frontend/js/socket.js and
+streams microphone-sized PCM chunks at real-time pace: a burst of "speech"
+per turn, then silence while it waits for the spoken response. Audio can be
+sent at a native browser rate (44.1/48 kHz) for the server to convert.
+A client can also drop its connection midway and resume the session.
+"""
+import asyncio
+import json
+import time
+from typing import Dict, List, Optional
+import numpy as np
+import websockets
+from utils.audio import CODEC_PCM16, SAMPLE_RATE, create_codec
+from utils.metrics import metrics
+from websocket.protocol import (
+    PROTOCOL_BINARY_V1, PROTOCOL_JSON, FRAME_AUDIO, FrameError,
+    encode_audio_frame, decode_frame
+)
+
+# The browser's 4096-sample ScriptProcessor buffer at 48 kHz
+BROWSER_BUFFER_SAMPLES = 4096
+BROWSER_SAMPLE_RATE = 48000
+
+
+class SimulatedClient:
+    def __init__(
+        self,
+        url: str,
+        turns: int = 3,
+        speech_seconds: float = 1.5,
+        pause_seconds: float = 1.0,
+        response_timeout: float = 15.0,
+        idle_seconds: float = 0.6,
+        protocol: str = PROTOCOL_BINARY_V1,
+        codec: str = CODEC_PCM16,
+        token: str = "demo-token",
+        chunk_samples: Optional[int] = None,
+        sample_rate: int = SAMPLE_RATE,
+        playback_rate: Optional[int] = None,
+        reconnect_after: int = 0
+    ):
+        """
+        Args:
+            turns: Utterances to speak before disconnecting
+            speech_seconds: Length of each utterance
+            pause_seconds: Silence before each utterance (also lets the server's VAD
+                           learn the noise floor before the first one)
+            response_timeout: Give up on a turn if no response audio arrives in time
+            idle_seconds: Response is considered finished after this long without audio
+            protocol: Audio protocol to offer (binary frames or legacy JSON arrays)
+            codec: Audio codec to offer; binary uplink frames use it too
+            chunk_samples: Samples per audio message (default: the browser's
+                           buffer duration at sample_rate)
+            sample_rate: Rate of the audio sent (the server resamples to 16 kHz)
+            playback_rate: Rate to ask for response audio at (default the server's)
+            reconnect_after: Drop the connection without "stop" after this many
+                             turns and reconnect to resume the session (0 = never)
+        """
+        self.url = url
+        self.turns = turns
+        self.speech_seconds = speech_seconds
+        self.pause_seconds = pause_seconds
+        self.response_timeout = response_timeout
+        self.idle_seconds = idle_seconds
+        self.offered_protocol = protocol
+        self.offered_codec = codec
+        self.token = token
+        self.sample_rate = sample_rate
+        self.playback_rate = playback_rate
+        self.reconnect_after = reconnect_after
+        self.chunk_samples = chunk_samples or BROWSER_BUFFER_SAMPLES * sample_rate // BROWSER_SAMPLE_RATE
+        
+        self.protocol = PROTOCOL_JSON
+        self.codec = create_codec(CODEC_PCM16)
+        self.encoded_chunks: Dict[int, bytes] = {}
+        self.frames_sent = 0
+        self.session_id: Optional[str] = None
+        self.results: List[Dict] = []
+        self.error: Optional[str] = None
+        
+        # Per-turn receive state, written by the receiver task
+        self.speech_end_at: Optional[float] = None
+        self.final_at: Optional[float] = None
+        self.first_audio_at: Optional[float] = None
+        self.last_audio_at: Optional[float] = None
+        self.audio_bytes = 0
+        
+        rng = np.random.default_rng()
+        samples = self.chunk_samples
+        t = np.arange(samples) / sample_rate
+        # Voiced-sounding chunk and low-level room noise
+        self.speech_chunk = (np.sin(2 * np.pi * 180 * t) * 6000 + rng.normal(0, 300, samples)).astype(np.int16)
+        self.silence_chunk = rng.normal(0, 30, samples).astype(np.int16)
+    
+    async def run(self):
+        """Connect, authenticate, run all turns and disconnect"""
+        try:
+            turns = self.turns
+            if 0 < self.reconnect_after < self.turns:
+                await self.connection(self.reconnect_after, stop=False)
+                turns -= self.reconnect_after
+                # Like a network blip: the server notices the drop before the client is back
+                await asyncio.sleep(0.2)
+            await self.connection(turns, stop=True)
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            metrics.incr("loadtest.sessions_failed")
+        else:
+            metrics.incr("loadtest.sessions_completed")
+    
+    async def connection(self, turns: int, stop: bool):
+        """One connection: authenticate (resuming the session if there is one) and run turns"""
+        start = time.monotonic()
+        async with websockets.connect(self.url, max_size=10 * 1024 * 1024) as ws:
+            auth = {
+                "type": "auth",
+                "token": self.token,
+                "protocols": [self.offered_protocol, PROTOCOL_JSON],
+                "codecs": [self.offered_codec],
+                "sample_rate": self.sample_rate
+            }
+            if self.playback_rate:
+                auth["playback_rate"] = self.playback_rate
+            if self.session_id:
+                auth["resume"] = self.session_id
+            await ws.send(json.dumps(auth))
+            ready = json.loads(await ws.recv())
+            if ready.get("type") != "ready":
+                raise RuntimeError(f"Server refused session: {ready}")
+            self.protocol = ready.get("protocol", PROTOCOL_JSON)
+            self.codec = create_codec(ready.get("codec", CODEC_PCM16), ready.get("sample_rate", SAMPLE_RATE))
+            if self.session_id and not ready.get("resumed"):
+                metrics.incr("loadtest.resume_failed")
+            self.session_id = ready.get("session_id")
+            name = "resume_ms" if ready.get("resumed") else "connect_ms"
+            metrics.observe(f"loadtest.{name}", (time.monotonic() - start) * 1000)
+            
+            receiver = asyncio.create_task(self.receive(ws))
+            try:
+                await self.speak(ws, turns)
+                if stop:
+                    await ws.send(json.dumps({"type": "stop"}))
+            finally:
+                receiver.cancel()
+                await asyncio.gather(receiver, return_exceptions=True)
+    
+    async def speak(self, ws, turns: int):
+        """Microphone loop: one chunk per chunk duration, on an absolute schedule"""
+        chunk_seconds = self.chunk_samples / self.sample_rate
+        clock = _Pacer(chunk_seconds)
+        
+        for _ in range(turns):
+            for _ in range(round(self.pause_seconds / chunk_seconds)):
+                await self.send_audio(ws, self.silence_chunk)
+                await clock.tick()
+            
+            self.final_at = self.first_audio_at = self.last_audio_at = None
+            self.audio_bytes = 0
+            
+            for _ in range(max(1, round(self.speech_seconds / chunk_seconds))):
+                await self.send_audio(ws, self.speech_chunk)
+                await clock.tick()
+            self.speech_end_at = time.monotonic()
+            
+            # Keep the "microphone" open while the assistant answers
+            while not self.turn_finished():
+                await self.send_audio(ws, self.silence_chunk)
+                await clock.tick()
+            self.finish_turn()
+    
+    async def send_audio(self, ws, samples: np.ndarray):
+        if self.protocol == PROTOCOL_BINARY_V1:
+            message = encode_audio_frame(self.encoded(samples), self.frames_sent, self.codec.frame_flag)
+        else:
+            message = json.dumps({"type": "audio", "data": samples.tolist()})
+        await ws.send(message)
+        self.frames_sent += 1
+        metrics.incr("loadtest.audio_bytes_sent", samples.nbytes)
+        metrics.incr("loadtest.wire_bytes_sent", len(message))
+    
+    def encoded(self, samples: np.ndarray) -> bytes:
+        # The client only ever sends its two fixed chunks: encode each once, so the
+        # simulated clients' codec CPU isn't counted against the in-process server
+        if self.codec.stateless:
+            encoded = self.encoded_chunks.get(id(samples))
+            if encoded is None:
+                encoded = self.encoded_chunks[id(samples)] = self.codec.encode(samples.tobytes())
+            return encoded
+        return self.codec.encode(samples.tobytes())
+    
+    async def receive(self, ws):
+        async for message in ws:
+            now = time.monotonic()
+            metrics.incr("loadtest.wire_bytes_received", len(message))
+            if isinstance(message, bytes):
+                try:
+                    kind, _flags, _sequence, payload = decode_frame(message)
+                except FrameError:
+                    metrics.incr("loadtest.bad_frames")
+                    continue
+                if kind == FRAME_AUDIO:
+                    self.on_audio(now, len(payload))
+                continue
+            
+            data = json.loads(message)
+            msg_type = data.get("type")
+            if msg_type == "final_transcript":
+                self.final_at = self.final_at or now
+            elif msg_type == "audio":
+                self.on_audio(now, len(data.get("data", [])))
+            elif msg_type == "error":
+                metrics.incr("loadtest.server_errors")
+    
+    def on_audio(self, now: float, nbytes: int):
+        self.first_audio_at = self.first_audio_at or now
+        self.last_audio_at = now
+        self.audio_bytes += nbytes
+        metrics.incr("loadtest.audio_bytes_received", nbytes)
+    
+    def turn_finished(self) -> bool:
+        now = time.monotonic()
+        if self.last_audio_at is not None:
+            return now - self.last_audio_at >= self.idle_seconds
+        return now - self.speech_end_at >= self.response_timeout
+    
+    def finish_turn(self):
+        """Record client-side latencies for the turn, measured from end of speech"""
+        result = {"audio_bytes": self.audio_bytes, "timed_out": self.first_audio_at is None}
+        for name, at in (("stt_final", self.final_at), ("first_audio", self.first_audio_at), ("last_audio", self.last_audio_at)):
+            if at is not None:
+                result[f"{name}_ms"] = (at - self.speech_end_at) * 1000
+                metrics.observe(f"loadtest.{name}_ms", result[f"{name}_ms"])
+        metrics.incr("loadtest.turns_timed_out" if result["timed_out"] else "loadtest.turns_completed")
+        self.results.append(result)
+
+
+class _Pacer:
+    """Sleeps to an absolute schedule so send time doesn't accumulate drift"""
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.next_at = time.monotonic()
+    
+    async def tick(self):
+        self.next_at += self.interval
+        delay = self.next_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            metrics.incr("loadtest.pacing_late")
@@ -0,0 +1,236 @@
+"""
+Load-test driver
+
+Ramps up to N concurrent simulated sessions and reports throughput,
+per-stage latency percentiles, CPU and RSS per connection.
+
+By default the server runs in this process with fake Azure/OpenAI backends,
+so no credentials are needed and server-side stage latencies (from the turn
+tracer) are reported alongside the client-side view. Point --url at a
+running server to drive it instead (client-side latencies only; the
+simulated clients' own CPU is then not mixed into the server's).
+
+Run from backend/:
+    python -m loadtest.driver --sessions 50 --ramp 10 --turns 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import time
+from typing import Dict, List, Optional
+import websockets
+from loadtest.client import SimulatedClient
+from loadtest.fakes import FakeResources, Latency
+from utils.audio import CODECS, CODEC_PCM16, SAMPLE_RATE
+from utils.log import setup_logging, shutdown_logging
+from utils.metrics import metrics
+from utils.tracing import trace_recorder
+from websocket.handlers import AudioMessageHandler
+from websocket.protocol import PROTOCOL_BINARY_V1, PROTOCOL_JSON
+
+
+def rss_bytes() -> int:
+    """Current resident set size (falls back to peak RSS where /proc isn't available)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class LoadTestDriver:
+    def __init__(self, url: Optional[str], sessions: int, ramp_per_second: float, client_options: Dict):
+        self.url = url
+        self.sessions = sessions
+        self.ramp_per_second = ramp_per_second
+        self.client_options = client_options
+        self.clients: List[SimulatedClient] = []
+        self.active = 0
+        self.peak_active = 0
+        self.peak_rss = 0
+    
+    async def run_session(self, client: SimulatedClient):
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            await client.run()
+        finally:
+            self.active -= 1
+    
+    async def sample_resources(self):
+        while True:
+            self.peak_rss = max(self.peak_rss, rss_bytes())
+            await asyncio.sleep(0.5)
+    
+    async def ramp(self, url: str):
+        tasks = []
+        for index in range(self.sessions):
+            client = SimulatedClient(url, **self.client_options)
+            self.clients.append(client)
+            tasks.append(asyncio.create_task(self.run_session(client)))
+            if self.ramp_per_second > 0 and index + 1 < self.sessions:
+                await asyncio.sleep(1 / self.ramp_per_second)
+        await asyncio.gather(*tasks)
+    
+    async def run(self, resources: FakeResources, port: int) -> Dict:
+        baseline_rss = rss_bytes()
+        self.peak_rss = baseline_rss
+        cpu_start = time.process_time()
+        wall_start = time.monotonic()
+        sampler = asyncio.create_task(self.sample_resources())
+        
+        try:
+            if self.url:
+                await self.ramp(self.url)
+            else:
+                async def handle_client(websocket):
+                    await AudioMessageHandler(websocket, resources=resources).handle_connection()
+                
+                async with websockets.serve(handle_client, "127.0.0.1", port, max_size=10 * 1024 * 1024):
+                    await self.ramp(f"ws://127.0.0.1:{port}")
+        finally:
+            sampler.cancel()
+        
+        wall = time.monotonic() - wall_start
+        cpu = time.process_time() - cpu_start
+        return self.report(wall, cpu, baseline_rss)
+    
+    def report(self, wall: float, cpu: float, baseline_rss: int) -> Dict:
+        snapshot = metrics.snapshot()
+        counters = snapshot["counters"]
+        observations = snapshot["observations"]
+        turns = int(counters.get("loadtest.turns_completed", 0))
+        
+        report = {
+            "sessions": self.sessions,
+            "peak_concurrent": self.peak_active,
+            "sessions_failed": int(counters.get("loadtest.sessions_failed", 0)),
+            "errors": sorted({c.error for c in self.clients if c.error}),
+            "turns_completed": turns,
+            "turns_timed_out": int(counters.get("loadtest.turns_timed_out", 0)),
+            "duration_s": round(wall, 2),
+            "throughput_turns_per_s": round(turns / wall, 2) if wall else 0.0,
+            "cpu_percent": round(100 * cpu / wall, 1) if wall else 0.0,
+            "cpu_ms_per_turn": round(1000 * cpu / turns, 2) if turns else None,
+            "rss_mb": round(self.peak_rss / 2**20, 1),
+            "rss_kb_per_connection": round((self.peak_rss - baseline_rss) / 1024 / max(1, self.peak_active), 1),
+            "pacing_late_chunks": int(counters.get("loadtest.pacing_late", 0)),
+            "resumes_failed": int(counters.get("loadtest.resume_failed", 0)),
+            "wire_kb_sent": round(counters.get("loadtest.wire_bytes_sent", 0) / 1024, 1),
+            "wire_kb_received": round(counters.get("loadtest.wire_bytes_received", 0) / 1024, 1),
+            "client_latency_ms": {
+                name[len("loadtest."):]: summary for name, summary in observations.items()
+                if name.startswith("loadtest.")
+            }
+        }
+        if not self.url:
+            report["server_latency_ms"] = trace_recorder.histograms()
+            report["prompt_tokens"] = observations.get("llm.prompt_tokens")
+            report["memory_summaries"] = int(counters.get("llm.memory.summaries", 0))
+            report["llm_requests"] = {
+                name: int(counters.get(f"llm.{name}", 0))
+                for name in ("hedge.fired", "hedge.won", "hedge.lost", "hedge.skipped", "retries", "timeouts", "stalls")
+            }
+            report["llm_first_token_ms"] = observations.get("llm.first_token_ms")
+            report["speech_sdk"] = {
+                "wait_ms": {
+                    name.rpartition(".")[2]: summary for name, summary in observations.items()
+                    if name.startswith("speech_sdk.wait_ms.")
+                },
+                "run_ms": observations.get("speech_sdk.run_ms"),
+                "skipped": int(counters.get("speech_sdk.skipped", 0))
+            }
+            report["session_ready_ms"] = {
+                name.rpartition(".")[2]: summary for name, summary in observations.items()
+                if name.startswith("session.ready_ms.")
+            }
+            report["admission"] = {
+                backend: {
+                    "queue_ms": observations.get(f"admission.{backend}.queue_ms"),
+                    "rejected": {
+                        name.rpartition(".")[2]: int(count) for name, count in counters.items()
+                        if name.startswith(f"admission.{backend}.rejected.")
+                    }
+                }
+                for backend in ("openai", "azure_tts")
+            }
+        return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Offline load test for the voice agent server")
+    parser.add_argument("--url", help="Drive a running server instead of an in-process one with fake backends")
+    parser.add_argument("--port", type=int, default=8799, help="Port for the in-process server")
+    parser.add_argument("--sessions", type=int, default=20, help="Concurrent sessions to ramp up to")
+    parser.add_argument("--ramp", type=float, default=5.0, help="New sessions per second (0 = all at once)")
+    parser.add_argument("--turns", type=int, default=3, help="Utterances per session")
+    parser.add_argument("--speech-seconds", type=float, default=1.5)
+    parser.add_argument("--pause-seconds", type=float, default=1.0)
+    parser.add_argument("--protocol", choices=[PROTOCOL_BINARY_V1, PROTOCOL_JSON], default=PROTOCOL_BINARY_V1)
+    parser.add_argument("--codec", choices=sorted(CODECS), default=CODEC_PCM16, help="Audio codec the clients offer")
+    parser.add_argument("--sample-rate", type=int, default=SAMPLE_RATE, help="Rate of the audio the clients send")
+    parser.add_argument("--playback-rate", type=int, help="Rate the clients ask for response audio at")
+    parser.add_argument(
+        "--reconnect-after", type=int, default=0, metavar="TURNS",
+        help="Drop each connection after TURNS turns and resume the session on a new one"
+    )
+    # Fake backend latencies as mean/jitter in ms
+    parser.add_argument("--stt-ms", type=float, nargs=2, default=[150, 50], metavar=("MEAN", "JITTER"))
+    parser.add_argument("--llm-first-token-ms", type=float, nargs=2, default=[300, 100], metavar=("MEAN", "JITTER"))
+    parser.add_argument(
+        "--llm-first-token-tail", type=float, nargs=2, default=[0, 0], metavar=("RATE", "MS"),
+        help="Share of requests whose first token takes MS longer (to exercise hedging)"
+    )
+    parser.add_argument("--llm-token-ms", type=float, nargs=2, default=[15, 5], metavar=("MEAN", "JITTER"))
+    parser.add_argument("--tts-ms", type=float, nargs=2, default=[120, 40], metavar=("MEAN", "JITTER"))
+    parser.add_argument(
+        "--tts-sdk-ms", type=float, nargs=2, default=[0, 0], metavar=("MEAN", "JITTER"),
+        help="Blocking Speech SDK work per sentence, run on the SDK executor (to exercise its priorities)"
+    )
+    parser.add_argument("--output", help="Also write the report to this JSON file")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    setup_logging()
+    
+    resources = FakeResources(
+        stt_latency=Latency(*args.stt_ms),
+        llm_first_token=Latency(*args.llm_first_token_ms, *args.llm_first_token_tail),
+        llm_token=Latency(*args.llm_token_ms),
+        tts_latency=Latency(*args.tts_ms),
+        tts_sdk_latency=Latency(*args.tts_sdk_ms) if args.tts_sdk_ms[0] else None
+    )
+    driver = LoadTestDriver(
+        args.url,
+        args.sessions,
+        args.ramp,
+        client_options={
+            "turns": args.turns,
+            "speech_seconds": args.speech_seconds,
+            "pause_seconds": args.pause_seconds,
+            "protocol": args.protocol,
+            "codec": args.codec,
+            "sample_rate": args.sample_rate,
+            "playback_rate": args.playback_rate,
+            "reconnect_after": args.reconnect_after
+        }
+    )
+    
+    try:
+        report = asyncio.run(driver.run(resources, args.port))
+    finally:
+        shutdown_logging()
+    
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+
+
+if __name__ == "__main__":
+    main()
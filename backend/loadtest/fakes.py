@@ -0,0 +1,369 @@
+"""
+Local stand-ins for Azure Speech and OpenAI
+
+They implement the same interfaces the connection handler uses on AzureSTT,
+AzureTTS and LLMClient, with configurable latency/jitter and scripted
+transcripts, tokens and PCM, so the server can be load-tested offline.
+"""
+import asyncio
+import random
+import time
+from typing import AsyncGenerator, Awaitable, Callable, Dict, List, Optional, Union
+import numpy as np
+from auth.auth import TokenValidator, VoiceBiometric
+from config.settings import settings
+from llm.intent import intent_resolver
+from llm.memory import ConversationMemory, Turn, estimate_tokens, message_tokens
+from llm.openai_client import RESPONSE_MAX_TOKENS
+from llm.request_policy import LLMTimeout, request_policy
+from speech.ring_buffer import AudioRingBuffer
+from speech.sdk_executor import PRIORITY_SEGMENT, sdk_executor
+from speech.stt import record_ring_stats
+from speech.tts import AzureTTS
+from speech.tts_cache import TTSCache
+from utils.admission import AdmissionError, openai_limiter
+from utils.audio import AudioCodec, SAMPLE_RATE
+from utils.log import get_logger
+from utils.metrics import metrics
+from utils.resources import ResourceRegistry
+
+DEFAULT_TRANSCRIPTS = [
+    "What's the weather like today",
+    "Book a table for two at seven",
+    "Remind me to call my mother tomorrow",
+    "How long will it take to get to the airport"
+]
+
+DEFAULT_RESPONSE = (
+    "Sure, I can help with that. Let me check the details for you. "
+    "It looks like everything is set. Is there anything else you need?"
+)
+
+
+class Latency:
+    """A delay of mean_ms +/- jitter_ms (uniform), plus tail_ms in a tail_rate share of cases"""
+    
+    def __init__(self, mean_ms: float = 0.0, jitter_ms: float = 0.0, tail_rate: float = 0.0, tail_ms: float = 0.0):
+        self.mean_ms = mean_ms
+        self.jitter_ms = jitter_ms
+        self.tail_rate = tail_rate
+        self.tail_ms = tail_ms
+    
+    def sample(self) -> float:
+        """Delay in seconds"""
+        delay = max(0.0, self.mean_ms + random.uniform(-self.jitter_ms, self.jitter_ms))
+        if self.tail_rate and random.random() < self.tail_rate:
+            delay += self.tail_ms
+        return delay / 1000
+    
+    async def wait(self):
+        delay = self.sample()
+        if delay:
+            await asyncio.sleep(delay)
+
+
+class FakeSTT:
+    """
+    Energy-based stand-in for AzureSTT
+    
+    Loud audio counts as speech. While the caller speaks, partial hypotheses
+    (growing prefixes of the scripted transcript) are emitted every
+    partial_interval_ms; once endpoint_ms of quiet audio follows speech, the
+    final transcript is delivered after final_latency.
+    """
+    
+    def __init__(
+        self,
+        on_recognized: Callable[[str], Awaitable],
+        on_recognizing: Optional[Callable[[str], Awaitable]] = None,
+        session_id: str = "-",
+        transcripts: Optional[List[str]] = None,
+        final_latency: Optional[Latency] = None,
+        partial_interval_ms: int = 300,
+        endpoint_ms: int = 500,
+        speech_rms: float = 500.0,
+        sample_rate: int = 16000,
+        frame_ms: int = 20,
+        buffer_ms: int = 2000
+    ):
+        self.on_recognized_callback = on_recognized
+        self.on_recognizing_callback = on_recognizing
+        self.log = get_logger("loadtest.stt", session_id)
+        self.transcripts = transcripts or DEFAULT_TRANSCRIPTS
+        self.final_latency = final_latency or Latency(150, 50)
+        self.partial_samples = partial_interval_ms * sample_rate // 1000
+        self.endpoint_samples = endpoint_ms * sample_rate // 1000
+        self.speech_rms = speech_rms
+        
+        # Same release as AzureSTT; audio is "recognized" straight off the ring
+        self.ring = AudioRingBuffer(sample_rate * 2 * frame_ms // 1000, buffer_ms // frame_ms)
+        
+        self.is_running = False
+        self.is_closed = False
+        self.warm = False  # Never pooled
+        self.bytes_pushed = 0
+        self.last_final_at = None
+        self.utterances = 0
+        self._speech_samples = 0
+        self._silence_samples = 0
+        self._tasks = set()
+    
+    async def start(self):
+        self.is_running = True
+        self._recognize(self.ring.release())
+    
+    def rebind(self, on_recognized, on_recognizing=None):
+        self.on_recognized_callback = on_recognized
+        self.on_recognizing_callback = on_recognizing
+    
+    def stop(self):
+        if self.is_closed:
+            return
+        self.is_closed = True
+        self.is_running = False
+        for task in self._tasks:
+            task.cancel()
+        record_ring_stats(self.ring)
+    
+    def push_audio(self, audio_bytes: Union[bytes, memoryview]):
+        if self.is_closed:
+            return
+        self.ring.write(audio_bytes)
+        if self.is_running:
+            self._recognize(self.ring.release())
+    
+    def _recognize(self, spans):
+        frame_samples = self.ring.frame_bytes // 2
+        for offset, size in spans:
+            self.bytes_pushed += size
+            samples = np.frombuffer(self.ring.memory[offset:offset + size], dtype=np.int16).astype(np.float32)
+            # Judged frame by frame, so a batch straddling speech and silence isn't all speech
+            frames = len(samples) // frame_samples
+            levels = np.sqrt(np.mean(samples[:frames * frame_samples].reshape(frames, frame_samples) ** 2, axis=1))
+            for level in levels.tolist():
+                self._on_frame(level, frame_samples)
+            if len(samples) % frame_samples:
+                tail = samples[frames * frame_samples:]
+                self._on_frame(float(np.sqrt(np.mean(tail ** 2))), len(tail))
+    
+    def _on_frame(self, rms: float, samples: int):
+        if rms >= self.speech_rms:
+            before = self._speech_samples
+            self._speech_samples += samples
+            self._silence_samples = 0
+            if self.on_recognizing_callback and before // self.partial_samples != self._speech_samples // self.partial_samples:
+                self._schedule(self.on_recognizing_callback(self._partial_text()))
+        elif self._speech_samples:
+            self._silence_samples += samples
+            if self._silence_samples >= self.endpoint_samples:
+                text = self.transcripts[self.utterances % len(self.transcripts)]
+                self.utterances += 1
+                self._speech_samples = 0
+                self._silence_samples = 0
+                self._schedule(self._deliver_final(text))
+    
+    def _partial_text(self) -> str:
+        words = self.transcripts[self.utterances % len(self.transcripts)].split()
+        count = max(1, self._speech_samples // self.partial_samples)
+        return " ".join(words[:count])
+    
+    async def _deliver_final(self, text: str):
+        await self.final_latency.wait()
+        self.last_final_at = time.monotonic()
+        self.log.debug("RECOGNIZED: '%s'", text)
+        if self.on_recognized_callback:
+            await self.on_recognized_callback(text)
+    
+    def _schedule(self, coro):
+        # Same contract as AzureSTT: callbacks run as tasks on the event loop
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+
+class FakeLLM:
+    """
+    Stand-in for LLMClient that streams a scripted response token by token
+    
+    Turns go through the same ConversationMemory, with summaries that take
+    summary_latency, so prompt growth and eviction show up under load.
+    Intents go through the same local classifier; only utterances it isn't
+    sure about pay intent_latency. Every simulated request goes through
+    the shared openai_limiter, and responses through the request policy
+    (hedging, deadlines), like LLMClient's.
+    """
+    
+    def __init__(
+        self,
+        response: str = DEFAULT_RESPONSE,
+        first_token_latency: Optional[Latency] = None,
+        token_latency: Optional[Latency] = None,
+        intent_latency: Optional[Latency] = None,
+        summary_latency: Optional[Latency] = None
+    ):
+        self.response = response
+        self.first_token_latency = first_token_latency or Latency(300, 100)
+        self.token_latency = token_latency or Latency(15, 5)
+        self.intent_latency = intent_latency or Latency(250, 80)
+        self.summary_latency = summary_latency or Latency(400, 100)
+        self.memory = None
+        if settings.LLM_MEMORY_ENABLED:
+            self.memory = ConversationMemory(self.summarize, max_tokens=settings.LLM_MEMORY_MAX_TOKENS)
+    
+    async def generate_response(
+        self,
+        user_input: str,
+        context: Optional[Dict] = None,
+        stream: bool = True
+    ) -> AsyncGenerator[str, None]:
+        prompt_tokens = estimate_tokens(user_input)
+        if self.memory:
+            messages = self.memory.build_messages("You are a load test.", user_input, str(context))
+            prompt_tokens = sum(message_tokens(message) for message in messages)
+            metrics.observe("llm.prompt_tokens", prompt_tokens)
+        
+        chunks = []
+        replies = request_policy.stream(lambda: self.request_reply(prompt_tokens), can_hedge=openai_limiter.has_capacity)
+        try:
+            async for text in replies:
+                chunks.append(text)
+                yield text
+        except (AdmissionError, LLMTimeout):
+            if not chunks:
+                yield "I'm sorry, I'm a little busy right now."
+        finally:
+            await replies.aclose()
+            if self.memory and chunks:
+                self.memory.add_turn(user_input, "".join(chunks))
+    
+    async def request_reply(self, prompt_tokens: int) -> AsyncGenerator[str, None]:
+        async with openai_limiter.admit(prompt_tokens + RESPONSE_MAX_TOKENS) as admission:
+            await self.first_token_latency.wait()
+            for index, word in enumerate(self.response.split(" ")):
+                if index:
+                    await self.token_latency.wait()
+                yield word if index == 0 else " " + word
+            admission.charge(prompt_tokens + estimate_tokens(self.response))
+    
+    async def summarize(self, summary: str, turns: List[Turn]) -> str:
+        async with openai_limiter.admit(estimate_tokens(summary) + settings.LLM_MEMORY_SUMMARY_TOKENS, bounded=False):
+            await self.summary_latency.wait()
+        # Stays about as long as a real summary capped at LLM_MEMORY_SUMMARY_TOKENS
+        return " ".join([summary] + [user for user, _ in turns])[-settings.LLM_MEMORY_SUMMARY_TOKENS * 4:]
+    
+    def close(self):
+        if self.memory:
+            self.memory.close()
+    
+    async def extract_intent(self, user_input: str) -> Dict:
+        return await intent_resolver.resolve(user_input, self.llm_intent)
+    
+    async def llm_intent(self, user_input: str) -> Optional[Dict]:
+        try:
+            async with openai_limiter.admit(estimate_tokens(user_input) + 100):
+                await self.intent_latency.wait()
+        except AdmissionError:
+            return None
+        return {"intent": "loadtest", "entities": {}, "confidence": 1.0, "source": "llm"}
+
+
+class FakeTTS(AzureTTS):
+    """
+    AzureTTS with synthesis replaced by a timed tone
+    
+    Sentence splitting and pipelining are inherited, so the server-side
+    streaming path is exercised as in production. Audio length follows
+    the text length (ms_per_char), like real speech, and is streamed in
+    chunk_ms pieces, each taking chunk_latency to "synthesize". With
+    sdk_latency, each sentence first makes a blocking call of that length
+    on sdk_executor at its priority, standing in for SDK setup work.
+    """
+    
+    def __init__(
+        self,
+        voice_name: str = "en-US-JennyNeural",
+        latency: Optional[Latency] = None,
+        ms_per_char: float = 60.0,
+        chunk_ms: int = 100,
+        chunk_latency: Optional[Latency] = None,
+        sdk_latency: Optional[Latency] = None,
+        sample_rate: int = 16000,
+        codec: Optional[AudioCodec] = None,
+        output_rate: int = SAMPLE_RATE
+    ):
+        super().__init__(voice_name, codec=codec, output_rate=output_rate)
+        self.cache = TTSCache(max_bytes=0)  # Every sentence pays the synthesis latency
+        self.latency = latency or Latency(120, 40)
+        self.chunk_latency = chunk_latency or Latency(10, 3)
+        self.sdk_latency = sdk_latency
+        self.ms_per_char = ms_per_char
+        self.chunk_samples = chunk_ms * sample_rate // 1000
+        self.sample_rate = sample_rate
+    
+    async def _synthesize(self, text: str, priority: int = PRIORITY_SEGMENT) -> AsyncGenerator[bytes, None]:
+        if self.sdk_latency:
+            await sdk_executor.run(time.sleep, self.sdk_latency.sample(), priority=priority)
+        await self.latency.wait()
+        n = int(len(text) * self.ms_per_char * self.sample_rate / 1000)
+        t = np.arange(n, dtype=np.float32) / self.sample_rate
+        audio = (np.sin(2 * np.pi * 220 * t) * 3000).astype(np.int16).tobytes()
+        
+        step = self.chunk_samples * 2
+        for offset in range(0, len(audio), step):
+            if offset:
+                await self.chunk_latency.wait()
+            yield audio[offset:offset + step]
+
+
+class FakeResources(ResourceRegistry):
+    """Resource registry handing out fakes, for AudioMessageHandler(resources=...)"""
+    
+    def __init__(
+        self,
+        stt_latency: Optional[Latency] = None,
+        llm_first_token: Optional[Latency] = None,
+        llm_token: Optional[Latency] = None,
+        tts_latency: Optional[Latency] = None,
+        tts_sdk_latency: Optional[Latency] = None,
+        transcripts: Optional[List[str]] = None,
+        response: str = DEFAULT_RESPONSE
+    ):
+        # Deliberately skip ResourceRegistry.__init__: no SDK pools or API clients
+        self.token_validator = TokenValidator()
+        self.voice_biometric = VoiceBiometric()
+        self.stt_latency = stt_latency
+        self.llm_first_token = llm_first_token
+        self.llm_token = llm_token
+        self.tts_latency = tts_latency
+        self.tts_sdk_latency = tts_sdk_latency
+        self.transcripts = transcripts
+        self.response = response
+    
+    def create_stt(self, on_recognized, on_recognizing=None, session_id: str = "-") -> FakeSTT:
+        return FakeSTT(
+            on_recognized, on_recognizing, session_id,
+            transcripts=self.transcripts,
+            final_latency=self.stt_latency,
+            frame_ms=settings.STT_FRAME_MS,
+            buffer_ms=settings.STT_BUFFER_MS
+        )
+    
+    def create_tts(
+        self,
+        voice_name: str = "en-US-JennyNeural",
+        codec: Optional[AudioCodec] = None,
+        output_rate: int = SAMPLE_RATE
+    ) -> FakeTTS:
+        return FakeTTS(
+            voice_name,
+            latency=self.tts_latency,
+            sdk_latency=self.tts_sdk_latency,
+            codec=codec,
+            output_rate=output_rate
+        )
+    
+    def create_llm(self) -> FakeLLM:
+        return FakeLLM(self.response, self.llm_first_token, self.llm_token)
+    
+    def stats(self) -> Dict:
+        return {}
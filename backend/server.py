@@ -1,20 +1,72 @@
 import asyncio
+import signal
+import time
 import websockets
 from config.settings import settings
+from speech.sdk_executor import sdk_executor
+from supervisor import WorkerSupervisor
+from utils.log import get_logger, setup_logging, shutdown_logging
+from utils.resources import registry
 from websocket.handlers import AudioMessageHandler
+from websocket.sessions import session_store
+
+logger = get_logger("server")
+
+# Live connections in this process, used for connection limits and draining
+active_connections = set()
 
 async def handle_client(websocket):
     """Handle new WebSocket connection"""
-    print(f"New connection from {websocket.remote_address}")
+    limit = settings.WS_MAX_CONNECTIONS_PER_WORKER
+    if limit and len(active_connections) >= limit:
+        logger.warning("Rejecting connection from %s: worker at capacity (%d)", websocket.remote_address, limit)
+        await websocket.close(1013, "Server busy, try again")  # 1013 = Try Again Later
+        return
+    
+    logger.info("New connection from %s", websocket.remote_address)
+    
+    active_connections.add(websocket)
+    try:
+        handler = AudioMessageHandler(websocket)
+        await handler.handle_connection()
+    finally:
+        active_connections.discard(websocket)
+    
+    logger.info("Connection closed from %s", websocket.remote_address)
+
+async def drain(server):
+    """Stop accepting connections and give live calls time to finish"""
+    server.server.close()
+    
+    deadline = time.monotonic() + settings.WS_DRAIN_TIMEOUT
+    if active_connections:
+        logger.info("Draining %d live connections (up to %ss)...", len(active_connections), settings.WS_DRAIN_TIMEOUT)
+    while active_connections and time.monotonic() < deadline:
+        await asyncio.sleep(0.5)
     
-    handler = AudioMessageHandler(websocket)
-    await handler.handle_connection()
+    if active_connections:
+        logger.warning("Closing %d connections still open after drain timeout", len(active_connections))
+    # Close what's left and wait for the handlers to clean up (they may park sessions)
+    server.close()
+    await server.wait_closed()
     
-    print(f"Connection closed from {websocket.remote_address}")
+    # Nobody can reconnect to this worker any more
+    session_store.close()
+
+async def send_heartbeats(heartbeat):
+    """Let the supervisor know this worker's event loop is responsive"""
+    while True:
+        heartbeat.value = time.monotonic()
+        await asyncio.sleep(1.0)
 
-async def main():
+async def main(reuse_port: bool = False, heartbeat=None):
     """Start the WebSocket server"""
-    print(f"Starting voice agent server on ws://{settings.WS_HOST}:{settings.WS_PORT}")
+    logger.info("Starting voice agent server on ws://%s:%d", settings.WS_HOST, settings.WS_PORT)
+    
+    loop = asyncio.get_running_loop()
+    stop = loop.create_future()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, lambda: stop.done() or stop.set_result(None))
     
     async with websockets.serve(
         handle_client,
@@ -22,12 +74,39 @@ async def main():
         settings.WS_PORT,
         max_size=10 * 1024 * 1024,  # 10MB max message size for audio
         ping_interval=20,
-        ping_timeout=10
-    ):
-        await asyncio.Future()  # Run forever
+        ping_timeout=10,
+        reuse_port=reuse_port
+    ) as server:
+        heartbeat_task = asyncio.create_task(send_heartbeats(heartbeat)) if heartbeat is not None else None
+        registry.start()
+        
+        await stop  # Run until SIGTERM/SIGINT
+        await drain(server)
+        registry.close()
+        sdk_executor.shutdown()  # Lets queued recognizer stops reach the service
+        
+        if heartbeat_task:
+            heartbeat_task.cancel()
+
+def run_worker(worker_id: int, heartbeat):
+    """Entry point for one process in multi-worker mode"""
+    setup_logging()
+    logger.info("Worker %d starting", worker_id)
+    try:
+        asyncio.run(main(reuse_port=True, heartbeat=heartbeat))
+    finally:
+        logger.info("Worker %d stopped", worker_id)
+        shutdown_logging()
 
 if __name__ == "__main__":
+    setup_logging()
     try:
-        asyncio.run(main())
-    except KeyboardInterrupt:
-        print("\nServer stopped")
\ No newline at end of file
+        if settings.WS_WORKERS > 1 and WorkerSupervisor.reuse_port_supported():
+            WorkerSupervisor(run_worker, settings.WS_WORKERS).run()
+        else:
+            if settings.WS_WORKERS > 1:
+                logger.warning("SO_REUSEPORT is not available on this platform, running a single worker")
+            asyncio.run(main())
+            logger.info("Server stopped")
+    finally:
+        shutdown_logging()
@@ -0,0 +1,122 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+from speech.sdk_executor import PRIORITY_BACKGROUND, sdk_executor
+from speech.stt import PreparedRecognizer
+from utils.log import get_logger
+from utils.metrics import metrics
+
+logger = get_logger("stt.pool")
+
+
+class RecognizerPool:
+    """
+    Recognizers built and connected to the service before sessions need them
+    
+    A new session takes one (acquire) instead of building its own and
+    opening a connection while the client waits for "ready"; the pool then
+    tops itself back up to `size` on an sdk_executor thread. Recognizers are
+    single use, so nothing is given back. The service closes connections
+    that stay idle, so recognizers older than max_age_s are dropped rather
+    than handed out, and maintain() replaces them while traffic is quiet.
+    
+    acquire() from the event loop thread; recognizers are built off it.
+    """
+    
+    def __init__(
+        self,
+        size: int,
+        max_age_s: float,
+        create: Callable[[], PreparedRecognizer] = lambda: PreparedRecognizer(connect=True)
+    ):
+        self.size = size
+        self.max_age = max_age_s
+        self.create = create
+        self._idle: Deque[PreparedRecognizer] = deque()  # Oldest first
+        self._lock = threading.Lock()
+        self._filling = False
+        
+        self.hits = 0
+        self.misses = 0
+        self.created = 0
+        self.expired = 0
+    
+    def acquire(self) -> Optional[PreparedRecognizer]:
+        """The oldest recognizer still fresh enough to use (None if the pool is empty)"""
+        stale = self._take_stale()
+        with self._lock:
+            prepared = self._idle.popleft() if self._idle else None
+        
+        if prepared is None:
+            self.misses += 1
+            metrics.incr("stt_pool.miss")
+        else:
+            self.hits += 1
+            metrics.incr("stt_pool.hit")
+        self.refill(stale)
+        return prepared
+    
+    def _take_stale(self) -> List[PreparedRecognizer]:
+        cutoff = time.monotonic() - self.max_age
+        stale = []
+        with self._lock:
+            while self._idle and self._idle[0].created_at < cutoff:
+                stale.append(self._idle.popleft())
+        if stale:
+            self.expired += len(stale)
+            metrics.incr("stt_pool.expired", len(stale))
+        return stale
+    
+    def refill(self, stale: Optional[List[PreparedRecognizer]] = None):
+        """Close stale recognizers and build replacements in the background"""
+        with self._lock:
+            start = not self._filling and len(self._idle) < self.size
+            self._filling = self._filling or start
+        if start or stale:
+            sdk_executor.submit(self._fill, stale or [], start, priority=PRIORITY_BACKGROUND)
+    
+    def _fill(self, stale: List[PreparedRecognizer], fill: bool):
+        for prepared in stale:
+            prepared.close()
+        if not fill:
+            return
+        try:
+            while True:
+                with self._lock:
+                    if len(self._idle) >= self.size:
+                        break
+                prepared = self.create()
+                with self._lock:
+                    self._idle.append(prepared)
+                self.created += 1
+                metrics.incr("stt_pool.created")
+        except Exception as e:
+            # Wait for the next acquire or maintenance pass rather than retrying in a loop
+            logger.warning("Could not prepare a recognizer: %s", e)
+        finally:
+            with self._lock:
+                self._filling = False
+                metrics.gauge("stt_pool.idle", len(self._idle))
+    
+    async def maintain(self):
+        """Keep the pool full and fresh while no sessions are taking from it"""
+        while True:
+            self.refill(self._take_stale())
+            await asyncio.sleep(max(1.0, self.max_age / 4))
+    
+    def close(self):
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for prepared in idle:
+            prepared.close()
+    
+    def stats(self) -> Dict:
+        return {
+            "idle": len(self._idle),
+            "hits": self.hits,
+            "misses": self.misses,
+            "created": self.created,
+            "expired": self.expired
+        }
@@ -0,0 +1,108 @@
+from typing import Dict, List, Tuple, Union
+
+
+class AudioRingBuffer:
+    """
+    Preallocated byte ring between inbound audio and the recognizer
+    
+    Inbound chunks of any size are copied straight from the frame payload
+    into one bytearray allocated per session. The consumer takes audio back
+    out once at least a frame is buffered, as (offset, nbytes) spans of
+    `memory` that it must use before the next write: everything buffered
+    at once, so small chunks are batched up to a frame, while larger ones
+    go through whole instead of leaving a remainder to wait for the next
+    chunk (which would hold back the end of an utterance). A release wraps
+    the end of the ring at most once, so it is one or two spans.
+    
+    When a write doesn't fit, the oldest whole frames are dropped (an
+    overrun): late audio is worth more to the recognizer than stale audio.
+    """
+    
+    def __init__(self, frame_bytes: int, capacity_frames: int):
+        self.frame_bytes = frame_bytes
+        self.capacity = frame_bytes * max(1, capacity_frames)
+        self._buffer = bytearray(self.capacity)
+        self.memory = memoryview(self._buffer)
+        
+        # Running byte counts; positions in the ring are these modulo capacity
+        self._read = 0
+        self._write = 0
+        
+        self.bytes_in = 0
+        self.peak_bytes = 0
+        self.overrun_bytes = 0
+        self.overruns = 0
+        self.bytes_out = 0
+        self.releases = 0
+    
+    def __len__(self) -> int:
+        return self._write - self._read
+    
+    def write(self, data: Union[bytes, memoryview]) -> int:
+        """Copy a chunk in; returns the bytes of older audio dropped to fit it"""
+        view = memoryview(data).cast("B")
+        size = view.nbytes
+        if not size:
+            return 0
+        self.bytes_in += size
+        
+        dropped = 0
+        if size > self.capacity - len(self):
+            if size >= self.capacity:
+                # Larger than the whole ring: only its newest part can be kept
+                dropped = len(self) + size - self.capacity
+                view = view[size - self.capacity:]
+                size = self.capacity
+                self._read = self._write = 0
+            else:
+                excess = size - (self.capacity - len(self))
+                drop = -(-excess // self.frame_bytes) * self.frame_bytes
+                if drop >= len(self):
+                    dropped = len(self)
+                    self._read = self._write = 0
+                else:
+                    dropped = drop
+                    self._read += drop
+            self.overrun_bytes += dropped
+            self.overruns += 1
+        
+        position = self._write % self.capacity
+        first = min(size, self.capacity - position)
+        self.memory[position:position + first] = view[:first]
+        if size > first:
+            self.memory[:size - first] = view[first:]
+        self._write += size
+        self.peak_bytes = max(self.peak_bytes, len(self))
+        return dropped
+    
+    def release(self) -> List[Tuple[int, int]]:
+        """Everything buffered if that is at least a frame, as at most two (offset, nbytes) spans"""
+        if len(self) < self.frame_bytes:
+            return []
+        return self._take(len(self))
+    
+    def release_tail(self) -> List[Tuple[int, int]]:
+        """Everything left, even short of a frame (end of the stream)"""
+        return self._take(len(self)) if len(self) else []
+    
+    def _take(self, size: int) -> List[Tuple[int, int]]:
+        position = self._read % self.capacity
+        first = min(size, self.capacity - position)
+        spans = [(position, first)]
+        if size > first:
+            spans.append((0, size - first))
+        # Always empty now: restart at offset 0 so the next release doesn't wrap
+        self._read = self._write = 0
+        self.bytes_out += size
+        self.releases += 1
+        return spans
+    
+    def stats(self) -> Dict:
+        return {
+            "buffered_bytes": len(self),
+            "peak_bytes": self.peak_bytes,
+            "overrun_bytes": self.overrun_bytes,
+            "overruns": self.overruns,
+            "bytes_out": self.bytes_out,
+            "releases": self.releases
+        }
@@ -0,0 +1,182 @@
+import asyncio
+import itertools
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from config.settings import settings
+from utils.log import get_logger
+from utils.metrics import metrics
+
+logger = get_logger("speech.sdk")
+
+# Lower runs first; calls of equal priority run in the order they were queued
+PRIORITY_FIRST_SEGMENT = 0  # Synthesis of the first audio of a response
+PRIORITY_SESSION = 1  # Getting a new session's recognizer going
+PRIORITY_SEGMENT = 2  # Synthesis of later segments
+PRIORITY_BACKGROUND = 3  # Stopping recognizers, refilling pools
+
+PRIORITY_NAMES = {
+    PRIORITY_FIRST_SEGMENT: "first_segment",
+    PRIORITY_SESSION: "session",
+    PRIORITY_SEGMENT: "segment",
+    PRIORITY_BACKGROUND: "background"
+}
+
+
+class _Job:
+    """One queued call; future is set (on loop) for run(), None for submit()"""
+    
+    __slots__ = ("fn", "args", "priority", "queued_at", "loop", "future", "cancelled")
+    
+    def __init__(self, fn: Callable, args: tuple, priority: int, loop=None, future=None):
+        self.fn = fn
+        self.args = args
+        self.priority = priority
+        self.queued_at = time.monotonic()
+        self.loop = loop
+        self.future = future
+        self.cancelled = False
+
+
+def _resolve(future: asyncio.Future, result: Any, error: Optional[BaseException]):
+    if future.done():
+        return  # The caller stopped waiting
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+
+
+class SDKExecutor:
+    """
+    Dedicated threads for blocking Speech SDK calls, run in priority order
+    
+    The event loop's default executor is small, shared with file I/O and
+    CPU work, and first in first out, so under load the first segment of
+    one response could wait behind the later segments of others. Here each
+    call carries a priority (PRIORITY_*) and a free worker takes the most
+    urgent one waiting. Priorities don't preempt: a call already running
+    finishes first. A call whose caller was cancelled before it started is
+    skipped. With prioritized=False calls run in arrival order.
+    
+    Metrics: speech_sdk.wait_ms.<priority> (queued until a worker took it),
+    speech_sdk.run_ms, speech_sdk.skipped / .errors, and the queue_depth /
+    busy gauges. Workers are daemon threads started on first use, so a call
+    stuck in the SDK can't hold up process exit. After shutdown() calls go
+    to the event loop's default executor, never run on the calling thread.
+    """
+    
+    def __init__(self, workers: int, prioritized: bool = True):
+        self.workers = max(1, workers)
+        self.prioritized = prioritized
+        self._queue: "queue.PriorityQueue" = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.closed = False
+        self.busy = 0
+        self.completed = 0
+    
+    def submit(self, fn: Callable, *args, priority: int = PRIORITY_BACKGROUND):
+        """Queue a call without waiting for it; its errors are logged"""
+        self._put(_Job(fn, args, priority))
+    
+    async def run(self, fn: Callable, *args, priority: int = PRIORITY_BACKGROUND) -> Any:
+        """Run a call on a worker and return its result (or raise its error)"""
+        loop = asyncio.get_running_loop()
+        job = _Job(fn, args, priority, loop, loop.create_future())
+        self._put(job)
+        try:
+            return await job.future
+        except asyncio.CancelledError:
+            job.cancelled = True
+            raise
+    
+    def _put(self, job: _Job):
+        with self._lock:
+            closed = self.closed
+            if not closed:
+                while len(self._threads) < self.workers:
+                    thread = threading.Thread(target=self._work, name=f"speech-sdk-{len(self._threads)}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+        if closed:
+            # Shut down (late cleanup): still off the caller's thread, just without priorities
+            loop = job.loop
+            if loop is None:
+                try:
+                    loop = asyncio.get_running_loop()
+                except RuntimeError:
+                    raise RuntimeError("Speech SDK executor is shut down") from None
+            loop.run_in_executor(None, self._execute, job)
+            return
+        
+        rank = job.priority if self.prioritized else 0
+        self._queue.put((rank, next(self._sequence), job))
+        metrics.gauge("speech_sdk.queue_depth", self._queue.qsize())
+    
+    def _work(self):
+        while True:
+            _, _, job = self._queue.get()
+            if job is None:
+                return
+            metrics.gauge("speech_sdk.queue_depth", self._queue.qsize())
+            self._execute(job)
+    
+    def _execute(self, job: _Job):
+        if job.cancelled:
+            metrics.incr("speech_sdk.skipped")
+            return
+        started = time.monotonic()
+        metrics.observe(f"speech_sdk.wait_ms.{PRIORITY_NAMES[job.priority]}", (started - job.queued_at) * 1000)
+        with self._lock:
+            self.busy += 1
+            metrics.gauge("speech_sdk.busy", self.busy)
+        
+        result = error = None
+        try:
+            result = job.fn(*job.args)
+        except Exception as e:
+            error = e
+            metrics.incr("speech_sdk.errors")
+        finally:
+            with self._lock:
+                self.busy -= 1
+                self.completed += 1
+                metrics.gauge("speech_sdk.busy", self.busy)
+            metrics.observe("speech_sdk.run_ms", (time.monotonic() - started) * 1000)
+        
+        if job.future is None:
+            if error is not None:
+                logger.error("Speech SDK call %s failed: %s", getattr(job.fn, "__qualname__", job.fn), error)
+            return
+        try:
+            job.loop.call_soon_threadsafe(_resolve, job.future, result, error)
+        except RuntimeError:
+            pass  # Event loop already closed
+    
+    def shutdown(self, timeout: float = 10.0):
+        """Let queued calls finish (for up to timeout seconds) and stop the workers"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+            self.closed = True
+        for _ in threads:
+            self._queue.put((float("inf"), next(self._sequence), None))
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if any(thread.is_alive() for thread in threads):
+            logger.warning("Speech SDK calls still running after %.0f s, not waiting for them", timeout)
+    
+    def stats(self) -> Dict:
+        return {
+            "workers": self.workers,
+            "busy": self.busy,
+            "queued": self._queue.qsize(),
+            "completed": self.completed
+        }
+
+
+# Create a singleton instance (shared by every connection in the process)
+sdk_executor = SDKExecutor(settings.SPEECH_SDK_WORKERS, prioritized=settings.SPEECH_SDK_PRIORITY)
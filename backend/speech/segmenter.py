@@ -0,0 +1,244 @@
+import asyncio
+import re
+import time
+from typing import AsyncGenerator, List, Optional
+from config.settings import settings
+
+# Words that end with a period without ending the sentence
+TITLE_ABBREVIATIONS = {"mr", "mrs", "ms", "dr", "prof", "st", "mt", "jr", "sr", "gen", "sgt", "capt", "rev"}
+# Only a boundary when the next word starts with a capital letter
+ABBREVIATIONS = {"etc", "vs", "approx", "dept", "est", "fig", "inc", "ltd", "co", "no", "vol", "min", "max", "e.g", "i.e", "a.m", "p.m", "u.s"}
+
+_SENTENCE_END = re.compile(r"[.!?…]+[\"')\]]*(?=\s|$)|\n")
+_CLAUSE_END = re.compile(r"[,;:]+[\"')\]]*(?=\s)|\s[–—-]{1,2}(?=\s)")
+_WORD_BEFORE = re.compile(r"([A-Za-z][A-Za-z.]*)$")
+
+
+class TextSegmenter:
+    """
+    Incremental LLM-text-to-TTS segmenter
+    
+    The first segment of a response is cut as early as it reasonably can be
+    (a short clause at a comma, a word limit, or a timeout) to get the first
+    audio out quickly. Later segments are whole sentences merged up to
+    min_chars, which gives better prosody and fewer TTS requests; the audio
+    of the first segment covers their extra wait.
+    
+    Boundaries are found in the accumulated text rather than in the latest
+    chunk, so punctuation split across tokens is seen. A period doesn't end
+    a sentence after an abbreviation ("Dr.", "e.g.") or an initial, and is
+    held back while it may still turn out to be part of "3.5" or "p.m.".
+    
+    Not tied to the event loop: pass `now` (seconds) to feed()/poll().
+    """
+    
+    def __init__(
+        self,
+        first_min_words: Optional[int] = None,
+        first_max_words: Optional[int] = None,
+        first_timeout_ms: Optional[int] = None,
+        min_chars: Optional[int] = None,
+        max_chars: Optional[int] = None
+    ):
+        """
+        Args default to the TTS_SEGMENT_* settings.
+        
+        Args:
+            first_min_words: Words needed before the first segment may end at a clause
+            first_max_words: First segment is cut at a word boundary once this long
+            first_timeout_ms: First segment is cut at a word boundary (if it has
+                              first_min_words) once text has waited this long
+            min_chars: Later segments keep merging sentences until this long
+            max_chars: Later segments are cut at a clause or word boundary beyond this
+        """
+        self.first_min_words = settings.TTS_SEGMENT_FIRST_MIN_WORDS if first_min_words is None else first_min_words
+        self.first_max_words = settings.TTS_SEGMENT_FIRST_MAX_WORDS if first_max_words is None else first_max_words
+        self.first_timeout = (settings.TTS_SEGMENT_FIRST_TIMEOUT_MS if first_timeout_ms is None else first_timeout_ms) / 1000
+        self.min_chars = settings.TTS_SEGMENT_MIN_CHARS if min_chars is None else min_chars
+        self.max_chars = settings.TTS_SEGMENT_MAX_CHARS if max_chars is None else max_chars
+        
+        self.buffer = ""
+        self.segments_emitted = 0
+        self.first_text_at: Optional[float] = None
+        self.timed_out = False
+    
+    def feed(self, text: str, now: Optional[float] = None) -> List[str]:
+        """Add streamed text; returns segments that are ready for synthesis"""
+        now = time.monotonic() if now is None else now
+        if self.first_text_at is None and text:
+            self.first_text_at = now
+        self.buffer += text
+        return self._drain(now)
+    
+    def poll(self, now: Optional[float] = None) -> List[str]:
+        """Segments that are ready only because time has passed (first-segment timeout)"""
+        self.timed_out = True
+        return self._drain(time.monotonic() if now is None else now)
+    
+    def flush(self) -> List[str]:
+        """End of stream: whatever is left"""
+        text, self.buffer = self.buffer, ""
+        if text.strip():
+            self.segments_emitted += 1
+            return [text.strip()]
+        return []
+    
+    def timeout_at(self) -> Optional[float]:
+        """When poll() should be called, or None if only more text can help"""
+        if self.segments_emitted or self.first_text_at is None or self.timed_out:
+            return None
+        return self.first_text_at + self.first_timeout
+    
+    def _drain(self, now: float) -> List[str]:
+        segments = []
+        while True:
+            segment = self._next_segment(now)
+            if segment is None:
+                return segments
+            segments.append(segment)
+    
+    def _next_segment(self, now: float) -> Optional[str]:
+        cut = self._first_cut(now) if not self.segments_emitted else self._later_cut()
+        if cut is None:
+            return None
+        segment, self.buffer = self.buffer[:cut].strip(), self.buffer[cut:].lstrip()
+        if not segment:
+            return None
+        self.segments_emitted += 1
+        return segment
+    
+    def _first_cut(self, now: float) -> Optional[int]:
+        sentence = self._sentence_end(0)
+        if sentence is not None:
+            return sentence
+        
+        complete = self._last_word_end()
+        words = len(self.buffer[:complete].split()) if complete else 0
+        if words >= self.first_min_words:
+            clause = self._clause_end(self.first_min_words)
+            if clause is not None:
+                return clause
+            if now - self.first_text_at >= self.first_timeout:
+                return complete
+        if words >= self.first_max_words:
+            return complete
+        return None
+    
+    def _later_cut(self) -> Optional[int]:
+        # Merge sentences until the segment is long enough, without passing max_chars
+        end = self._sentence_end(0)
+        while end is not None and end < self.min_chars:
+            following = self._sentence_end(end)
+            if following is None:
+                break
+            if following > self.max_chars:
+                return end
+            end = following
+        if end is not None and end >= self.min_chars:
+            return end
+        
+        if len(self.buffer) > self.max_chars:
+            if end is not None:
+                return end
+            clause = self._last_boundary(_CLAUSE_END, self.max_chars)
+            return clause or self._last_word_end(self.max_chars) or self.max_chars
+        return None
+    
+    def _sentence_end(self, start: int) -> Optional[int]:
+        for match in _SENTENCE_END.finditer(self.buffer, start):
+            if self._is_sentence_end(match):
+                return match.end()
+        return None
+    
+    def _clause_end(self, min_words: int) -> Optional[int]:
+        """First clause boundary with at least min_words before it"""
+        for match in _CLAUSE_END.finditer(self.buffer):
+            if len(self.buffer[:match.start()].split()) >= min_words:
+                return match.end()
+        return None
+    
+    def _last_boundary(self, pattern: re.Pattern, limit: int) -> Optional[int]:
+        ends = [match.end() for match in pattern.finditer(self.buffer, 0, limit)]
+        return ends[-1] if ends else None
+    
+    def _last_word_end(self, limit: Optional[int] = None) -> Optional[int]:
+        """End of the last word known to be complete (followed by whitespace)"""
+        text = self.buffer if limit is None else self.buffer[:limit]
+        space = max(text.rfind(" "), text.rfind("\n"))
+        if space <= 0:
+            return None
+        return len(text[:space].rstrip()) or None
+    
+    def _is_sentence_end(self, match: re.Match) -> bool:
+        punctuation = match.group()
+        if punctuation == "\n":
+            return True
+        at_end = match.end() == len(self.buffer)
+        if not punctuation.startswith("."):
+            return True
+        if punctuation.startswith(".."):
+            return not at_end  # The ellipsis may still be growing
+        
+        word = _WORD_BEFORE.search(self.buffer, 0, match.start())
+        if not word:
+            # After a number: "at 3. Then" ends, but "3." + "5" may still follow
+            return not at_end
+        token = word.group(1).lower()
+        if at_end and (len(token) == 1 or "." in token):
+            return False  # Could be an initial or "p.m." still streaming
+        if token in TITLE_ABBREVIATIONS or (len(token) == 1 and word.group(1).isupper()):
+            return False  # "Dr. Smith", "J. Smith"
+        if token in ABBREVIATIONS:
+            following = self.buffer[match.end():].lstrip()
+            if not following:
+                return False  # Can't tell yet
+            return following[0].isupper()
+        return True
+
+
+async def segment_stream(
+    text_stream: AsyncGenerator[str, None],
+    segmenter: Optional[TextSegmenter] = None
+) -> AsyncGenerator[str, None]:
+    """
+    Segment a streamed LLM response for synthesis
+    
+    The stream is read by a separate task so the first-segment timeout can
+    fire between tokens without cancelling the upstream generator.
+    """
+    segmenter = segmenter or TextSegmenter()
+    chunks: asyncio.Queue = asyncio.Queue()
+    
+    async def read():
+        try:
+            async for chunk in text_stream:
+                chunks.put_nowait(chunk)
+        finally:
+            chunks.put_nowait(None)
+    
+    reader = asyncio.ensure_future(read())
+    try:
+        while True:
+            deadline = segmenter.timeout_at()
+            if deadline is None:
+                chunk = await chunks.get()
+            else:
+                try:
+                    chunk = await asyncio.wait_for(chunks.get(), max(0.0, deadline - time.monotonic()))
+                except asyncio.TimeoutError:
+                    for segment in segmenter.poll():
+                        yield segment
+                    continue
+            
+            if chunk is None:
+                break
+            for segment in segmenter.feed(chunk):
+                yield segment
+        
+        # Surface errors from the text stream (e.g. the LLM failing mid-answer)
+        await reader
+        for segment in segmenter.flush():
+            yield segment
+    finally:
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
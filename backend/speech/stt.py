@@ -1,21 +1,82 @@
 import azure.cognitiveservices.speech as speechsdk
-from typing import Callable, Optional
+from typing import Callable, Optional, Union
 import asyncio
+import ctypes
 import threading
+import time
+import numpy as np
 from config.settings import settings
+from speech.ring_buffer import AudioRingBuffer
+from speech.sdk_executor import PRIORITY_BACKGROUND, PRIORITY_SESSION, sdk_executor
+from utils.audio import SAMPLE_RATE
+from utils.log import get_logger
+from utils.metrics import metrics
 
-class AzureSTT:
-    def __init__(self, on_recognized: Callable, on_recognizing: Optional[Callable] = None):
-        """
-        Initialize Azure Speech-to-Text with callbacks
-        
-        Args:
-            on_recognized: Callback for final recognized text
-            on_recognizing: Optional callback for partial results
-        """
-        print(f"[STT] Initializing with region: {settings.AZURE_SPEECH_REGION}")
-        print(f"[STT] Key starts with: {settings.AZURE_SPEECH_KEY[:10]}...")
-        
+logger = get_logger("stt")
+
+# SDK releases checked to pass write()'s buffer straight to ctypes (tests/test_stt.py pins this)
+BUFFER_VIEW_SDK_VERSIONS = {"1.52.0"}
+
+
+def buffer_views_supported() -> bool:
+    """
+    Whether the installed SDK can take a _BufferView
+    
+    That relies on PushAudioInputStream.write calling the native function
+    with (handle, buffer, len(buffer)) and no declared argtypes; other
+    releases get a bytes copy of each write instead.
+    """
+    if speechsdk.__version__ not in BUFFER_VIEW_SDK_VERSIONS:
+        return False
+    try:
+        from azure.cognitiveservices.speech.interop import _sdk_lib
+        return getattr(_sdk_lib.push_audio_input_stream_write, "argtypes", None) is None
+    except (ImportError, AttributeError):
+        return False
+
+
+BUFFER_VIEWS = buffer_views_supported()
+
+
+class _BufferView:
+    """
+    Hands a read-only buffer (e.g. a memoryview into a WebSocket frame) to the
+    SDK without copying it into a new bytes object first.
+    
+    PushAudioInputStream.write only needs len(buffer) and something ctypes can
+    pass as a pointer, so we expose the buffer address via _as_parameter_.
+    select() repoints it at part of the buffer, so one instance serves every
+    write from a ring buffer. This leans on how the SDK calls into its
+    native library, so it is only used where BUFFER_VIEWS says it's safe.
+    """
+    __slots__ = ("_array", "_address", "_size", "_as_parameter_")
+    
+    def __init__(self, view: memoryview):
+        self._array = np.frombuffer(view, dtype=np.uint8)
+        self._address = self._array.ctypes.data
+        self._size = self._array.nbytes
+        self._as_parameter_ = ctypes.c_void_p(self._address)
+    
+    def select(self, offset: int, size: int) -> "_BufferView":
+        self._as_parameter_ = ctypes.c_void_p(self._address + offset)
+        self._size = size
+        return self
+    
+    def __len__(self):
+        return self._size
+
+
+class PreparedRecognizer:
+    """
+    The SDK objects behind one AzureSTT: speech config, push stream and recognizer
+    
+    Building them, and opening the service connection with connect=True,
+    takes long enough that RecognizerPool prepares these ahead of time.
+    Single use: once its push stream is closed the recognizer takes no
+    more audio.
+    """
+    
+    def __init__(self, connect: bool = False):
         self.speech_config = speechsdk.SpeechConfig(
             subscription=settings.AZURE_SPEECH_KEY,
             region=settings.AZURE_SPEECH_REGION
@@ -24,15 +85,17 @@ class AzureSTT:
         # Set speech recognition language
         self.speech_config.speech_recognition_language = "en-US"
         
-        # Enable detailed logging
-        self.speech_config.set_property(
-            speechsdk.PropertyId.Speech_LogFilename, 
-            "azure_stt.log"
-        )
+        # Detailed SDK file logging is expensive, so it's opt-in
+        if settings.AZURE_SPEECH_LOG_FILE:
+            self.speech_config.set_property(
+                speechsdk.PropertyId.Speech_LogFilename, 
+                settings.AZURE_SPEECH_LOG_FILE
+            )
         
-        # Setup audio stream with explicit format (16kHz, 16-bit, mono PCM)
+        # Setup audio stream with explicit format (16kHz, 16-bit, mono PCM);
+        # clients at other rates are converted before push_audio
         audio_format = speechsdk.audio.AudioStreamFormat(
-            samples_per_second=16000,
+            samples_per_second=SAMPLE_RATE,
             bits_per_sample=16,
             channels=1
         )
@@ -45,45 +108,115 @@ class AzureSTT:
             audio_config=self.audio_config
         )
         
+        self.connection = None
+        if connect:
+            # Open the service connection now so starting recognition doesn't wait for it
+            try:
+                self.connection = speechsdk.Connection.from_recognizer(self.recognizer)
+                self.connection.open(True)
+            except Exception as e:
+                logger.warning("Pre-connect failed, will connect when recognition starts: %s", e)
+                self.connection = None
+        self.created_at = time.monotonic()
+    
+    def close(self):
+        """Release a recognizer that was never used"""
+        if self.connection is not None:
+            self.connection.close()
+        self.push_stream.close()
+
+
+class AzureSTT:
+    def __init__(
+        self,
+        on_recognized: Callable,
+        on_recognizing: Optional[Callable] = None,
+        session_id: str = "-",
+        prepared: Optional[PreparedRecognizer] = None
+    ):
+        """
+        Initialize Azure Speech-to-Text with callbacks
+        
+        Args:
+            on_recognized: Callback for final recognized text
+            on_recognizing: Optional callback for partial results
+            session_id: Correlation ID for log records written from SDK callback threads
+            prepared: A recognizer from RecognizerPool (built by start() if None)
+        """
+        self.log = get_logger("stt", session_id)
+        self.partial_log = get_logger("stt.partial", session_id)
+        self.log.info("Initializing with region: %s", settings.AZURE_SPEECH_REGION)
+        
+        self.warm = prepared is not None
+        self.prepared: Optional[PreparedRecognizer] = None  # Until recognition has started
+        self.recognizer = None
+        if prepared is not None:
+            self._attach(prepared)
+        
         # Store callbacks and event loop
         self.on_recognized_callback = on_recognized
         self.on_recognizing_callback = on_recognizing
         self.loop = None
         
+        # Inbound audio is handed to the SDK from a preallocated ring, at least a
+        # frame at a time; audio arriving before start() waits there
+        frame_bytes = SAMPLE_RATE * 2 * settings.STT_FRAME_MS // 1000
+        self.ring = AudioRingBuffer(frame_bytes, settings.STT_BUFFER_MS // settings.STT_FRAME_MS)
+        self._ring_view = _BufferView(self.ring.memory) if BUFFER_VIEWS else None
+        
+        # For session management
+        self.is_running = False
+        self.is_closed = False
+        self._starting: Optional[asyncio.Future] = None
+        self.bytes_pushed = 0
+        self.writes = 0
+        self.last_final_at = None  # time.monotonic() of the last final result, for turn tracing
+    
+    def _attach(self, prepared: PreparedRecognizer):
+        self.prepared = prepared
+        self.speech_config = prepared.speech_config
+        self.push_stream = prepared.push_stream
+        self.audio_config = prepared.audio_config
+        self.recognizer = prepared.recognizer
+        self.connection = prepared.connection
+        
         # Connect callbacks
         self.recognizer.recognized.connect(self._handle_recognized)
         self.recognizer.recognizing.connect(self._handle_recognizing)
         self.recognizer.canceled.connect(self._handle_canceled)
         self.recognizer.session_started.connect(self._handle_session_started)
         self.recognizer.session_stopped.connect(self._handle_session_stopped)
-        
-        # For session management
-        self.is_running = False
-        self.bytes_pushed = 0
+    
+    def rebind(self, on_recognized: Optional[Callable], on_recognizing: Optional[Callable] = None):
+        """Send results to other callbacks (None drops them), e.g. when a session is resumed"""
+        self.on_recognized_callback = on_recognized
+        self.on_recognizing_callback = on_recognizing
     
     def _handle_session_started(self, evt):
         """Handle session start"""
-        print(f"[STT] Session started: {evt.session_id}")
+        self.log.info("Session started: %s", evt.session_id)
     
     def _handle_session_stopped(self, evt):
         """Handle session stop"""
-        print(f"[STT] Session stopped: {evt.session_id}")
+        self.log.info("Session stopped: %s", evt.session_id)
     
     def _handle_canceled(self, evt):
         """Handle cancellation/errors"""
         cancellation = evt.result.cancellation_details
-        print(f"[STT] CANCELED: Reason={cancellation.reason}")
+        self.log.warning("CANCELED: Reason=%s", cancellation.reason)
         if cancellation.reason == speechsdk.CancellationReason.Error:
-            print(f"[STT] ERROR: Code={cancellation.error_code}")
-            print(f"[STT] ERROR: Details={cancellation.error_details}")
-            print("[STT] Did you set the speech resource key and region values correctly?")
+            self.log.error(
+                "ERROR: Code=%s Details=%s (did you set the speech resource key and region correctly?)",
+                cancellation.error_code, cancellation.error_details
+            )
     
     def _handle_recognized(self, evt):
         """Handle final recognition results"""
-        print(f"[STT] Recognition event: reason={evt.result.reason}")
+        self.log.debug("Recognition event: reason=%s", evt.result.reason)
         if evt.result.reason == speechsdk.ResultReason.RecognizedSpeech:
+            self.last_final_at = time.monotonic()
             text = evt.result.text
-            print(f"[STT] RECOGNIZED: '{text}'")
+            self.log.info("RECOGNIZED: '%s'", text)
             if text and self.on_recognized_callback:
                 # Schedule the async callback on the event loop
                 if self.loop and self.loop.is_running():
@@ -92,13 +225,13 @@ class AzureSTT:
                         self.loop
                     )
         elif evt.result.reason == speechsdk.ResultReason.NoMatch:
-            print(f"[STT] No speech could be recognized")
+            self.log.debug("No speech could be recognized")
     
     def _handle_recognizing(self, evt):
         """Handle partial recognition results"""
         text = evt.result.text
         if text:
-            print(f"[STT] Recognizing: '{text}'")
+            self.partial_log.debug("Recognizing: '%s'", text)
             if self.on_recognizing_callback:
                 if self.loop and self.loop.is_running():
                     asyncio.run_coroutine_threadsafe(
@@ -106,30 +239,109 @@ class AzureSTT:
                         self.loop
                     )
     
-    def start(self):
-        """Start continuous recognition"""
-        if not self.is_running:
-            # Get the current event loop
-            try:
-                self.loop = asyncio.get_running_loop()
-            except RuntimeError:
-                self.loop = asyncio.get_event_loop()
-            
-            print("[STT] Starting continuous recognition...")
-            self.recognizer.start_continuous_recognition()
-            self.is_running = True
-            print("[STT] Recognition started, waiting for audio...")
+    async def start(self):
+        """
+        Start continuous recognition
+        
+        The blocking SDK calls (building the recognizer if it wasn't pooled,
+        starting recognition) run on sdk_executor; audio pushed meanwhile
+        waits in the ring buffer.
+        """
+        if self.is_running or self.is_closed or self._starting:
+            return
+        self.loop = asyncio.get_running_loop()
+        self.log.info("Starting continuous recognition...")
+        # Shielded: if the caller gives up, stop() still waits for the start to finish
+        self._starting = asyncio.ensure_future(sdk_executor.run(self._start_recognition, priority=PRIORITY_SESSION))
+        self._starting.add_done_callback(self._on_start_done)
+        await asyncio.shield(self._starting)
+        if self.is_closed:
+            return
+        self.is_running = True
+        self._write_frames(self.ring.release())
+        self.log.info("Recognition started, waiting for audio...")
+    
+    def _start_recognition(self):
+        if self.recognizer is None:
+            self._attach(PreparedRecognizer())
+        self.recognizer.start_continuous_recognition()
+    
+    def _on_start_done(self, starting: asyncio.Future):
+        if starting.cancelled() or starting.exception() is not None:
+            # Nothing will stop a recognizer that never started: close its connection and stream
+            self._release()
+        else:
+            self.prepared = None  # Stopping recognition closes the stream from now on
+    
+    def _release(self):
+        """Close an unstarted recognizer's pre-opened connection and push stream"""
+        prepared, self.prepared = self.prepared, None
+        if prepared is not None:
+            sdk_executor.submit(prepared.close, priority=PRIORITY_BACKGROUND)
     
     def stop(self):
-        """Stop recognition"""
+        """Stop recognition (the SDK calls are queued on sdk_executor, not waited for)"""
+        if self.is_closed:
+            return
+        self.is_closed = True
         if self.is_running:
-            print(f"[STT] Stopping... (pushed {self.bytes_pushed} bytes total)")
-            self.recognizer.stop_continuous_recognition()
-            self.push_stream.close()
+            # Audio short of a frame is still speech the recognizer should hear
+            self._write_frames(self.ring.release_tail())
+            self.log.info(
+                "Stopping... (pushed %d bytes total in %d writes, buffer: %s)",
+                self.bytes_pushed, self.writes, self.ring.stats()
+            )
             self.is_running = False
+            sdk_executor.submit(self._stop_recognition, priority=PRIORITY_BACKGROUND)
+        elif self._starting is not None:
+            # Still starting: stop once it has
+            self._starting.add_done_callback(self._stop_when_started)
+        else:
+            # Never started (e.g. a pooled recognizer whose session ended first)
+            self._release()
+        record_ring_stats(self.ring)
     
-    def push_audio(self, audio_bytes: bytes):
-        """Push audio data to the recognizer"""
+    def _stop_when_started(self, starting: asyncio.Future):
+        if not starting.cancelled() and starting.exception() is None:
+            sdk_executor.submit(self._stop_recognition, priority=PRIORITY_BACKGROUND)
+    
+    def _stop_recognition(self):
+        self.recognizer.stop_continuous_recognition()
+        self.push_stream.close()
+    
+    def push_audio(self, audio_bytes: Union[bytes, memoryview]):
+        """
+        Push audio data to the recognizer
+        
+        Accepts bytes or a memoryview (e.g. the payload of a binary frame),
+        copied once into the ring buffer. Once a frame's worth is buffered
+        it all goes to the SDK straight from the ring in one write (two if
+        it wraps the ring's end), so small chunks (VAD-compressed silence,
+        codec packets) don't each cost an SDK call.
+        """
+        if self.is_closed:
+            return
+        dropped = self.ring.write(audio_bytes)
+        if dropped:
+            self.log.warning("Audio buffer overrun, dropped %d bytes", dropped)
         if self.is_running:
-            self.bytes_pushed += len(audio_bytes)
-            self.push_stream.write(audio_bytes)
\ No newline at end of file
+            self._write_frames(self.ring.release())
+    
+    def _write_frames(self, spans):
+        for offset, size in spans:
+            self.bytes_pushed += size
+            self.writes += 1
+            if self._ring_view is not None:
+                self.push_stream.write(self._ring_view.select(offset, size))
+            else:
+                self.push_stream.write(bytes(self.ring.memory[offset:offset + size]))
+
+
+def record_ring_stats(ring: AudioRingBuffer):
+    """Add one session's STT input buffer figures to the process metrics"""
+    bytes_per_ms = SAMPLE_RATE * 2 / 1000
+    metrics.observe("stt.buffer_peak_ms", ring.peak_bytes / bytes_per_ms)
+    metrics.incr("stt.buffer_releases", ring.releases)
+    if ring.overruns:
+        metrics.incr("stt.buffer_overruns", ring.overruns)
+        metrics.incr("stt.buffer_overrun_ms", ring.overrun_bytes / bytes_per_ms)
\ No newline at end of file
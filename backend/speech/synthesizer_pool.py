@@ -0,0 +1,162 @@
+import azure.cognitiveservices.speech as speechsdk
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from config.settings import settings
+from speech.sdk_executor import PRIORITY_SEGMENT, sdk_executor
+from utils.log import get_logger
+from utils.metrics import metrics
+
+logger = get_logger("tts.pool")
+
+PoolKey = Tuple[str, speechsdk.SpeechSynthesisOutputFormat]
+
+
+class SynthesizerPool:
+    """
+    Reusable SpeechSynthesizers keyed by voice and output format
+    
+    A synthesizer handles one request at a time, so callers borrow one per
+    request and give it back when done. Idle synthesizers keep their service
+    connection open. Keys (voices) beyond max_keys are evicted least recently
+    used first, once none of their synthesizers are borrowed.
+    
+    Synthesis events are connected once per synthesizer and routed to the
+    listener registered by the current borrower (see listen()), since SDK
+    event handlers can't be disconnected individually.
+    
+    Not thread-safe: acquire/release from the event loop thread only.
+    New synthesizers are built on sdk_executor threads, and listeners are
+    called on SDK threads.
+    """
+    
+    def __init__(self, max_keys: int, max_idle_per_key: int):
+        self.max_keys = max_keys
+        self.max_idle_per_key = max_idle_per_key
+        
+        self._configs: Dict[PoolKey, speechsdk.SpeechConfig] = {}
+        self._idle: "OrderedDict[PoolKey, List[speechsdk.SpeechSynthesizer]]" = OrderedDict()
+        self._in_use: Dict[PoolKey, int] = {}
+        self._listeners: Dict[int, object] = {}  # id(synthesizer) -> listener
+        
+        self.created = 0
+        self.reused = 0
+        self.evicted = 0
+    
+    def _config(self, key: PoolKey) -> speechsdk.SpeechConfig:
+        config = self._configs.get(key)
+        if config is None:
+            voice_name, output_format = key
+            config = speechsdk.SpeechConfig(
+                subscription=settings.AZURE_SPEECH_KEY,
+                region=settings.AZURE_SPEECH_REGION
+            )
+            config.set_speech_synthesis_output_format(output_format)
+            config.speech_synthesis_voice_name = voice_name
+            self._configs[key] = config
+        return config
+    
+    def _create(self, config: speechsdk.SpeechConfig) -> speechsdk.SpeechSynthesizer:
+        """Build a synthesizer and open its connection (blocking; runs on an SDK worker)"""
+        # Create synthesizer without audio output (we'll handle the stream)
+        synthesizer = speechsdk.SpeechSynthesizer(speech_config=config, audio_config=None)
+        
+        # Route events by id so handlers don't keep the synthesizer alive
+        synthesizer_id = id(synthesizer)
+        synthesizer.synthesizing.connect(lambda evt: self._dispatch(synthesizer_id, "on_audio", evt))
+        synthesizer.synthesis_completed.connect(lambda evt: self._dispatch(synthesizer_id, "on_done", evt))
+        synthesizer.synthesis_canceled.connect(lambda evt: self._dispatch(synthesizer_id, "on_done", evt))
+        
+        # Open the service connection now so the first request doesn't pay for it
+        try:
+            speechsdk.Connection.from_speech_synthesizer(synthesizer).open(True)
+        except Exception as e:
+            logger.warning("Pre-connect failed, will connect on first use: %s", e)
+        return synthesizer
+    
+    async def acquire(
+        self,
+        voice_name: str,
+        output_format: speechsdk.SpeechSynthesisOutputFormat,
+        priority: int = PRIORITY_SEGMENT
+    ) -> speechsdk.SpeechSynthesizer:
+        """Borrow a synthesizer, building one at `priority` if none is idle; must be returned with release()"""
+        key = (voice_name, output_format)
+        idle = self._idle.setdefault(key, [])
+        self._idle.move_to_end(key)
+        
+        if idle:
+            synthesizer = idle.pop()
+            self.reused += 1
+            metrics.incr("tts_pool.reused")
+        else:
+            synthesizer = await sdk_executor.run(self._create, self._config(key), priority=priority)
+            self.created += 1
+            metrics.incr("tts_pool.created")
+        
+        self._in_use[key] = self._in_use.get(key, 0) + 1
+        self._evict_keys()
+        self._report()
+        return synthesizer
+    
+    def listen(self, synthesizer: speechsdk.SpeechSynthesizer, listener: Optional[object]):
+        """
+        Receive a borrowed synthesizer's events (None to stop)
+        
+        The listener's on_audio(evt) is called for each synthesizing event and
+        on_done(evt) once the request completes or is canceled.
+        """
+        if listener is None:
+            self._listeners.pop(id(synthesizer), None)
+        else:
+            self._listeners[id(synthesizer)] = listener
+    
+    def _dispatch(self, synthesizer_id: int, method: str, evt):
+        listener = self._listeners.get(synthesizer_id)
+        if listener is not None:
+            getattr(listener, method)(evt)
+    
+    def release(self, voice_name: str, output_format: speechsdk.SpeechSynthesisOutputFormat, synthesizer: speechsdk.SpeechSynthesizer):
+        """Return a borrowed synthesizer to the pool"""
+        self._listeners.pop(id(synthesizer), None)
+        key = (voice_name, output_format)
+        self._in_use[key] = max(0, self._in_use.get(key, 0) - 1)
+        
+        idle = self._idle.get(key)
+        if idle is not None and len(idle) < self.max_idle_per_key:
+            idle.append(synthesizer)
+        else:
+            self.evicted += 1
+            metrics.incr("tts_pool.evicted")
+        
+        self._evict_keys()
+        self._report()
+    
+    def _evict_keys(self):
+        """Drop least recently used voices that have nothing borrowed"""
+        for key in list(self._idle):
+            if len(self._idle) <= self.max_keys:
+                break
+            if self._in_use.get(key, 0):
+                continue
+            dropped = self._idle.pop(key)
+            self._configs.pop(key, None)
+            self._in_use.pop(key, None)
+            self.evicted += len(dropped)
+            metrics.incr("tts_pool.evicted", len(dropped))
+    
+    def _report(self):
+        metrics.gauge("tts_pool.in_use", sum(self._in_use.values()))
+        metrics.gauge("tts_pool.idle", sum(len(idle) for idle in self._idle.values()))
+    
+    def stats(self) -> Dict:
+        in_use = sum(self._in_use.values())
+        idle = sum(len(synths) for synths in self._idle.values())
+        return {
+            "keys": len(self._idle),
+            "in_use": in_use,
+            "idle": idle,
+            "utilization": in_use / (in_use + idle) if in_use + idle else 0.0,
+            "created": self.created,
+            "reused": self.reused,
+            "evicted": self.evicted
+        }
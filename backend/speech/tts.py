@@ -1,74 +1,337 @@
 import azure.cognitiveservices.speech as speechsdk
-from typing import AsyncGenerator, Optional
+from typing import AsyncGenerator, Callable, Optional
 import asyncio
+import time
+import numpy as np
 from config.settings import settings
+from utils.admission import AdmissionError, tts_limiter
+from utils.audio import AudioCodec, SAMPLE_RATE, StreamingResampler
+from utils.log import get_logger
+from utils.metrics import metrics
+from speech.sdk_executor import PRIORITY_FIRST_SEGMENT, PRIORITY_SEGMENT
+from speech.segmenter import TextSegmenter, segment_stream
+from speech.synthesizer_pool import SynthesizerPool
+from speech.tts_cache import tts_cache, cache_key
+
+logger = get_logger("tts")
+
+
+class SynthesisError(Exception):
+    """Raised by AzureTTS._synthesize when the service reports a failure"""
+
 
 class AzureTTS:
-    def __init__(self, voice_name: str = "en-US-JennyNeural"):
+    def __init__(
+        self,
+        voice_name: str = "en-US-JennyNeural",
+        pool: Optional[SynthesizerPool] = None,
+        codec: Optional[AudioCodec] = None,
+        output_rate: int = SAMPLE_RATE
+    ):
         """
         Initialize Azure Text-to-Speech
         
         Args:
             voice_name: Azure Neural Voice name
+            pool: Shared synthesizer pool (a private pool is created if omitted)
+            codec: Stateless codec applied to all output audio (default raw PCM)
+            output_rate: Sample rate of the output audio; synthesis runs at
+                         SAMPLE_RATE and is converted when they differ
         """
-        self.speech_config = speechsdk.SpeechConfig(
-            subscription=settings.AZURE_SPEECH_KEY,
-            region=settings.AZURE_SPEECH_REGION
-        )
-        
         # Use raw PCM for lowest latency
-        self.speech_config.set_speech_synthesis_output_format(
-            speechsdk.SpeechSynthesisOutputFormat.Raw16Khz16BitMonoPcm
+        self.output_format = speechsdk.SpeechSynthesisOutputFormat.Raw16Khz16BitMonoPcm
+        self.voice_name = voice_name
+        
+        # A synthesizer processes one request at a time, so every request
+        # (including concurrent pipelined sentences) borrows one from the pool
+        self.pool = pool or SynthesizerPool(
+            max_keys=1,
+            max_idle_per_key=max(1, settings.TTS_PIPELINE_DEPTH)
         )
+        self.cache = tts_cache
+        self.output_rate = output_rate
+        self.codec = codec or AudioCodec(output_rate)
+    
+    async def synthesize_text_stream(self, text: str, priority: int = PRIORITY_FIRST_SEGMENT) -> AsyncGenerator[bytes, None]:
+        """
+        Synthesize text, yielding audio chunks (at self.output_rate, encoded
+        with self.codec) as the service produces them
         
-        # Set voice
-        self.speech_config.speech_synthesis_voice_name = voice_name
+        priority ranks any blocking SDK work the request needs (see
+        speech.sdk_executor); on its own, text is the first thing heard.
         
-        # Create synthesizer without audio output (we'll handle the stream)
-        self.synthesizer = speechsdk.SpeechSynthesizer(
-            speech_config=self.speech_config,
-            audio_config=None
-        )
+        Sentences are cached as synthesized PCM; a cache hit is converted
+        once per codec and rate and kept (see TTSCache). Streamed chunks are
+        resampled as they arrive, carrying the filter state across chunks.
+        Cache misses hold an admission from tts_limiter while they synthesize;
+        a sentence that isn't admitted within ADMISSION_MAX_WAIT_MS is skipped.
+        The turn's deadline doesn't apply: text the LLM has already produced
+        (or its apology for not answering) is worth speaking late.
+        """
+        key = None
+        if self.cache.cacheable(text):
+            key = cache_key(self.voice_name, self.output_format.name, text)
+            audio_data = await self.cache.get(key, self.codec, self.output_rate)
+            if audio_data is not None:
+                yield audio_data
+                return
+        
+        chunks = []
+        resampler = None
+        if self.output_rate != SAMPLE_RATE:
+            resampler = StreamingResampler(SAMPLE_RATE, self.output_rate, align=True)
+        pcm_stream = self._synthesize(text, priority)
+        try:
+            async with tts_limiter.admit(len(text), bounded=False):
+                async for pcm in pcm_stream:
+                    chunks.append(pcm)
+                    if resampler is None:
+                        yield self.codec.encode(pcm)
+                        continue
+                    converted = resampler.process(np.frombuffer(pcm, dtype=np.int16))
+                    if len(converted):
+                        yield self.codec.encode(converted.tobytes())
+        except AdmissionError as e:
+            logger.warning("TTS request not admitted: %s", e)
+            return
+        except SynthesisError as e:
+            logger.warning("TTS failed: %s", e)
+            return
+        finally:
+            await pcm_stream.aclose()
+        
+        if resampler is not None:
+            tail = resampler.flush()
+            if len(tail):
+                yield self.codec.encode(tail.tobytes())
+        
+        if key is not None and chunks:
+            await self.cache.set(key, b"".join(chunks))
+    
+    async def _synthesize(self, text: str, priority: int = PRIORITY_SEGMENT) -> AsyncGenerator[bytes, None]:
+        """
+        Synthesize text, yielding PCM chunks as the service produces them
+        
+        Chunks come from the synthesizer's `synthesizing` events, handed to
+        the event loop with call_soon_threadsafe, so no thread is tied up
+        waiting for a request. With TTS_STREAMING off, the whole sentence is
+        yielded once synthesis completes.
+        
+        Raises:
+            SynthesisError: the service failed or canceled the request
+        """
+        synthesizer = await self.pool.acquire(self.voice_name, self.output_format, priority)
+        stream = _SynthesisStream(asyncio.get_running_loop(), settings.TTS_STREAMING)
+        self.pool.listen(synthesizer, stream)
+        result = None
+        streamed = False
+        
+        try:
+            start = time.monotonic()
+            # Returns immediately; progress arrives through the pool's event routing
+            stream.request = synthesizer.speak_text_async(text)
+            
+            while True:
+                item = await stream.queue.get()
+                if not isinstance(item, bytes):
+                    result = item
+                    break
+                if not streamed:
+                    metrics.observe("tts.first_chunk_ms", (time.monotonic() - start) * 1000)
+                    streamed = True
+                yield item
+        finally:
+            if result is None and stream.request is None:
+                # speak_text_async itself failed, nothing is running
+                self.pool.release(self.voice_name, self.output_format, synthesizer)
+            elif result is None:
+                result = stream.abandon(lambda: self.pool.release(self.voice_name, self.output_format, synthesizer))
+                if result is None:
+                    # Interrupted: stop the service-side synthesis we no longer need;
+                    # the synthesizer goes back to the pool once it reports done
+                    synthesizer.stop_speaking_async()
+            if result is not None:
+                self.pool.release(self.voice_name, self.output_format, synthesizer)
+        
+        if result.reason != speechsdk.ResultReason.SynthesizingAudioCompleted:
+            raise SynthesisError(result.reason)
+        if not streamed and result.audio_data:
+            # Streaming off (or no synthesizing events): the whole sentence at once
+            yield result.audio_data
     
     async def synthesize_text(self, text: str) -> Optional[bytes]:
         """
         Synthesize text to audio bytes
         
         Returns:
-            Raw PCM audio bytes or None if failed
+            Raw PCM audio bytes or None if failed (with a codec, the encoded
+            chunks back to back: one payload only for sample-wise codecs)
         """
-        result = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: self.synthesizer.speak_text_async(text).get()
-        )
-        
-        if result.reason == speechsdk.ResultReason.SynthesizingAudioCompleted:
-            return result.audio_data
-        else:
-            print(f"TTS failed: {result.reason}")
-            return None
+        chunks = [chunk async for chunk in self.synthesize_text_stream(text)]
+        return b"".join(chunks) or None
+    
+    def split_sentences(self, text_stream: AsyncGenerator[str, None]) -> AsyncGenerator[str, None]:
+        """Group streamed text chunks into segments for synthesis (see TextSegmenter)"""
+        return segment_stream(text_stream, TextSegmenter())
     
-    async def synthesize_stream(self, text_stream: AsyncGenerator[str, None]) -> AsyncGenerator[bytes, None]:
+    async def synthesize_stream(
+        self,
+        text_stream: AsyncGenerator[str, None],
+        pipeline_depth: Optional[int] = None,
+        on_segment: Optional[Callable[[str], None]] = None
+    ) -> AsyncGenerator[bytes, None]:
         """
         Stream synthesis for chunks of text
         Optimized for sentence-level streaming
+        
+        Args:
+            text_stream: Streamed LLM text
+            pipeline_depth: Max sentences in flight at once (defaults to
+                            settings.TTS_PIPELINE_DEPTH, 1 = sequential)
+            on_segment: Called with each text segment as it is handed to synthesis
         """
-        buffer = ""
+        depth = settings.TTS_PIPELINE_DEPTH if pipeline_depth is None else pipeline_depth
+        segments = self.split_sentences(text_stream)
+        if on_segment:
+            segments = self._notify_segments(segments, on_segment)
         
-        async for chunk in text_stream:
-            buffer += chunk
-            
-            # Check for sentence boundaries
-            if any(p in chunk for p in ['.', '!', '?', '\n']):
-                # Synthesize complete sentence
-                if buffer.strip():
-                    audio_data = await self.synthesize_text(buffer)
-                    if audio_data:
+        if depth <= 1:
+            priority = PRIORITY_FIRST_SEGMENT
+            async for sentence in segments:
+                audio_stream = self.synthesize_text_stream(sentence, priority)
+                priority = PRIORITY_SEGMENT
+                try:
+                    async for audio_data in audio_stream:
                         yield audio_data
-                buffer = ""
+                finally:
+                    await audio_stream.aclose()
+            return
         
-        # Handle remaining text
-        if buffer.strip():
-            audio_data = await self.synthesize_text(buffer)
-            if audio_data:
-                yield audio_data
\ No newline at end of file
+        async for audio_data in self._synthesize_pipelined(segments, depth):
+            yield audio_data
+    
+    async def _notify_segments(self, segments: AsyncGenerator[str, None], callback: Callable[[str], None]):
+        async for segment in segments:
+            callback(segment)
+            yield segment
+    
+    async def _buffer_segment(self, sentence: str, chunks: asyncio.Queue, priority: int):
+        """Synthesize one segment into a queue of chunks, ending with None"""
+        try:
+            async for audio_data in self.synthesize_text_stream(sentence, priority):
+                chunks.put_nowait(audio_data)
+        finally:
+            chunks.put_nowait(None)
+    
+    async def _synthesize_pipelined(
+        self,
+        segments: AsyncGenerator[str, None],
+        depth: int
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Keep reading text segments and synthesize up to `depth` of them
+        concurrently, yielding their audio in order
+        
+        The oldest segment's chunks are yielded as they arrive; later
+        segments buffer theirs until it is their turn.
+        """
+        pending: asyncio.Queue = asyncio.Queue()
+        slots = asyncio.Semaphore(depth)
+        in_flight = []
+        
+        async def produce():
+            priority = PRIORITY_FIRST_SEGMENT
+            try:
+                async for sentence in segments:
+                    # A slot is held from synthesis start until its audio is collected
+                    await slots.acquire()
+                    chunks: asyncio.Queue = asyncio.Queue()
+                    task = asyncio.ensure_future(self._buffer_segment(sentence, chunks, priority))
+                    priority = PRIORITY_SEGMENT
+                    in_flight.append((task, chunks))
+                    pending.put_nowait((task, chunks))
+            finally:
+                pending.put_nowait(None)
+        
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                item = await pending.get()
+                if item is None:
+                    break
+                task, chunks = item
+                try:
+                    while True:
+                        audio_data = await chunks.get()
+                        if audio_data is None:
+                            break
+                        yield audio_data
+                    await task
+                finally:
+                    in_flight.remove(item)
+                    slots.release()
+            
+            # Surface errors from the text stream (e.g. the LLM failing mid-answer)
+            await producer
+        finally:
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+            
+            # Anything still in flight was never heard (e.g. the user barged in)
+            for task, chunks in in_flight:
+                if not task.done():
+                    task.cancel()
+                    metrics.incr("tts.cancelled_segments")
+                unheard = 0
+                while not chunks.empty():
+                    unheard += len(chunks.get_nowait() or b"")
+                if unheard:
+                    metrics.incr("tts.discarded_audio_ms", self.codec.duration_ms(unheard))
+            await asyncio.gather(*(task for task, _ in in_flight), return_exceptions=True)
+
+
+class _SynthesisStream:
+    """
+    Bridges one synthesis request's SDK events into an asyncio queue
+    
+    The queue receives audio chunks (bytes) and finally the
+    SpeechSynthesisResult. on_audio/on_done run on SDK threads.
+    """
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop, streaming: bool):
+        self.loop = loop
+        self.streaming = streaming
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.request = None  # Keeps the SDK's ResultFuture alive until done
+        self._on_abandoned_done: Optional[Callable[[], None]] = None
+    
+    def on_audio(self, evt):
+        if self.streaming:
+            self._call(self.queue.put_nowait, evt.result.audio_data)
+    
+    def on_done(self, evt):
+        self._call(self._done, evt.result)
+    
+    def _done(self, result):
+        if self._on_abandoned_done:
+            self._on_abandoned_done()
+        else:
+            self.queue.put_nowait(result)
+    
+    def _call(self, callback, arg):
+        try:
+            self.loop.call_soon_threadsafe(callback, arg)
+        except RuntimeError:
+            pass  # Event loop already closed
+    
+    def abandon(self, on_done: Callable[[], None]):
+        """
+        Stop reading. Returns the result if the request already finished,
+        otherwise on_done is called (on the event loop) once it does.
+        """
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if not isinstance(item, bytes):
+                return item
+        self._on_abandoned_done = on_done
+        return None
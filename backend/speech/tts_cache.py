@@ -0,0 +1,303 @@
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+import numpy as np
+from config.settings import settings
+from utils.audio import AudioCodec, AudioProcessor, CODEC_PCM16, SAMPLE_RATE
+from utils.log import get_logger
+from utils.metrics import metrics
+from utils.redis_client import get_redis
+
+logger = get_logger("cache.tts")
+
+_WHITESPACE = re.compile(r"\s+")
+_QUOTES = str.maketrans({"‘": "'", "’": "'", "“": '"', "”": '"'})
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for cache lookups
+    
+    Only changes that can't affect pronunciation: Unicode form, curly quotes
+    and whitespace. Case is kept since it matters for acronyms ("US" vs "us").
+    """
+    text = unicodedata.normalize("NFKC", text).translate(_QUOTES)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def cache_key(voice: str, output_format: str, text: str) -> str:
+    """Cache key covering voice, output format and normalized text"""
+    raw = f"{voice}|{output_format}|{normalize_text(text)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class DiskAudioStore:
+    """
+    Persistent layer storing one file per cache key
+    
+    Files older than ttl seconds (by mtime) are treated as misses and
+    deleted when read. Once the files add up to more than max_bytes the
+    oldest written are deleted first. Sizes are tracked in memory from a
+    scan at startup plus this process's own writes, so workers sharing the
+    directory each prune only what they know of; 0 disables either bound.
+    """
+    
+    def __init__(self, directory: str, ttl: int = 0, max_bytes: int = 0):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        
+        # key -> file size, oldest written first
+        self._files: "OrderedDict[str, int]" = OrderedDict()
+        self.current_bytes = 0
+        self.expired = 0
+        self.pruned = 0
+        self._lock = threading.Lock()
+        self._scan()
+    
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.pcm"
+    
+    def _scan(self):
+        files = []
+        for path in self.directory.glob("*/*.pcm"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, path.stem, stat.st_size))
+        for _, key, size in sorted(files):
+            self._files[key] = size
+            self.current_bytes += size
+        self._prune()
+    
+    def _forget(self, key: str) -> bool:
+        size = self._files.pop(key, None)
+        if size is None:
+            return False
+        self.current_bytes -= size
+        return True
+    
+    def _delete(self, key: str):
+        with self._lock:
+            self._forget(key)
+        self._path(key).unlink(missing_ok=True)
+    
+    def _prune(self):
+        """Delete the oldest files until the total is within max_bytes"""
+        if not self.max_bytes:
+            return
+        while True:
+            with self._lock:
+                if self.current_bytes <= self.max_bytes or not self._files:
+                    return
+                key, size = self._files.popitem(last=False)
+                self.current_bytes -= size
+            self._path(key).unlink(missing_ok=True)
+            self.pruned += 1
+            metrics.incr("tts_cache.disk_pruned")
+    
+    def _read(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            if self.ttl and time.time() - path.stat().st_mtime > self.ttl:
+                self._delete(key)
+                self.expired += 1
+                metrics.incr("tts_cache.disk_expired")
+                return None
+            return path.read_bytes()
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(key)  # Pruned by another worker
+            return None
+    
+    def _write(self, key: str, audio: bytes):
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_bytes(audio)
+        os.replace(tmp, path)  # Atomic, so readers never see partial audio
+        with self._lock:
+            self._forget(key)
+            self._files[key] = len(audio)
+            self.current_bytes += len(audio)
+        self._prune()
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        return await asyncio.get_event_loop().run_in_executor(None, self._read, key)
+    
+    async def set(self, key: str, audio: bytes):
+        await asyncio.get_event_loop().run_in_executor(None, self._write, key, audio)
+
+
+class RedisAudioStore:
+    """Persistent layer in the Redis instance configured in Settings"""
+    
+    def __init__(self, client, ttl: int, prefix: str = "tts:"):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+    
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(self.prefix + key)
+    
+    async def set(self, key: str, audio: bytes):
+        await self.client.set(self.prefix + key, audio, ex=self.ttl or None)
+
+
+class TTSCache:
+    """
+    Two-tier cache for synthesized audio
+    
+    Tier 1 is an in-process LRU bounded by total audio bytes. Tier 2 is an
+    optional persistent store (disk or Redis) shared across restarts and
+    workers; tier 2 hits are promoted into the LRU.
+    
+    Entries are PCM at SAMPLE_RATE. Other client codecs and playback rates
+    are converted from the PCM on their first hit and kept in the LRU next
+    to it, so each sentence is converted at most once per codec and rate;
+    tier 2 stores PCM only.
+    """
+    
+    def __init__(self, max_bytes: int, store=None, max_text_chars: int = 0):
+        self.max_bytes = max_bytes
+        self.store = store
+        self.max_text_chars = max_text_chars
+        
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.current_bytes = 0
+        
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.encodings = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0 or self.store is not None
+    
+    def cacheable(self, text: str) -> bool:
+        return self.enabled and (not self.max_text_chars or len(text) <= self.max_text_chars)
+    
+    async def get(
+        self,
+        key: str,
+        codec: Optional[AudioCodec] = None,
+        sample_rate: int = SAMPLE_RATE
+    ) -> Optional[bytes]:
+        """Cached audio for key, resampled to sample_rate and encoded with codec (a stateless one) if given"""
+        codec_name = codec.name if codec is not None else CODEC_PCM16
+        if codec_name == CODEC_PCM16 and sample_rate == SAMPLE_RATE:
+            return await self._get_pcm(key)
+        
+        encoded_key = f"{key}/{codec_name}@{sample_rate}"
+        audio = self._entries.get(encoded_key)
+        if audio is not None:
+            self._entries.move_to_end(encoded_key)
+            self.hits += 1
+            metrics.incr("tts_cache.hit")
+            return audio
+        
+        audio = await self._get_pcm(key)
+        if audio is None:
+            return None
+        if sample_rate != SAMPLE_RATE:
+            audio = AudioProcessor.resample(np.frombuffer(audio, dtype=np.int16), SAMPLE_RATE, sample_rate).tobytes()
+        if codec is not None:
+            audio = codec.encode(audio)
+        self._remember(encoded_key, audio)
+        self.encodings += 1
+        metrics.incr("tts_cache.encoded")
+        return audio
+    
+    async def _get_pcm(self, key: str) -> Optional[bytes]:
+        audio = self._entries.get(key)
+        if audio is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            metrics.incr("tts_cache.hit")
+            return audio
+        
+        if self.store is not None:
+            try:
+                audio = await self.store.get(key)
+            except Exception as e:
+                logger.warning("Persistent lookup failed: %s", e)
+                audio = None
+            if audio is not None:
+                self._remember(key, audio)
+                self.persistent_hits += 1
+                metrics.incr("tts_cache.persistent_hit")
+                return audio
+        
+        self.misses += 1
+        metrics.incr("tts_cache.miss")
+        return None
+    
+    async def set(self, key: str, audio: bytes):
+        self._remember(key, audio)
+        if self.store is not None:
+            try:
+                await self.store.set(key, audio)
+            except Exception as e:
+                logger.warning("Persistent store failed: %s", e)
+    
+    def _remember(self, key: str, audio: bytes):
+        if len(audio) > self.max_bytes:
+            return
+        
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self.current_bytes -= len(previous)
+        
+        self._entries[key] = audio
+        self.current_bytes += len(audio)
+        
+        while self.current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.current_bytes -= len(evicted)
+            self.evictions += 1
+            metrics.incr("tts_cache.eviction")
+    
+    def stats(self) -> Dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "encodings": self.encodings
+        }
+
+
+def create_store():
+    """Build the persistent layer selected by TTS_CACHE_BACKEND"""
+    backend = settings.TTS_CACHE_BACKEND.lower()
+    if backend == "disk":
+        return DiskAudioStore(settings.TTS_CACHE_DIR, settings.TTS_CACHE_TTL, settings.TTS_CACHE_DISK_MAX_BYTES)
+    if backend == "redis":
+        client = get_redis()
+        if client is None:
+            logger.warning("redis package not installed, persistent cache disabled")
+            return None
+        return RedisAudioStore(client, settings.TTS_CACHE_TTL)
+    return None
+
+
+# Create a singleton instance (shared by every connection in the process)
+tts_cache = TTSCache(
+    max_bytes=settings.TTS_CACHE_MAX_BYTES,
+    store=create_store(),
+    max_text_chars=settings.TTS_CACHE_MAX_TEXT_CHARS
+)
@@ -0,0 +1,213 @@
+from collections import deque
+from typing import List, Tuple, Union
+import numpy as np
+from config.settings import settings
+from utils.audio import AudioProcessor
+from utils.metrics import metrics
+
+SPEECH_START = "speech_start"
+SPEECH_END = "speech_end"
+
+# Silence handling
+MODE_OFF = "off"            # Pass everything through, only emit events
+MODE_GATE = "gate"          # Drop silence once the endpointing tail has been sent
+MODE_COMPRESS = "compress"  # Like gate, but forward 1 of every N silent frames
+
+
+class StreamingVAD:
+    """
+    Energy-based voice activity detection for a 16-bit mono PCM stream
+    
+    Frame energies are computed for a whole chunk at once; the per-frame state
+    machine then applies onset confirmation, hangover and an adaptive noise
+    floor. Audio that isn't needed by the recognizer is suppressed:
+    
+    - pre-roll: recent silence is held back and released when speech starts,
+      so word onsets aren't clipped
+    - hangover: speech stays "on" for a while after energy drops
+    - tail: after speech ends, enough silence is forwarded for the recognizer
+      to endpoint the utterance; anything after that is gated/compressed
+    
+    In compress mode the trickle of silence is taken from frames leaving the
+    pre-roll, so the pre-roll stays full and audio is forwarded in order.
+    """
+    
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        mode: str = None,
+        frame_ms: int = None,
+        threshold_db: float = None,
+        min_energy_db: float = None,
+        onset_ms: int = None,
+        hangover_ms: int = None,
+        preroll_ms: int = None,
+        tail_ms: int = None,
+        noise_adapt_rate: float = None,
+        compress_ratio: int = None
+    ):
+        """
+        Args default to the VAD_* settings.
+        
+        Args:
+            threshold_db: How far above the noise floor a frame must be to count as speech
+            min_energy_db: Absolute dBFS floor below which a frame is never speech
+            noise_adapt_rate: EMA rate used to track the noise floor on non-speech frames
+        """
+        self.sample_rate = sample_rate
+        self.mode = mode or settings.VAD_MODE
+        self.frame_size = int(sample_rate * (frame_ms or settings.VAD_FRAME_MS) / 1000)
+        self.threshold_db = settings.VAD_THRESHOLD_DB if threshold_db is None else threshold_db
+        self.min_energy_db = settings.VAD_MIN_ENERGY_DB if min_energy_db is None else min_energy_db
+        self.noise_adapt_rate = settings.VAD_NOISE_ADAPT_RATE if noise_adapt_rate is None else noise_adapt_rate
+        self.compress_ratio = max(1, compress_ratio or settings.VAD_COMPRESS_RATIO)
+        
+        ms = sample_rate // 1000
+        self.onset_samples = (settings.VAD_ONSET_MS if onset_ms is None else onset_ms) * ms
+        self.hangover_samples = (settings.VAD_HANGOVER_MS if hangover_ms is None else hangover_ms) * ms
+        self.preroll_samples = (settings.VAD_PREROLL_MS if preroll_ms is None else preroll_ms) * ms
+        self.tail_samples = (settings.VAD_TAIL_MS if tail_ms is None else tail_ms) * ms
+        
+        # Detector state
+        self.noise_floor_db = None
+        self.in_speech = False
+        self.onset_run = 0
+        self.hangover_left = 0
+        self.tail_left = 0
+        self.silent_frames = 0
+        self.preroll: deque = deque()
+        self.preroll_len = 0
+        self.position = 0  # Samples framed so far
+        self.remainder = b""  # Samples short of a frame, completed by the next chunk
+        
+        # Counters
+        self.bytes_in = 0
+        self.bytes_suppressed = 0
+    
+    def process(self, audio: Union[bytes, memoryview]) -> Tuple[Union[bytes, memoryview], List[Tuple[str, float]]]:
+        """
+        Run one chunk through the detector
+        
+        Frames run on across chunks: audio short of a whole frame at the end
+        of a chunk is kept and framed with the next one, so decisions don't
+        depend on how the client chunks its audio (it is forwarded up to a
+        frame later).
+        
+        Returns:
+            (audio to forward, events) where events are (SPEECH_START|SPEECH_END,
+            stream time in seconds). When the whole chunk is forwarded the input
+            object itself is returned, without copying.
+        """
+        view = memoryview(audio).cast("B")
+        self.bytes_in += view.nbytes
+        carried = bool(self.remainder)
+        if carried:
+            view = memoryview(self.remainder + view)
+        framed = len(view) - len(view) % (self.frame_size * 2)
+        self.remainder = bytes(view[framed:])
+        view = view[:framed]
+        samples = np.frombuffer(view, dtype=np.int16)
+        if not len(samples):
+            return b"", []
+        
+        energies = AudioProcessor.frame_energy_db(samples, self.frame_size)
+        if self.noise_floor_db is None:
+            self.noise_floor_db = float(energies[0])
+        
+        out: List = []
+        events: List[Tuple[str, float]] = []
+        whole = not carried and not self.remainder  # Whether out is exactly this chunk's frames
+        
+        n = self.frame_size
+        for index, energy in enumerate(energies.tolist()):
+            start = index * n
+            end = start + n
+            frame = view[start * 2:end * 2]
+            
+            is_speech = energy > max(self.noise_floor_db + self.threshold_db, self.min_energy_db)
+            if not is_speech:
+                self._adapt_noise_floor(energy)
+            
+            if self.in_speech:
+                out.append(frame)
+                if is_speech:
+                    self.hangover_left = self.hangover_samples
+                else:
+                    self.hangover_left -= n
+                    if self.hangover_left <= 0:
+                        self.in_speech = False
+                        self.onset_run = 0
+                        self.tail_left = self.tail_samples
+                        events.append((SPEECH_END, (self.position + end) / self.sample_rate))
+                continue
+            
+            self.onset_run = self.onset_run + n if is_speech else 0
+            if self.onset_run and self.onset_run >= self.onset_samples:
+                # Speech confirmed: release held-back audio first, in order
+                self.in_speech = True
+                self.hangover_left = self.hangover_samples
+                self.silent_frames = 0
+                whole = whole and not self.preroll
+                out.extend(self.preroll)
+                self._clear_preroll()
+                out.append(frame)
+                events.append((SPEECH_START, (self.position + end - self.onset_run) / self.sample_rate))
+            elif self.tail_left > 0 or self.mode == MODE_OFF:
+                # Trailing silence the recognizer needs for endpointing
+                self.tail_left -= n
+                out.append(frame)
+            else:
+                whole = False
+                self._hold(frame, out)
+        
+        self.position += len(samples)
+        
+        if whole and not events:
+            return audio, events
+        return b"".join(out), events
+    
+    def _adapt_noise_floor(self, energy: float):
+        if energy < self.noise_floor_db:
+            # Drop quickly to a quieter floor, rise slowly towards louder noise
+            self.noise_floor_db = energy
+        else:
+            self.noise_floor_db += self.noise_adapt_rate * (energy - self.noise_floor_db)
+    
+    def _hold(self, frame: memoryview, out: List):
+        """
+        Keep a silent frame as pre-roll. Frames pushed out are suppressed,
+        except in compress mode 1 in compress_ratio is forwarded (to out):
+        being older than everything still held, they keep the stream in order.
+        """
+        frame = bytes(frame)  # The input buffer may be reused after this call
+        self.preroll.append(frame)
+        self.preroll_len += len(frame) // 2
+        while self.preroll_len > self.preroll_samples and self.preroll:
+            dropped = self.preroll.popleft()
+            self.preroll_len -= len(dropped) // 2
+            if self.mode == MODE_COMPRESS and self.silent_frames % self.compress_ratio == 0:
+                out.append(dropped)
+            else:
+                self._suppressed(len(dropped))
+            self.silent_frames += 1
+    
+    def _clear_preroll(self):
+        self.preroll.clear()
+        self.preroll_len = 0
+    
+    def _suppressed(self, nbytes: int):
+        self.bytes_suppressed += nbytes
+        metrics.incr("vad.bytes_suppressed", nbytes)
+    
+    @property
+    def seconds_suppressed(self) -> float:
+        return self.bytes_suppressed / 2 / self.sample_rate
+    
+    def stats(self) -> dict:
+        return {
+            "in_speech": self.in_speech,
+            "noise_floor_db": self.noise_floor_db,
+            "bytes_in": self.bytes_in,
+            "bytes_suppressed": self.bytes_suppressed,
+            "seconds_suppressed": self.seconds_suppressed
+        }
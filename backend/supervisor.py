@@ -0,0 +1,104 @@
+import multiprocessing
+import signal
+import socket
+import time
+from typing import Callable, Dict, Tuple
+from config.settings import settings
+from utils.log import get_logger
+
+logger = get_logger("supervisor")
+
+class WorkerSupervisor:
+    """
+    Runs N server worker processes sharing one port via SO_REUSEPORT
+    
+    The supervisor restarts workers that exit or stop sending heartbeats
+    (e.g. a blocked event loop). On SIGTERM/SIGINT it forwards SIGTERM so
+    each worker stops accepting and drains its live calls, then waits up to
+    the drain timeout before killing stragglers.
+    """
+    
+    def __init__(self, target: Callable, num_workers: int):
+        """
+        Args:
+            target: Worker entry point, called as target(worker_id, heartbeat)
+                    in a fresh process. It must update heartbeat.value with
+                    time.monotonic() periodically.
+            num_workers: Number of worker processes
+        """
+        self.target = target
+        self.num_workers = num_workers
+        # spawn rather than fork so each worker initializes the Speech SDK itself
+        self.ctx = multiprocessing.get_context("spawn")
+        self.workers: Dict[int, Tuple[multiprocessing.Process, "multiprocessing.sharedctypes.Synchronized"]] = {}
+        self.restarts = 0
+        self.stopping = False
+    
+    @staticmethod
+    def reuse_port_supported() -> bool:
+        return hasattr(socket, "SO_REUSEPORT")
+    
+    def start_worker(self, worker_id: int):
+        heartbeat = self.ctx.Value("d", time.monotonic(), lock=False)
+        process = self.ctx.Process(
+            target=self.target,
+            args=(worker_id, heartbeat),
+            name=f"voice-worker-{worker_id}",
+            daemon=False
+        )
+        process.start()
+        self.workers[worker_id] = (process, heartbeat)
+        logger.info("Worker %d started (pid %d)", worker_id, process.pid)
+    
+    def _request_stop(self, signum, frame):
+        if not self.stopping:
+            logger.info("Received signal %d, draining workers...", signum)
+        self.stopping = True
+    
+    def check_workers(self):
+        """Restart workers that died or whose heartbeat went stale"""
+        now = time.monotonic()
+        for worker_id, (process, heartbeat) in list(self.workers.items()):
+            if not process.is_alive():
+                logger.warning("Worker %d exited with code %s, restarting", worker_id, process.exitcode)
+            elif now - heartbeat.value > settings.WS_WORKER_HEARTBEAT_TIMEOUT:
+                logger.warning("Worker %d unresponsive for %.1fs, restarting", worker_id, now - heartbeat.value)
+                process.kill()
+                process.join(5)
+            else:
+                continue
+            
+            self.restarts += 1
+            time.sleep(settings.WS_WORKER_RESTART_DELAY)
+            if not self.stopping:
+                self.start_worker(worker_id)
+    
+    def shutdown(self):
+        """Ask every worker to drain, then kill any that outlive the drain timeout"""
+        for process, _ in self.workers.values():
+            if process.is_alive():
+                process.terminate()  # SIGTERM triggers a graceful drain in the worker
+        
+        deadline = time.monotonic() + settings.WS_DRAIN_TIMEOUT + 5
+        for worker_id, (process, _) in self.workers.items():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning("Worker %d did not drain in time, killing", worker_id)
+                process.kill()
+                process.join()
+    
+    def run(self):
+        """Start workers and supervise them until SIGTERM/SIGINT"""
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+        
+        logger.info("Starting %d workers", self.num_workers)
+        for worker_id in range(self.num_workers):
+            self.start_worker(worker_id)
+        
+        while not self.stopping:
+            time.sleep(1.0)
+            self.check_workers()
+        
+        self.shutdown()
+        logger.info("All workers stopped (%d restarts)", self.restarts)
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Modules import each other from backend/, as when the server runs from there
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("AZURE_SPEECH_KEY", "test-key")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
@@ -0,0 +1,131 @@
+import asyncio
+import time
+from utils.admission import AdmissionError, Deadline, TokenBucket, UpstreamLimiter, tenant_var, turn_deadline_var
+
+
+async def refused(limiter: UpstreamLimiter, tokens: float = 0) -> str:
+    """The reason limiter refuses a call"""
+    try:
+        async with limiter.admit(tokens):
+            pass
+    except AdmissionError as e:
+        return e.reason
+    raise AssertionError("call admitted")
+
+
+def test_bucket_refills_up_to_its_burst():
+    bucket = TokenBucket(60, burst=2)  # One per second
+    start = bucket.updated
+    bucket.take(2, start)
+    assert bucket.delay(1, start) == 1.0
+    assert bucket.delay(1, start + 0.5) == 0.5
+    assert bucket.delay(1, start + 1) == 0.0
+    
+    # Idle time beyond the burst isn't banked
+    assert bucket.delay(3, start + 60) == 1.0
+
+
+def test_takers_queue_behind_each_other():
+    bucket = TokenBucket(60, burst=1)
+    start = bucket.updated
+    bucket.take(1, start)
+    bucket.take(1, start)  # Reserved ahead: the level goes negative
+    assert bucket.delay(1, start) == 2.0
+    
+    bucket.take(-1, start)  # Given back
+    assert bucket.delay(1, start) == 1.0
+
+
+def test_rate_limit_beyond_max_wait_is_refused_at_once():
+    async def run():
+        limiter = UpstreamLimiter("test", tokens_per_minute=600, max_wait_ms=100)  # Burst of 100 tokens
+        async with limiter.admit(100):
+            pass
+        
+        started = time.monotonic()
+        assert await refused(limiter, 100) == "rate"
+        assert time.monotonic() - started < 0.05
+        # Nothing was taken for the refused call
+        assert limiter.tokens.delay(100, time.monotonic()) > 9
+    
+    asyncio.run(run())
+
+
+def test_short_rate_limit_wait_is_admitted():
+    async def run():
+        limiter = UpstreamLimiter("test", tokens_per_minute=6000, max_wait_ms=500)  # 100 tokens a second
+        async with limiter.admit(1000):
+            pass
+        
+        started = time.monotonic()
+        async with limiter.admit(20) as admission:
+            assert admission.queue_ms >= 150
+        assert time.monotonic() - started < 0.4
+    
+    asyncio.run(run())
+
+
+def test_no_slot_within_max_wait_is_refused():
+    async def run():
+        limiter = UpstreamLimiter("test", max_concurrent=1, requests_per_minute=600, max_wait_ms=50)
+        async with limiter.admit():
+            assert not limiter.has_capacity()
+            assert await refused(limiter) == "max_wait"
+            assert limiter.waiting == 0
+        
+        # The refused call's request was given back
+        assert limiter.requests.level >= limiter.requests.burst - 1
+        async with limiter.admit():
+            assert limiter.in_flight == 1
+        assert limiter.in_flight == 0
+    
+    asyncio.run(run())
+
+
+def test_refused_once_the_turn_deadline_has_passed():
+    async def run():
+        limiter = UpstreamLimiter("test", max_wait_ms=3000)
+        deadline = Deadline(0.05)
+        turn_deadline_var.set(deadline)
+        async with limiter.admit():
+            pass
+        
+        await asyncio.sleep(0.06)
+        assert await refused(limiter) == "deadline"
+        
+        # Background work isn't bound by the turn
+        async with limiter.admit(bounded=False):
+            pass
+        # and neither is anything after the turn's first audio
+        deadline.clear()
+        async with limiter.admit():
+            pass
+    
+    asyncio.run(run())
+
+
+def test_slot_wait_is_cut_short_by_the_deadline():
+    async def run():
+        limiter = UpstreamLimiter("test", max_concurrent=1, max_wait_ms=3000)
+        async with limiter.admit(bounded=False):
+            turn_deadline_var.set(Deadline(0.05))
+            started = time.monotonic()
+            assert await refused(limiter) == "deadline"
+            assert time.monotonic() - started < 0.5
+    
+    asyncio.run(run())
+
+
+def test_tenant_quota():
+    async def run():
+        limiter = UpstreamLimiter("test", tenant_requests_per_minute=6, max_wait_ms=100)  # Burst of 1
+        tenant_var.set("alice")
+        async with limiter.admit():
+            pass
+        assert await refused(limiter) == "quota"
+        
+        tenant_var.set("bob")
+        async with limiter.admit():
+            pass
+    
+    asyncio.run(run())
@@ -0,0 +1,133 @@
+import warnings
+import numpy as np
+import pytest
+from utils.audio import (
+    AlawCodec, AudioCodec, CODEC_ALAW, CODEC_IMA_ADPCM, CODEC_MULAW, CODEC_PCM16, ImaAdpcmCodec, MulawCodec,
+    create_codec
+)
+
+ALL_SAMPLES = np.arange(65536, dtype=np.uint16).view(np.int16).tobytes()
+ALL_CODES = bytes(range(256))
+
+# Reference values from the G.711 tables: (linear sample, code) and (code, decoded sample)
+MULAW_ENCODED = [(0, 0xFF), (-1, 0x7E), (1000, 0xCE), (-1000, 0x4E), (32767, 0x80), (-32768, 0x00)]
+MULAW_DECODED = [(0xFF, 0), (0x7F, 0), (0xCE, 988), (0x4E, -988), (0x80, 32124), (0x00, -32124)]
+ALAW_ENCODED = [(0, 0xD5), (-1, 0x55), (1000, 0xFA), (-1000, 0x7A), (32767, 0xAA), (-32768, 0x2A)]
+ALAW_DECODED = [(0xD5, 8), (0x55, -8), (0xFA, 1008), (0x7A, -1008), (0xAA, 32256), (0x2A, -32256)]
+
+
+def pcm(samples) -> bytes:
+    return np.asarray(samples, dtype=np.int16).tobytes()
+
+
+def sine(seconds: float, frequency: float = 440, amplitude: float = 0.5, rate: int = 16000) -> bytes:
+    t = np.arange(int(seconds * rate)) / rate
+    return pcm(np.sin(2 * np.pi * frequency * t) * amplitude * 32767)
+
+
+def snr_db(reference: bytes, decoded: bytes) -> float:
+    a = np.frombuffer(reference, dtype=np.int16).astype(np.float64)
+    b = np.frombuffer(decoded, dtype=np.int16).astype(np.float64)
+    return 10 * np.log10((a ** 2).sum() / ((a - b) ** 2).sum())
+
+
+def audioop_module():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        return pytest.importorskip("audioop")  # Removed in Python 3.13
+
+
+@pytest.mark.parametrize("codec, encoded, decoded", [
+    (MulawCodec(), MULAW_ENCODED, MULAW_DECODED), (AlawCodec(), ALAW_ENCODED, ALAW_DECODED)
+])
+def test_g711_reference_values(codec, encoded, decoded):
+    samples, codes = zip(*encoded)
+    assert codec.encode(pcm(samples)) == bytes(codes)
+    codes, samples = zip(*decoded)
+    assert codec.decode(bytes(codes)) == pcm(samples)
+
+
+def test_g711_is_bit_exact_with_the_reference_implementation():
+    audioop = audioop_module()
+    mulaw, alaw = MulawCodec(), AlawCodec()
+    assert mulaw.encode(ALL_SAMPLES) == audioop.lin2ulaw(ALL_SAMPLES, 2)
+    assert mulaw.decode(ALL_CODES) == audioop.ulaw2lin(ALL_CODES, 2)
+    assert alaw.encode(ALL_SAMPLES) == audioop.lin2alaw(ALL_SAMPLES, 2)
+    assert alaw.decode(ALL_CODES) == audioop.alaw2lin(ALL_CODES, 2)
+
+
+@pytest.mark.parametrize("codec", [MulawCodec(), AlawCodec()])
+def test_g711_decoded_codes_encode_back_to_themselves(codec):
+    decoded = codec.decode(ALL_CODES)
+    reencoded = codec.encode(decoded)
+    # Both zeros of μ-law (0x7F and 0xFF) decode to 0, which encodes as 0xFF
+    assert sum(a != b for a, b in zip(reencoded, ALL_CODES)) <= 1
+
+
+@pytest.mark.parametrize("count", [1, 2, 128, 129, 130, 258, 259, 1000, 64 * 129 + 5])
+def test_adpcm_keeps_the_sample_count(count):
+    codec = ImaAdpcmCodec()
+    audio = sine(1)[:count * 2]
+    encoded = codec.encode(audio)
+    blocks = -(-count // codec.block_samples)
+    assert len(encoded) == (blocks - 1) * codec.block_size + 4 + (count - (blocks - 1) * codec.block_samples) // 2
+    assert len(codec.decode(encoded)) == count * 2
+
+
+def test_adpcm_quality():
+    codec = ImaAdpcmCodec()
+    audio = sine(1)
+    assert snr_db(audio, codec.decode(codec.encode(audio))) > 25
+
+
+def test_adpcm_vectorized_and_loop_paths_agree():
+    audio = sine(1, frequency=1234) + pcm(np.random.default_rng(1).normal(0, 3000, 4000))
+    loop = ImaAdpcmCodec()
+    loop.vectorize_blocks = 10 ** 9
+    vectorized = ImaAdpcmCodec()
+    vectorized.vectorize_blocks = 1
+    encoded = loop.encode(audio)
+    assert vectorized.encode(audio) == encoded
+    assert vectorized.decode(encoded) == loop.decode(encoded)
+
+
+def test_adpcm_blocks_carry_no_state_between_them():
+    codec = ImaAdpcmCodec()
+    encoded = codec.encode(sine(0.5))
+    whole = codec.decode(encoded)
+    # Each block decodes on its own to the same samples
+    blocks = [encoded[i:i + codec.block_size] for i in range(0, len(encoded), codec.block_size)]
+    assert b"".join(codec.decode(block) for block in blocks) == whole
+
+
+@pytest.mark.parametrize("chunk_samples", [160, 320, 333, 1000])
+def test_adpcm_streamed_chunks_do_not_drift(chunk_samples):
+    codec = ImaAdpcmCodec()
+    audio = sine(1)
+    chunk_bytes = chunk_samples * 2
+    decoded = b"".join(
+        codec.decode(codec.encode(audio[i:i + chunk_bytes])) for i in range(0, len(audio), chunk_bytes)
+    )
+    assert len(decoded) == len(audio)
+    assert snr_db(audio, decoded) > 25
+
+
+def test_truncated_adpcm_header_is_rejected():
+    codec = ImaAdpcmCodec()
+    encoded = codec.encode(sine(0.1))
+    with pytest.raises(ValueError):
+        codec.decode(encoded[:codec.block_size + 2])
+
+
+def test_create_codec():
+    assert type(create_codec(CODEC_PCM16)) is AudioCodec
+    assert isinstance(create_codec(CODEC_MULAW), MulawCodec)
+    assert isinstance(create_codec(CODEC_ALAW, 8000), AlawCodec)
+    assert create_codec(CODEC_IMA_ADPCM, 8000).sample_rate == 8000
+    with pytest.raises(KeyError):
+        create_codec("speex")
+
+
+def test_duration():
+    assert MulawCodec().duration_ms(160) == 10
+    assert AudioCodec(8000).duration_ms(160) == 10
@@ -0,0 +1,18 @@
+import json
+from llm.intent import IntentClassifier
+
+
+def test_training_file_may_contain_blank_lines(tmp_path):
+    examples = [
+        {"text": "what's the weather like today", "intent": "weather"},
+        {"text": "will it rain tomorrow", "intent": "weather"},
+        {"text": "book a table for two", "intent": "booking"},
+        {"text": "reserve a table at seven", "intent": "booking"}
+    ]
+    path = tmp_path / "intents.jsonl"
+    lines = [json.dumps(example) for example in examples]
+    path.write_text(lines[0] + "\n\n" + "\n".join(lines[1:]) + "\n   \n")
+    
+    classifier = IntentClassifier.from_file(path)
+    assert sorted(classifier.labels) == ["booking", "weather"]
+    assert classifier.classify("is it going to rain")["intent"] == "weather"
@@ -0,0 +1,97 @@
+import asyncio
+from llm.memory import ConversationMemory, turn_tokens
+
+SYSTEM = "You are a helpful voice assistant."
+
+
+def turn(index: int):
+    # 28 estimated tokens per turn, framing included
+    return f"question {index:02d}".ljust(40, "?"), f"answer {index:02d}".ljust(40, ".")
+
+
+def window_tokens(memory: ConversationMemory) -> int:
+    return sum(turn_tokens(t) for t in memory.turns)
+
+
+def test_turns_within_budget_are_kept():
+    memory = ConversationMemory(max_tokens=100)
+    for index in range(3):
+        memory.add_turn(*turn(index))
+    assert memory.turns == [turn(0), turn(1), turn(2)]
+    assert memory.tokens() == 84
+    assert memory.evictions == 0
+
+
+def test_eviction_goes_down_to_the_low_water_mark():
+    memory = ConversationMemory(max_tokens=100, low_water=0.6)
+    for index in range(4):
+        memory.add_turn(*turn(index))
+    
+    # 112 tokens is over budget: the oldest go in one batch until at most 60 are left
+    assert memory.turns == [turn(2), turn(3)]
+    assert memory.evictions == 2
+    assert window_tokens(memory) <= 60
+    
+    # The next turn fits again, so nothing else is evicted
+    memory.add_turn(*turn(4))
+    assert memory.turns == [turn(2), turn(3), turn(4)]
+    assert memory.evictions == 2
+    assert memory.tokens() <= 100
+
+
+def test_latest_turn_is_kept_however_long():
+    memory = ConversationMemory(max_tokens=50)
+    memory.add_turn(*turn(0))
+    memory.add_turn("tell me everything", "x" * 400)
+    assert memory.turns == [("tell me everything", "x" * 400)]
+
+
+def test_prompt_prefix_is_stable_between_evictions():
+    memory = ConversationMemory(max_tokens=1000)
+    memory.add_turn(*turn(0))
+    first = memory.build_messages(SYSTEM, "question 1", "Context: 1")
+    memory.add_turn("question 1", "answer 1")
+    second = memory.build_messages(SYSTEM, "question 2", "Context: 2")
+    
+    # Everything before the per-turn context is repeated verbatim, then the new exchange
+    stable = len(first) - 2
+    assert second[:stable] == first[:stable]
+    assert second[stable:stable + 2] == [
+        {"role": "user", "content": "question 1"}, {"role": "assistant", "content": "answer 1"}
+    ]
+    assert second[-2:] == [{"role": "system", "content": "Context: 2"}, {"role": "user", "content": "question 2"}]
+
+
+def test_evicted_turns_are_sent_until_summarized():
+    async def run():
+        release = asyncio.Event()
+        batches = []
+        
+        async def summarize(summary, turns):
+            batches.append(list(turns))
+            await release.wait()
+            return "They asked questions 0 and 1."
+        
+        memory = ConversationMemory(summarize, max_tokens=100, low_water=0.6)
+        for index in range(4):
+            memory.add_turn(*turn(index))
+        await asyncio.sleep(0)
+        
+        # Still summarizing: the evicted turns keep their place at the front
+        messages = memory.build_messages(SYSTEM, "next")
+        assert [m["content"] for m in messages[1:3]] == list(turn(0))
+        # and don't make the next turn evict again
+        memory.add_turn(*turn(4))
+        assert memory.turns == [turn(2), turn(3), turn(4)]
+        assert memory.evictions == 2
+        
+        release.set()
+        await asyncio.sleep(0.01)
+        assert batches == [[turn(0), turn(1)]]
+        assert memory.evicted == []
+        messages = memory.build_messages(SYSTEM, "next")
+        assert messages[1]["content"].endswith("They asked questions 0 and 1.")
+        assert [m["content"] for m in messages[2:4]] == list(turn(2))
+        memory.close()
+    
+    asyncio.run(run())
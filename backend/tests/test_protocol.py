@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+from unittest import mock
+import numpy as np
+import pytest
+from utils.audio import CODEC_ALAW, CODEC_IMA_ADPCM, CODEC_MULAW, CODEC_PCM16, CODECS_BY_FLAG, MulawCodec
+from websocket.handlers import AudioMessageHandler
+from websocket.protocol import (
+    FRAME_AUDIO, FRAME_VERSION, HEADER_SIZE, PROTOCOL_BINARY_V1, PROTOCOL_JSON, FrameError, decode_frame,
+    encode_audio_frame, negotiate_codec, negotiate_protocol, negotiate_sample_rate
+)
+
+PCM = np.arange(-160, 160, dtype=np.int16).tobytes()
+
+
+def test_header_layout():
+    frame = encode_audio_frame(b"\x01\x02", sequence=0x01020304, flags=MulawCodec.frame_flag)
+    assert HEADER_SIZE == 8
+    assert frame == bytes([FRAME_VERSION, FRAME_AUDIO, 1, 0, 4, 3, 2, 1, 1, 2])
+
+
+def test_frame_round_trip():
+    kind, flags, sequence, payload = decode_frame(encode_audio_frame(PCM, 41))
+    assert (kind, flags, sequence) == (FRAME_AUDIO, 0, 41)
+    assert isinstance(payload, memoryview)
+    assert payload.tobytes() == PCM
+
+
+def test_sequence_wraps():
+    _, _, sequence, _ = decode_frame(encode_audio_frame(PCM, 2 ** 32 + 5))
+    assert sequence == 5
+
+
+@pytest.mark.parametrize("frame, message", [
+    (b"\x01\x01\x00", "too short"),
+    (bytes([2, FRAME_AUDIO, 0, 0, 0, 0, 0, 0]) + PCM, "version"),
+    (encode_audio_frame(PCM[:-1], 0), "16-bit")
+])
+def test_malformed_frames_are_rejected(frame, message):
+    with pytest.raises(FrameError, match=message):
+        decode_frame(frame)
+
+
+def test_encoded_payloads_may_have_odd_length():
+    _, flags, _, payload = decode_frame(encode_audio_frame(b"\xff" * 3, 0, MulawCodec.frame_flag))
+    assert flags == MulawCodec.frame_flag and len(payload) == 3
+
+
+def test_negotiate_protocol():
+    assert negotiate_protocol(None) == PROTOCOL_JSON
+    assert negotiate_protocol(PROTOCOL_BINARY_V1) == PROTOCOL_BINARY_V1
+    assert negotiate_protocol(["pcm-binary/2", PROTOCOL_BINARY_V1]) == PROTOCOL_BINARY_V1
+    assert negotiate_protocol([PROTOCOL_JSON, PROTOCOL_BINARY_V1]) == PROTOCOL_JSON
+    assert negotiate_protocol(["carrier-pigeon"]) == PROTOCOL_JSON
+
+
+def test_negotiate_codec():
+    with mock.patch("websocket.protocol.settings.AUDIO_CODECS", "pcm16,mulaw,alaw,ima-adpcm"):
+        assert negotiate_codec(None) == CODEC_PCM16
+        assert negotiate_codec(CODEC_MULAW) == CODEC_MULAW
+        assert negotiate_codec(["speex", CODEC_IMA_ADPCM, CODEC_MULAW]) == CODEC_IMA_ADPCM
+        assert negotiate_codec(["speex"]) == CODEC_PCM16
+    
+    # Codecs the deployment doesn't allow are passed over
+    with mock.patch("websocket.protocol.settings.AUDIO_CODECS", "pcm16, alaw"):
+        assert negotiate_codec([CODEC_MULAW, CODEC_ALAW]) == CODEC_ALAW
+        assert negotiate_codec([CODEC_MULAW]) == CODEC_PCM16
+
+
+def test_negotiate_sample_rate():
+    assert negotiate_sample_rate(None) == 16000
+    assert negotiate_sample_rate("48000") == 48000
+    assert negotiate_sample_rate(8000) == 8000
+    assert negotiate_sample_rate("fast") == 16000
+    assert negotiate_sample_rate(4000) == 16000
+    assert negotiate_sample_rate(192000) == 16000
+
+
+def receiving_handler():
+    """Just what process_binary_frame uses of a connection's handler"""
+    return SimpleNamespace(uplink_codecs={}, input_rate=16000, push_audio=mock.Mock())
+
+
+def test_frames_in_an_unknown_codec_are_dropped():
+    unknown = max(CODECS_BY_FLAG) + 1
+    handler = receiving_handler()
+    AudioMessageHandler.process_binary_frame(handler, encode_audio_frame(b"\x00" * 10, 0, unknown))
+    handler.push_audio.assert_not_called()
+    assert handler.uplink_codecs == {}
+
+
+def test_encoded_frames_are_decoded_before_recognition():
+    handler = receiving_handler()
+    codec = MulawCodec()
+    encoded = codec.encode(PCM)
+    AudioMessageHandler.process_binary_frame(handler, encode_audio_frame(encoded, 0, codec.frame_flag))
+    handler.push_audio.assert_called_once_with(codec.decode(encoded))
+    
+    # Raw PCM goes through as a view into the frame
+    handler.push_audio.reset_mock()
+    AudioMessageHandler.process_binary_frame(handler, encode_audio_frame(PCM, 1))
+    assert bytes(handler.push_audio.call_args[0][0]) == PCM
@@ -0,0 +1,141 @@
+import asyncio
+import time
+import openai
+from llm.request_policy import LLMTimeout, RequestPolicy
+
+
+class FakeAttempts:
+    """
+    start() for RequestPolicy.stream: attempt i follows plans[i] (the last plan
+    repeats), a list of text chunks, seconds to wait, and errors to raise
+    """
+    
+    def __init__(self, *plans):
+        self.plans = plans
+        self.started = 0
+        self.closed = []
+    
+    def __call__(self):
+        index = self.started
+        self.started += 1
+        return self.attempt(index, self.plans[min(index, len(self.plans) - 1)])
+    
+    async def attempt(self, index, plan):
+        try:
+            for step in plan:
+                if isinstance(step, BaseException):
+                    raise step
+                if isinstance(step, (int, float)):
+                    await asyncio.sleep(step)
+                else:
+                    yield step
+        finally:
+            self.closed.append(index)
+
+
+def connection_error():
+    return openai.APIConnectionError(request=None)
+
+
+async def collect(policy, attempts):
+    return [text async for text in policy.stream(attempts)]
+
+
+def test_hedge_wins_and_the_loser_is_closed():
+    async def run():
+        policy = RequestPolicy(hedge_default_ms=50, first_token_timeout_ms=2000)
+        attempts = FakeAttempts([1.0, "slow"], ["fast", " reply"])
+        assert await collect(policy, attempts) == ["fast", " reply"]
+        assert attempts.started == 2
+        # The primary is closed as soon as the hedge streams, before its text is used
+        assert attempts.closed == [0, 1]
+    
+    asyncio.run(run())
+
+
+def test_fast_primary_is_not_hedged():
+    async def run():
+        policy = RequestPolicy(hedge_default_ms=200, first_token_timeout_ms=2000)
+        attempts = FakeAttempts(["hello", 0.01, " there"])
+        assert await collect(policy, attempts) == ["hello", " there"]
+        assert attempts.started == 1
+    
+    asyncio.run(run())
+
+
+def test_first_token_deadline():
+    async def run():
+        policy = RequestPolicy(hedging=False, first_token_timeout_ms=50)
+        attempts = FakeAttempts([1.0, "late"])
+        started = time.monotonic()
+        try:
+            await collect(policy, attempts)
+        except LLMTimeout:
+            pass
+        else:
+            raise AssertionError("no timeout")
+        assert time.monotonic() - started < 0.5
+        assert attempts.closed == [0]
+    
+    asyncio.run(run())
+
+
+def test_stalled_stream_ends():
+    async def run():
+        policy = RequestPolicy(hedging=False, stall_timeout_ms=50)
+        attempts = FakeAttempts(["first", 1.0, "never"])
+        texts = []
+        try:
+            async for text in policy.stream(attempts):
+                texts.append(text)
+        except LLMTimeout:
+            pass
+        else:
+            raise AssertionError("no timeout")
+        assert texts == ["first"]
+        assert attempts.closed == [0]
+    
+    asyncio.run(run())
+
+
+def test_transient_error_is_retried():
+    async def run():
+        policy = RequestPolicy(hedging=False, max_retries=2, first_token_timeout_ms=2000)
+        policy.backoff = lambda retry: 0.01
+        attempts = FakeAttempts([connection_error()], ["ok"])
+        assert await collect(policy, attempts) == ["ok"]
+        assert attempts.started == 2
+    
+    asyncio.run(run())
+
+
+def test_retry_skipped_when_the_deadline_cannot_be_met():
+    async def run():
+        policy = RequestPolicy(hedging=False, max_retries=2, first_token_timeout_ms=200)
+        policy.backoff = lambda retry: 0.5  # Backing off would already miss the first-token deadline
+        attempts = FakeAttempts([connection_error()], ["too late"])
+        try:
+            await collect(policy, attempts)
+        except openai.APIConnectionError:
+            pass
+        else:
+            raise AssertionError("error not raised")
+        assert attempts.started == 1
+    
+    asyncio.run(run())
+
+
+def test_permanent_error_is_not_retried():
+    async def run():
+        policy = RequestPolicy(hedging=False, max_retries=2, first_token_timeout_ms=2000)
+        policy.backoff = lambda retry: 0.01
+        attempts = FakeAttempts([ValueError("bad request")], ["ok"])
+        try:
+            await collect(policy, attempts)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("error not raised")
+        assert attempts.started == 1
+    
+    asyncio.run(run())
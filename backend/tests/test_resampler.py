@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+from utils.audio import AudioProcessor, StreamingResampler
+
+CONVERSIONS = [(48000, 16000), (44100, 16000), (8000, 16000), (16000, 48000), (16000, 24000)]
+
+
+def tone(rate: int, seconds: float, frequency: float = 1000, amplitude: float = 0.5) -> np.ndarray:
+    t = np.arange(int(rate * seconds)) / rate
+    return np.sin(2 * np.pi * frequency * t) * amplitude
+
+
+def int16(audio: np.ndarray) -> np.ndarray:
+    return np.rint(audio * 32767).astype(np.int16)
+
+
+def chunked(resampler: StreamingResampler, audio: np.ndarray, sizes) -> np.ndarray:
+    out, offset, index = [], 0, 0
+    while offset < len(audio):
+        size = sizes[index % len(sizes)]
+        out.append(resampler.process(audio[offset:offset + size]))
+        offset += size
+        index += 1
+    out.append(resampler.flush(audio.dtype))
+    return np.concatenate(out)
+
+
+def snr_db(reference: np.ndarray, actual: np.ndarray) -> float:
+    return 10 * np.log10((reference ** 2).sum() / ((reference - actual) ** 2).sum())
+
+
+@pytest.mark.parametrize("orig_rate, target_rate", CONVERSIONS)
+def test_output_does_not_depend_on_chunking(orig_rate, target_rate):
+    audio = int16(tone(orig_rate, 0.5) + np.random.default_rng(1).normal(0, 0.05, int(orig_rate * 0.5)))
+    whole = chunked(StreamingResampler(orig_rate, target_rate), audio, [len(audio)])
+    for sizes in ([1], [7, 0, 160], [441], [960, 13], [4000]):
+        assert np.array_equal(chunked(StreamingResampler(orig_rate, target_rate), audio, sizes), whole)
+
+
+@pytest.mark.parametrize("orig_rate, target_rate", CONVERSIONS)
+def test_float_output_does_not_depend_on_chunking(orig_rate, target_rate):
+    audio = tone(orig_rate, 0.25).astype(np.float32)
+    whole = chunked(StreamingResampler(orig_rate, target_rate), audio, [len(audio)])
+    pieces = chunked(StreamingResampler(orig_rate, target_rate), audio, [1, 37, 512])
+    assert whole.dtype == np.float32
+    assert np.array_equal(pieces, whole)
+
+
+@pytest.mark.parametrize("orig_rate", [48000, 44100])
+def test_downsampled_sine_is_accurate(orig_rate):
+    seconds = 0.5
+    out = AudioProcessor.resample(tone(orig_rate, seconds).astype(np.float32), orig_rate, 16000)
+    assert len(out) == int(np.ceil(orig_rate * seconds * 16000 / orig_rate))
+    
+    # Aligned with the input: compare with the same tone sampled at 16 kHz, away from the edges
+    expected = tone(16000, seconds)[:len(out)]
+    edge = 200
+    assert snr_db(expected[edge:-edge], out[edge:-edge]) > 60
+
+
+@pytest.mark.parametrize("orig_rate", [48000, 44100])
+def test_frequencies_above_the_new_nyquist_are_removed(orig_rate):
+    out = AudioProcessor.resample(tone(orig_rate, 0.5, frequency=10000).astype(np.float32), orig_rate, 16000)
+    # A 10 kHz tone would alias to 6 kHz at 16 kHz; the filter must take it out
+    assert np.abs(out[200:-200]).max() < 0.5 * 10 ** (-60 / 20)
+
+
+def test_int16_stream_stays_int16():
+    audio = int16(tone(48000, 0.1))
+    out = AudioProcessor.resample(audio, 48000, 16000)
+    assert out.dtype == np.int16 and len(out) == 1600
+    expected = int16(tone(16000, 0.1))
+    assert np.abs(out[100:-100].astype(np.int32) - expected[100:-100]).max() <= 2
+
+
+def test_same_rate_is_passed_through():
+    audio = int16(tone(16000, 0.1))
+    assert AudioProcessor.resample(audio, 16000, 16000) is audio
+
+
+def test_streaming_output_lags_by_the_filter_delay():
+    resampler = StreamingResampler(48000, 16000)
+    audio = int16(tone(48000, 0.2))
+    out = np.concatenate([resampler.process(audio), resampler.flush()])
+    aligned = AudioProcessor.resample(audio, 48000, 16000)
+    assert np.array_equal(out[resampler.delay:resampler.delay + len(aligned)], aligned)
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+from speech.sdk_executor import (
+    PRIORITY_BACKGROUND, PRIORITY_FIRST_SEGMENT, PRIORITY_SEGMENT, PRIORITY_SESSION, SDKExecutor
+)
+
+
+def test_most_urgent_call_runs_first():
+    async def run():
+        executor = SDKExecutor(1)
+        gate = threading.Event()
+        executor.submit(gate.wait)  # Keeps the only worker busy while the rest queue up
+        await asyncio.sleep(0.05)
+        
+        order = []
+        calls = [
+            ("background", PRIORITY_BACKGROUND), ("segment", PRIORITY_SEGMENT),
+            ("first", PRIORITY_FIRST_SEGMENT), ("segment 2", PRIORITY_SEGMENT), ("session", PRIORITY_SESSION)
+        ]
+        tasks = [asyncio.create_task(executor.run(order.append, name, priority=priority)) for name, priority in calls]
+        await asyncio.sleep(0.01)
+        gate.set()
+        await asyncio.gather(*tasks)
+        executor.shutdown(1)
+        assert order == ["first", "session", "segment", "segment 2", "background"]
+    
+    asyncio.run(run())
+
+
+def test_errors_reach_the_caller():
+    async def run():
+        executor = SDKExecutor(1)
+        try:
+            await executor.run(lambda: 1 / 0)
+        except ZeroDivisionError:
+            pass
+        else:
+            raise AssertionError("error not raised")
+        executor.shutdown(1)
+    
+    asyncio.run(run())
+
+
+def test_calls_after_shutdown_stay_off_the_event_loop():
+    async def run():
+        executor = SDKExecutor(1)
+        executor.shutdown(1)
+        loop_thread = threading.get_ident()
+        
+        assert await executor.run(threading.get_ident) != loop_thread
+        submitted = threading.Event()
+        executor.submit(lambda: submitted.set() if threading.get_ident() != loop_thread else None)
+        assert await asyncio.get_running_loop().run_in_executor(None, submitted.wait, 1)
+    
+    asyncio.run(run())
@@ -0,0 +1,42 @@
+import asyncio
+from websocket.sessions import SessionStore
+
+
+def test_claim_needs_the_same_token():
+    async def run():
+        store = SessionStore(window_s=30, max_sessions=10)
+        closed = []
+        assert store.park("s1", "token", {"turns": 2}, closed.append)
+        assert store.claim("s1", "other") is None
+        assert store.claim("s1", "token") == {"turns": 2}
+        assert store.claim("s1", "token") is None
+        assert closed == []
+    
+    asyncio.run(run())
+
+
+def test_unclaimed_sessions_expire():
+    async def run():
+        store = SessionStore(window_s=0.05, max_sessions=10)
+        closed = []
+        store.park("s1", "token", {"id": 1}, closed.append)
+        await asyncio.sleep(0.1)
+        assert closed == [{"id": 1}]
+        assert len(store) == 0
+    
+    asyncio.run(run())
+
+
+def test_park_after_close_closes_the_session():
+    async def run():
+        store = SessionStore(window_s=30, max_sessions=10)
+        closed = []
+        store.park("s1", "token", {"id": 1}, closed.append)
+        store.close()
+        assert closed == [{"id": 1}]
+        
+        assert not store.park("s2", "token", {"id": 2}, closed.append)
+        assert closed == [{"id": 1}, {"id": 2}]
+        assert len(store) == 0
+    
+    asyncio.run(run())
@@ -0,0 +1,127 @@
+import asyncio
+import ctypes
+from unittest import mock
+import azure.cognitiveservices.speech as speechsdk
+from speech import stt
+from speech.stt import AzureSTT
+
+
+async def on_recognized(text):
+    pass
+
+
+def prepared_recognizer(start_error=None):
+    """A pooled recognizer stand-in whose start can fail"""
+    prepared = mock.MagicMock()
+    if start_error:
+        prepared.recognizer.start_continuous_recognition.side_effect = start_error
+    return prepared
+
+
+async def wait_for(condition, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_failed_start_closes_the_prepared_recognizer():
+    async def run():
+        prepared = prepared_recognizer(RuntimeError("service unavailable"))
+        stt = AzureSTT(on_recognized, prepared=prepared)
+        try:
+            await stt.start()
+        except RuntimeError:
+            pass
+        else:
+            raise AssertionError("start did not fail")
+        
+        await wait_for(lambda: prepared.close.called)
+        stt.stop()
+        assert not stt.is_running
+        prepared.recognizer.stop_continuous_recognition.assert_not_called()
+        prepared.close.assert_called_once()
+    
+    asyncio.run(run())
+
+
+def test_stop_after_start_stops_recognition():
+    async def run():
+        prepared = prepared_recognizer()
+        stt = AzureSTT(on_recognized, prepared=prepared)
+        await stt.start()
+        assert stt.is_running
+        
+        stt.stop()
+        await wait_for(lambda: prepared.push_stream.close.called)
+        prepared.recognizer.stop_continuous_recognition.assert_called_once()
+        prepared.close.assert_not_called()
+    
+    asyncio.run(run())
+
+
+def test_stop_before_start_closes_the_prepared_recognizer():
+    async def run():
+        prepared = prepared_recognizer()
+        stt = AzureSTT(on_recognized, prepared=prepared)
+        stt.stop()
+        await wait_for(lambda: prepared.close.called)
+        prepared.recognizer.start_continuous_recognition.assert_not_called()
+    
+    asyncio.run(run())
+
+
+def written(buffer) -> bytes:
+    """What the native write would read: len(buffer) bytes at the pointer ctypes passes"""
+    return ctypes.string_at(getattr(buffer, "_as_parameter_", buffer), len(buffer))
+
+
+def test_buffer_views_are_pinned_to_the_installed_sdk():
+    # On an SDK upgrade: re-check PushAudioInputStream.write, then add the release
+    assert speechsdk.__version__ in stt.BUFFER_VIEW_SDK_VERSIONS
+    assert stt.BUFFER_VIEWS
+
+
+def test_sdk_write_passes_the_buffer_view_through():
+    audio = bytes(range(256)) * 4
+    view = stt._BufferView(memoryview(audio)).select(100, 500)
+    
+    calls = []
+    
+    def push_audio_input_stream_write(handle, buffer, size):
+        calls.append((written(buffer), size))
+        return 0
+    
+    fake_lib = mock.Mock(push_audio_input_stream_write=push_audio_input_stream_write)
+    stream = speechsdk.audio.PushAudioInputStream()
+    with mock.patch.object(speechsdk.audio, "_sdk_lib", fake_lib):
+        stream.write(view)
+    assert calls == [(audio[100:600], 500)]
+    
+    # and the native library takes it as it is
+    stream.write(view)
+    stream.close()
+
+
+def push_one_frame(buffer_views: bool):
+    async def run():
+        prepared = prepared_recognizer()
+        with mock.patch.object(stt, "BUFFER_VIEWS", buffer_views):
+            recognizer = AzureSTT(on_recognized, prepared=prepared)
+        await recognizer.start()
+        audio = bytes(range(256)) * 5  # One 40 ms frame
+        recognizer.push_audio(memoryview(audio))
+        buffer = prepared.push_stream.write.call_args[0][0]
+        assert written(buffer) == audio
+        recognizer.stop()
+        return buffer
+    
+    return asyncio.run(run())
+
+
+def test_frames_are_written_from_the_ring():
+    assert isinstance(push_one_frame(True), stt._BufferView)
+
+
+def test_frames_are_copied_for_other_sdk_releases():
+    assert isinstance(push_one_frame(False), bytes)
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import time
+from speech.tts_cache import DiskAudioStore, TTSCache, cache_key
+
+
+def key(text: str) -> str:
+    return cache_key("en-US-JennyNeural", "raw-16khz-16bit-mono-pcm", text)
+
+
+def age(store: DiskAudioStore, k: str, seconds: float):
+    then = time.time() - seconds
+    os.utime(store._path(k), (then, then))
+
+
+def test_disk_entries_expire_after_the_ttl(tmp_path):
+    store = DiskAudioStore(str(tmp_path), ttl=60)
+    store._write(key("hello"), b"\x01\x00" * 100)
+    assert store._read(key("hello")) == b"\x01\x00" * 100
+    
+    age(store, key("hello"), 120)
+    assert store._read(key("hello")) is None
+    assert not store._path(key("hello")).exists()
+    assert store.current_bytes == 0
+    assert store.expired == 1
+
+
+def test_disk_is_pruned_oldest_first(tmp_path):
+    store = DiskAudioStore(str(tmp_path), max_bytes=300)
+    for text in ("one", "two", "three"):
+        store._write(key(text), b"\x00" * 100)
+    assert store.current_bytes == 300
+    
+    store._write(key("four"), b"\x00" * 150)
+    # "one" and "two" had to go for the 150 new bytes
+    assert store._read(key("one")) is None
+    assert store._read(key("two")) is None
+    assert store._read(key("three")) is not None
+    assert store._read(key("four")) is not None
+    assert store.current_bytes == 250
+    assert store.pruned == 2
+
+
+def test_rewriting_an_entry_does_not_count_it_twice(tmp_path):
+    store = DiskAudioStore(str(tmp_path), max_bytes=300)
+    store._write(key("one"), b"\x00" * 100)
+    store._write(key("one"), b"\x00" * 200)
+    assert store.current_bytes == 200
+    assert store.pruned == 0
+
+
+def test_existing_files_count_against_the_cap_on_restart(tmp_path):
+    store = DiskAudioStore(str(tmp_path))
+    for index, text in enumerate(("old", "middle", "new")):
+        store._write(key(text), b"\x00" * 100)
+        age(store, key(text), 30 - index * 10)
+    
+    restarted = DiskAudioStore(str(tmp_path), max_bytes=200)
+    assert restarted.current_bytes == 200
+    assert restarted._read(key("old")) is None
+    assert restarted._read(key("middle")) is not None
+    assert restarted._read(key("new")) is not None
+
+
+def test_expired_disk_entry_is_a_cache_miss(tmp_path):
+    async def run():
+        store = DiskAudioStore(str(tmp_path), ttl=60)
+        cache = TTSCache(max_bytes=1024, store=store)
+        await cache.set(key("hello"), b"\x01\x00" * 10)
+        
+        # A fresh process: only the disk layer has it
+        cache = TTSCache(max_bytes=1024, store=store)
+        assert await cache.get(key("hello")) == b"\x01\x00" * 10
+        cache = TTSCache(max_bytes=1024, store=store)
+        age(store, key("hello"), 120)
+        assert await cache.get(key("hello")) is None
+    
+    asyncio.run(run())
@@ -0,0 +1,70 @@
+import numpy as np
+from speech.vad import MODE_COMPRESS, SPEECH_START, StreamingVAD
+
+FRAME = 320  # 20 ms at 16 kHz
+
+
+def make_vad(**options) -> StreamingVAD:
+    defaults = dict(
+        mode=MODE_COMPRESS, frame_ms=20, threshold_db=10, min_energy_db=-55, onset_ms=60,
+        hangover_ms=400, preroll_ms=300, tail_ms=800, noise_adapt_rate=0.05, compress_ratio=8
+    )
+    defaults.update(options)
+    return StreamingVAD(**defaults)
+
+
+def frames(count: int, level: float, rng: np.random.Generator) -> list:
+    return [rng.normal(0, level, FRAME).astype(np.int16).tobytes() for _ in range(count)]
+
+
+def test_compress_mode_releases_the_full_preroll_in_order():
+    rng = np.random.default_rng(1)
+    silence = frames(100, 30, rng)
+    speech = [
+        (np.sin(2 * np.pi * 180 * np.arange(FRAME) / 16000) * 6000 + rng.normal(0, 30, FRAME)).astype(np.int16).tobytes()
+        for _ in range(5)
+    ]
+    stream = silence + speech
+    index = {frame: number for number, frame in enumerate(stream)}
+    
+    vad = make_vad()
+    forwarded = []
+    start_at = None
+    for offset in range(0, len(stream), 5):  # 100 ms chunks
+        audio, events = vad.process(b"".join(stream[offset:offset + 5]))
+        audio = bytes(audio)
+        if any(event == SPEECH_START for event, _ in events):
+            start_at = len(forwarded)
+        forwarded += [index[audio[i:i + FRAME * 2]] for i in range(0, len(audio), FRAME * 2)]
+    
+    assert start_at is not None
+    # Silence was still trickled through while nobody spoke
+    assert 0 < start_at < len(silence) // 4
+    # Nothing out of order or repeated
+    assert forwarded == sorted(set(forwarded))
+    # Speech was confirmed on its third frame: the 300 ms (15 frames) before it come first
+    confirmed = len(silence) + 2
+    assert forwarded[start_at:] == list(range(confirmed - 15, len(stream)))
+
+
+def test_decisions_do_not_depend_on_chunking():
+    rng = np.random.default_rng(2)
+    tone = (np.sin(2 * np.pi * 180 * np.arange(16000) / 16000) * 6000).astype(np.int16)
+    audio = np.concatenate([
+        rng.normal(0, 30, 16000).astype(np.int16), tone, rng.normal(0, 30, 24000).astype(np.int16), tone[:8000]
+    ]).tobytes()
+    
+    def run(chunk_samples: int):
+        vad = make_vad()
+        out, events = [], []
+        for offset in range(0, len(audio), chunk_samples * 2):
+            forwarded, chunk_events = vad.process(audio[offset:offset + chunk_samples * 2])
+            out.append(bytes(forwarded))
+            events += chunk_events
+        return b"".join(out), events
+    
+    # Whole frames, the browser's 4096-sample buffer, and an odd size
+    reference = run(FRAME * 4)
+    assert reference[1]
+    assert run(4096) == reference
+    assert run(1001) == reference
@@ -0,0 +1,103 @@
+import json
+import numpy as np
+from auth.voice_index import USERS_FILE, EmbeddingIndex
+
+DIM = 8
+
+
+def unit(seed: int) -> np.ndarray:
+    vector = np.random.default_rng(seed).normal(size=DIM).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def log_lines(index: EmbeddingIndex) -> list:
+    path = index._log_path(index.generation)
+    return path.read_text().splitlines() if path.exists() else []
+
+
+def assert_same(index: EmbeddingIndex, reloaded: EmbeddingIndex):
+    assert reloaded.users == index.users
+    assert reloaded.enrollments == index.enrollments
+    for user_id in index.users:
+        assert np.array_equal(reloaded.get(user_id), index.get(user_id))
+
+
+def test_save_appends_only_the_new_changes(tmp_path):
+    index = EmbeddingIndex(tmp_path, dim=DIM)
+    for number in range(50):
+        index.add(f"user-{number}", unit(number))
+    index.save()
+    snapshot = (tmp_path / USERS_FILE).read_text()
+    assert len(log_lines(index)) == 50
+    
+    index.add("user-50", unit(50))
+    index.save()
+    # users.json isn't rewritten for one enrollment
+    assert (tmp_path / USERS_FILE).read_text() == snapshot
+    assert log_lines(index)[-1] == json.dumps(["add", "user-50"])
+    assert len(log_lines(index)) == 51
+
+
+def test_reload_replays_adds_enrollments_and_removals(tmp_path):
+    index = EmbeddingIndex(tmp_path, dim=DIM, initial_capacity=4)
+    for number in range(10):
+        index.add(f"user-{number}", unit(number))
+    index.save()
+    index.add("user-3", unit(100))
+    index.remove("user-5")
+    index.add("user-10", unit(10))
+    index.save()
+    
+    reloaded = EmbeddingIndex(tmp_path, dim=DIM)
+    assert_same(index, reloaded)
+    assert "user-5" not in reloaded
+    assert reloaded.enrollments[reloaded.users.index("user-3")] == 2
+
+
+def test_log_is_folded_once_it_outgrows_the_user_list(tmp_path):
+    index = EmbeddingIndex(tmp_path, dim=DIM)
+    for number in range(5):
+        index.add(f"user-{number}", unit(number))
+    index.save()
+    generation = index.generation
+    
+    for number in range(5):
+        index.add(f"user-{number}", unit(number + 10))  # Re-enrollments: more changes than users
+        index.save()
+    assert index.generation == generation + 1
+    assert not index._log_path(generation).exists()
+    # Folded at the first re-enrollment (6 changes for 5 users); the other four are in the new log
+    assert json.loads((tmp_path / USERS_FILE).read_text())["enrollments"] == [2, 1, 1, 1, 1]
+    assert len(log_lines(index)) == 4
+    
+    assert_same(index, EmbeddingIndex(tmp_path, dim=DIM))
+
+
+def test_torn_entry_from_a_crash_is_ignored(tmp_path):
+    index = EmbeddingIndex(tmp_path, dim=DIM)
+    for number in range(3):
+        index.add(f"user-{number}", unit(number))
+    index.save()
+    with open(index._log_path(index.generation), "a") as f:
+        f.write('["add", "user-')
+    
+    reloaded = EmbeddingIndex(tmp_path, dim=DIM)
+    assert_same(index, reloaded)
+    # Folded right away, so later saves don't append after the torn entry
+    reloaded.add("user-3", unit(3))
+    reloaded.save()
+    assert EmbeddingIndex(tmp_path, dim=DIM).users == ["user-0", "user-1", "user-2", "user-3"]
+
+
+def test_user_list_without_a_log_still_loads(tmp_path):
+    index = EmbeddingIndex(tmp_path, dim=DIM)
+    index.add("user-0", unit(0))
+    index.save()
+    # As written before the change log existed
+    meta = {"dim": DIM, "users": ["user-0"], "enrollments": [1]}
+    (tmp_path / USERS_FILE).write_text(json.dumps(meta))
+    index._log_path(index.generation).unlink()
+    
+    reloaded = EmbeddingIndex(tmp_path, dim=DIM)
+    assert reloaded.users == ["user-0"]
+    assert np.array_equal(reloaded.get("user-0"), index.get("user-0"))
@@ -0,0 +1,281 @@
+import asyncio
+import contextvars
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List, Optional, Tuple
+from config.settings import settings
+from utils.metrics import metrics
+
+# JWT user_id of the connection being served; per-tenant quotas are charged to it
+tenant_var: contextvars.ContextVar = contextvars.ContextVar("tenant", default=None)
+
+# Deadline of the turn being served; tasks started during the turn share the same object
+turn_deadline_var: contextvars.ContextVar = contextvars.ContextVar("turn_deadline", default=None)
+
+
+class AdmissionError(Exception):
+    """
+    An upstream call was refused before it was made
+    
+    reason is "deadline" (the turn's budget is gone), "max_wait" (no slot
+    within ADMISSION_MAX_WAIT_MS), "rate" (the backend's rate limit),
+    "quota" (the tenant's quota) or "queue_full".
+    """
+    
+    def __init__(self, backend: str, reason: str):
+        super().__init__(f"{backend} call refused ({reason})")
+        self.backend = backend
+        self.reason = reason
+
+
+class Deadline:
+    """
+    Monotonic time by which a turn's upstream calls must be admitted
+    
+    Shared by reference, so clear() also reaches tasks that copied the
+    context earlier (concurrent intent extraction).
+    """
+    
+    def __init__(self, budget_s: float, start: Optional[float] = None):
+        self.at = (time.monotonic() if start is None else start) + budget_s
+        self.active = True
+    
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None once cleared"""
+        return max(0.0, self.at - time.monotonic()) if self.active else None
+    
+    def clear(self):
+        self.active = False
+
+
+class TokenBucket:
+    """
+    Refills per_minute units per minute, up to burst (10 seconds' worth by default)
+    
+    Units are taken up front and the taker told how long to wait for them;
+    the level may go negative, so later takers queue behind earlier ones
+    in arrival order. Event loop only (no locking).
+    """
+    
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.rate = per_minute / 60
+        self.burst = burst if burst is not None else max(1.0, per_minute / 6)
+        self.level = self.burst
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float):
+        self.level = min(self.burst, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until amount would be available, without taking it"""
+        self._refill(now)
+        return max(0.0, (amount - self.level) / self.rate)
+    
+    def take(self, amount: float, now: Optional[float] = None):
+        """Take amount (a negative amount gives it back)"""
+        self._refill(time.monotonic() if now is None else now)
+        self.level = min(self.burst, self.level - amount)
+
+
+# (bucket, units, reason if it is what makes the call wait too long)
+_Charge = Tuple[TokenBucket, float, str]
+
+
+class Admission:
+    """An admitted call; charge() corrects the token estimate once the real count is known"""
+    
+    def __init__(self, token_buckets: List[TokenBucket], tokens: float, queue_ms: float):
+        self.token_buckets = token_buckets
+        self.tokens = tokens
+        self.queue_ms = queue_ms
+    
+    def charge(self, tokens: float):
+        for bucket in self.token_buckets:
+            bucket.take(tokens - self.tokens)
+        self.tokens = tokens
+
+
+class UpstreamLimiter:
+    """
+    Admission control for one upstream backend, shared by every connection in the process
+    
+    A call first reserves from the token buckets (requests and tokens per
+    minute, for the backend and for the calling tenant), then waits for one
+    of max_concurrent slots (0 = unlimited). If the rate limits alone would
+    make it wait longer than it may, it is refused at once without using
+    anything; if no slot frees up in time, its reservation is returned.
+    A call may wait ADMISSION_MAX_WAIT_MS, or less if its turn's deadline
+    comes sooner, so a turn that has run out of time fails fast instead of
+    adding to the queue.
+    
+    Metrics: admission.<name>.queue_ms (every admitted call), .admitted,
+    .rejected.<reason>, and the in_flight / waiting gauges.
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int = 0,
+        requests_per_minute: float = 0,
+        tokens_per_minute: float = 0,
+        tenant_requests_per_minute: float = 0,
+        tenant_tokens_per_minute: float = 0,
+        max_wait_ms: float = 3000,
+        max_queue: int = 0,
+        max_tenants: int = 10000
+    ):
+        self.name = name
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self._slots = asyncio.Semaphore(max_concurrent) if max_concurrent > 0 else None
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        
+        self.tenant_requests_per_minute = tenant_requests_per_minute
+        self.tenant_tokens_per_minute = tenant_tokens_per_minute
+        self.max_tenants = max_tenants
+        # tenant -> (request bucket, token bucket); least recently used first
+        self._tenants: "OrderedDict[str, Tuple[Optional[TokenBucket], Optional[TokenBucket]]]" = OrderedDict()
+        
+        self.in_flight = 0
+        self.waiting = 0
+    
+    def _tenant_buckets(self, tenant: str) -> Tuple[Optional[TokenBucket], Optional[TokenBucket]]:
+        buckets = self._tenants.get(tenant)
+        if buckets is None:
+            buckets = self._tenants[tenant] = (
+                TokenBucket(self.tenant_requests_per_minute) if self.tenant_requests_per_minute > 0 else None,
+                TokenBucket(self.tenant_tokens_per_minute) if self.tenant_tokens_per_minute > 0 else None
+            )
+            while len(self._tenants) > self.max_tenants:
+                self._tenants.popitem(last=False)
+        else:
+            self._tenants.move_to_end(tenant)
+        return buckets
+    
+    def _charges(self, tokens: float, tenant: Optional[str]) -> Tuple[List[_Charge], List[TokenBucket]]:
+        """What the call draws from each bucket, and which buckets count tokens"""
+        request_buckets = [(self.requests, "rate")]
+        token_buckets = [(self.tokens, "rate")]
+        if tenant is not None and (self.tenant_requests_per_minute > 0 or self.tenant_tokens_per_minute > 0):
+            tenant_requests, tenant_tokens = self._tenant_buckets(tenant)
+            request_buckets.append((tenant_requests, "quota"))
+            token_buckets.append((tenant_tokens, "quota"))
+        
+        charges = [(bucket, 1, reason) for bucket, reason in request_buckets if bucket]
+        if tokens:
+            charges += [(bucket, tokens, reason) for bucket, reason in token_buckets if bucket]
+        return charges, [bucket for bucket, _ in token_buckets if bucket]
+    
+    def _reject(self, reason: str):
+        metrics.incr(f"admission.{self.name}.rejected.{reason}")
+        raise AdmissionError(self.name, reason)
+    
+    def _publish(self):
+        metrics.gauge(f"admission.{self.name}.in_flight", self.in_flight)
+        metrics.gauge(f"admission.{self.name}.waiting", self.waiting)
+    
+    @asynccontextmanager
+    async def admit(self, tokens: float = 0, bounded: bool = True) -> AsyncIterator[Admission]:
+        """
+        Hold an admission for the duration of the call
+        
+        Args:
+            tokens: Estimated tokens (or characters) the call will use
+            bounded: Whether the current turn's deadline applies (False
+                     for background work such as summaries)
+        
+        Raises:
+            AdmissionError: the call could not be admitted in time
+        """
+        deadline = turn_deadline_var.get() if bounded else None
+        remaining = deadline.remaining() if deadline else None
+        budget = self.max_wait if remaining is None else min(self.max_wait, remaining)
+        if remaining is not None and remaining <= 0:
+            self._reject("deadline")
+        if self.max_queue and self.waiting >= self.max_queue:
+            self._reject("queue_full")
+        expired = "deadline" if budget < self.max_wait else "max_wait"
+        
+        start = time.monotonic()
+        charges, token_buckets = self._charges(tokens, tenant_var.get())
+        delay, limiting = 0.0, None
+        for bucket, amount, reason in charges:
+            wait = bucket.delay(amount, start)
+            if wait > delay:
+                delay, limiting = wait, reason
+        if delay > budget:
+            self._reject(limiting)
+        for bucket, amount, _ in charges:
+            bucket.take(amount, start)
+        
+        self.waiting += 1
+        self._publish()
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            if self._slots:
+                if self._slots.locked():
+                    await asyncio.wait_for(self._slots.acquire(), max(0.0, budget - (time.monotonic() - start)))
+                else:
+                    await self._slots.acquire()
+            self.in_flight += 1
+        except BaseException as e:
+            for bucket, amount, _ in charges:
+                bucket.take(-amount)
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject(expired)
+            raise
+        finally:
+            self.waiting -= 1
+            self._publish()
+        
+        queue_ms = (time.monotonic() - start) * 1000
+        metrics.observe(f"admission.{self.name}.queue_ms", queue_ms)
+        metrics.incr(f"admission.{self.name}.admitted")
+        try:
+            yield Admission(token_buckets, tokens, queue_ms)
+        finally:
+            self.in_flight -= 1
+            if self._slots:
+                self._slots.release()
+            self._publish()
+    
+    def has_capacity(self) -> bool:
+        """Whether a call would get a slot now without queueing (rate limits aside)"""
+        return not self.waiting and not (self._slots and self._slots.locked())
+    
+    def stats(self) -> dict:
+        return {"in_flight": self.in_flight, "waiting": self.waiting, "tenants": len(self._tenants)}
+
+
+def create_limiters() -> Tuple[UpstreamLimiter, UpstreamLimiter]:
+    """OpenAI and Azure TTS limiters from settings (no limits when admission is off)"""
+    if not settings.ADMISSION_ENABLED:
+        return UpstreamLimiter("openai"), UpstreamLimiter("azure_tts")
+    
+    common = {"max_wait_ms": settings.ADMISSION_MAX_WAIT_MS, "max_queue": settings.ADMISSION_MAX_QUEUE}
+    openai = UpstreamLimiter(
+        "openai",
+        max_concurrent=settings.OPENAI_MAX_CONCURRENT,
+        requests_per_minute=settings.OPENAI_RPM,
+        tokens_per_minute=settings.OPENAI_TPM,
+        tenant_requests_per_minute=settings.TENANT_RPM,
+        tenant_tokens_per_minute=settings.TENANT_TPM,
+        **common
+    )
+    # Azure TTS bills and throttles by characters, so those stand in for tokens
+    azure_tts = UpstreamLimiter(
+        "azure_tts",
+        max_concurrent=settings.AZURE_TTS_MAX_CONCURRENT,
+        requests_per_minute=settings.AZURE_TTS_RPM,
+        tokens_per_minute=settings.AZURE_TTS_CPM,
+        **common
+    )
+    return openai, azure_tts
+
+
+# Create singleton instances (shared by every connection in the process)
+openai_limiter, tts_limiter = create_limiters()
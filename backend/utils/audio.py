@@ -1,5 +1,10 @@
 import numpy as np
-from typing import Tuple
+from math import gcd
+from typing import Dict, List, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Rate of all audio inside the server (STT input, TTS output)
+SAMPLE_RATE = 16000
 
 class AudioProcessor:
     """Audio processing utilities"""
@@ -18,23 +23,604 @@ class AudioProcessor:
     
     @staticmethod
     def resample(audio: np.ndarray, orig_rate: int, target_rate: int) -> np.ndarray:
-        """Resample audio to target sample rate"""
+        """
+        Resample a whole buffer to target sample rate (see StreamingResampler)
+        
+        The filter delay is removed, so the output lines up with the input.
+        Int16 input gives Int16 output, anything else float32.
+        """
         if orig_rate == target_rate:
             return audio
         
-        # Simple linear interpolation resampling
-        duration = len(audio) / orig_rate
-        target_length = int(duration * target_rate)
-        
-        indices = np.linspace(0, len(audio) - 1, target_length)
-        return np.interp(indices, np.arange(len(audio)), audio)
+        resampler = StreamingResampler(orig_rate, target_rate, align=True)
+        return np.concatenate([resampler.process(audio), resampler.flush(audio.dtype)])
     
     @staticmethod
     def calculate_rms(audio: np.ndarray) -> float:
         """Calculate RMS (loudness) of audio"""
         return np.sqrt(np.mean(audio ** 2))
     
+    @staticmethod
+    def frame_energy_db(samples: np.ndarray, frame_size: int) -> np.ndarray:
+        """
+        Per-frame energy in dBFS, vectorized over the whole buffer
+        
+        A trailing partial frame gets its own (shorter) measurement.
+        Samples are Int16 PCM or float32 in [-1, 1].
+        """
+        audio = samples.astype(np.float32)
+        if samples.dtype == np.int16:
+            audio /= 32768.0
+        
+        full = len(audio) // frame_size
+        power = np.square(audio[:full * frame_size]).reshape(full, frame_size).mean(axis=1)
+        if len(audio) % frame_size:
+            power = np.append(power, np.square(audio[full * frame_size:]).mean())
+        
+        return 10.0 * np.log10(power + 1e-10)
+    
     @staticmethod
     def detect_silence(audio: np.ndarray, threshold: float = 0.01) -> bool:
         """Detect if audio is silence"""
-        return AudioProcessor.calculate_rms(audio) < threshold
\ No newline at end of file
+        return AudioProcessor.calculate_rms(audio) < threshold
+
+class StreamingResampler:
+    """
+    Stateful polyphase windowed-sinc resampler for streamed audio
+    
+    Converts by the rational factor up/down (e.g. 48000 -> 16000 is 1/3,
+    44100 -> 16000 is 160/441) with a Kaiser-windowed sinc low-pass that
+    spans 2 * zero_crossings zero crossings at the lower of the two rates.
+    Only the filter phase each output sample needs is evaluated, all
+    outputs of a chunk in one vectorized step, and the last input samples
+    are kept as history, so chunks join without seams: processing audio in
+    pieces gives the same samples as processing it at once.
+    
+    Output lags the input by `delay` output samples (half the filter, well
+    under 1 ms) unless align is set, which drops those first samples so
+    output sample i falls at input time i / target_rate. flush() pushes out
+    the tail at the end of a stream.
+    """
+    
+    # Filter banks by (up, down, zero_crossings, rolloff, beta); 44.1 kHz
+    # conversions need a long prototype filter, so build each one once
+    _banks: Dict[Tuple, np.ndarray] = {}
+    # Above this many phases, per-phase products cost more than gathering taps
+    strided_max_phases = 16
+    gather_block = 4096
+    
+    def __init__(
+        self,
+        orig_rate: int,
+        target_rate: int,
+        zero_crossings: int = 16,
+        rolloff: float = 0.92,
+        beta: float = 8.6,
+        align: bool = False
+    ):
+        """
+        Args:
+            zero_crossings: Filter half-length in zero crossings; longer filters
+                            give a sharper cutoff for proportionally more work
+            rolloff: Cutoff as a fraction of the lower rate's Nyquist frequency
+            beta: Kaiser window shape (8.6 is ~80 dB of stopband attenuation)
+            align: Compensate the filter delay; a whole stream then gives
+                   ceil(len * target_rate / orig_rate) samples
+        """
+        common = gcd(orig_rate, target_rate)
+        self.orig_rate = orig_rate
+        self.target_rate = target_rate
+        self.up = target_rate // common
+        self.down = orig_rate // common
+        
+        key = (self.up, self.down, zero_crossings, rolloff, beta)
+        if key not in StreamingResampler._banks:
+            StreamingResampler._banks[key] = self._design(*key)
+        self.bank = StreamingResampler._banks[key]
+        self.taps = self.bank.shape[1]
+        
+        # Start so that the filter's center (its delay) falls exactly on an output sample
+        center = (self.taps * self.up - 1) // 2
+        self.delay = center // self.down
+        # Input samples the next chunk's first outputs still need
+        self.history = np.zeros(self.taps - 1, dtype=np.float32)
+        # Upsampled-domain position of the next output, relative to history[0]
+        self.position = (self.taps - 1) * self.up + center - self.delay * self.down
+        self.align = align
+        self.samples_in = 0
+        self.samples_out = 0  # Including any dropped for align
+    
+    @staticmethod
+    def _design(up: int, down: int, zero_crossings: int, rolloff: float, beta: float) -> np.ndarray:
+        """
+        Polyphase bank of shape (up, taps): row p holds the taps for outputs
+        falling at phase p between input samples, ordered oldest input first
+        """
+        spacing = max(up, down) / rolloff  # Upsampled samples per sinc zero crossing
+        taps = int(np.ceil(2 * zero_crossings * spacing / up))
+        length = taps * up
+        # Odd length (zero-padded to the bank size) for a whole-sample center
+        odd = length - 1 + length % 2
+        n = np.arange(odd) - (odd - 1) / 2
+        prototype = np.sinc(n / spacing) / spacing * np.kaiser(odd, beta) * up
+        prototype = np.append(prototype, np.zeros(length - odd))
+        # prototype[p + k * up] multiplies the input k samples before the newest
+        bank = prototype.reshape(taps, up).T[:, ::-1]
+        return np.ascontiguousarray(bank, dtype=np.float32)
+    
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Resample the next chunk; Int16 in gives Int16 out, anything else float32"""
+        audio = np.asarray(samples)
+        buffer = np.concatenate([self.history, audio.astype(np.float32)])
+        
+        count = max(0, -(-(len(buffer) * self.up - self.position) // self.down))
+        positions = self.position + np.arange(count) * self.down
+        first = positions // self.up - (self.taps - 1)
+        
+        windows = sliding_window_view(buffer, self.taps) if count else None
+        if not count:
+            out = np.zeros(0, dtype=np.float32)
+        elif self.up <= self.strided_max_phases:
+            # Phases repeat every `up` outputs, whose windows step by `down`
+            # samples: one strided matrix-vector product per phase. einsum
+            # rather than BLAS, whose summation order changes with the row
+            # count, so chunk sizes can't change the rounding
+            out = np.empty(count, dtype=np.float32)
+            for j in range(min(self.up, count)):
+                outputs = len(range(j, count, self.up))
+                rows = windows[first[j]::self.down][:outputs]
+                out[j::self.up] = np.einsum("ij,j->i", rows, self.bank[positions[j] % self.up])
+        else:
+            # Many phases (44.1 kHz): gather each output's taps instead, a
+            # block at a time so long buffers don't build a huge gather
+            out = np.empty(count, dtype=np.float32)
+            for start in range(0, count, self.gather_block):
+                block = slice(start, start + self.gather_block)
+                out[block] = np.einsum("ij,ij->i", self.bank[positions[block] % self.up], windows[first[block]])
+        
+        consumed = len(buffer) - (self.taps - 1)
+        self.history = buffer[consumed:]
+        self.position += count * self.down - consumed * self.up
+        self.samples_in += len(audio)
+        
+        if self.align and self.samples_out < self.delay:
+            out = out[self.delay - self.samples_out:]
+        self.samples_out += count
+        
+        if audio.dtype == np.int16:
+            return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+        return out.astype(np.float32)
+    
+    def flush(self, dtype=np.int16) -> np.ndarray:
+        """Outputs still held back by the filter delay (end of stream)"""
+        total_in = self.samples_in
+        tail = int(np.ceil((self.taps - 1) / 2)) + 1
+        out = self.process(np.zeros(tail, dtype=dtype))
+        if self.align:
+            # Exactly the samples the stream's own input accounts for
+            expected = -(-total_in * self.up // self.down)
+            out = out[:max(0, len(out) - (self.samples_out - self.delay - expected))]
+        self.samples_in = total_in
+        return out
+
+
+# Codecs for the client link. All of them carry 16-bit mono PCM (16 kHz unless
+# a playback rate was negotiated); the frame flag is the codec ID in binary
+# audio frames (see websocket.protocol).
+
+CODEC_PCM16 = "pcm16"
+CODEC_MULAW = "mulaw"
+CODEC_ALAW = "alaw"
+CODEC_IMA_ADPCM = "ima-adpcm"
+CODEC_OPUS = "opus"
+
+
+_MULAW_SEGMENT_ENDS = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+
+
+def _mulaw_encode_formula(samples: np.ndarray) -> np.ndarray:
+    """G.711 μ-law, computed per sample (used to build the lookup table)"""
+    x = samples.astype(np.int32) >> 2
+    mask = np.where(x < 0, 0x7F, 0xFF)
+    x = np.minimum(np.abs(x), 8159) + 0x21
+    segment = np.searchsorted(_MULAW_SEGMENT_ENDS, x)
+    code = (segment << 4) | ((x >> (segment + 1)) & 0x0F)
+    code = np.where(segment >= 8, 0x7F, code)
+    return ((code ^ mask) & 0xFF).astype(np.uint8)
+
+
+def _mulaw_decode_formula(codes: np.ndarray) -> np.ndarray:
+    u = ~codes.astype(np.int32) & 0xFF
+    exponent = (u >> 4) & 0x07
+    magnitude = ((((u & 0x0F) << 3) + 0x84) << exponent) - 0x84
+    return np.where(u & 0x80, -magnitude, magnitude).astype(np.int16)
+
+
+_ALAW_SEGMENT_ENDS = np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF])
+
+
+def _alaw_encode_formula(samples: np.ndarray) -> np.ndarray:
+    """G.711 A-law, computed per sample (used to build the lookup table)"""
+    x = samples.astype(np.int32) >> 3
+    mask = np.where(x >= 0, 0xD5, 0x55)
+    x = np.where(x >= 0, x, -x - 1)
+    segment = np.searchsorted(_ALAW_SEGMENT_ENDS, x)
+    shift = np.maximum(segment, 1)
+    code = (np.minimum(segment, 7) << 4) | ((x >> np.minimum(shift, 7)) & 0x0F)
+    code = np.where(segment >= 8, 0x7F, code)
+    return ((code ^ mask) & 0xFF).astype(np.uint8)
+
+
+def _alaw_decode_formula(codes: np.ndarray) -> np.ndarray:
+    a = codes.astype(np.int32) ^ 0x55
+    segment = (a & 0x70) >> 4
+    t = (a & 0x0F) << 4
+    t = np.where(segment == 0, t + 8, (t + 0x108) << np.maximum(segment - 1, 0))
+    return np.where(a & 0x80, t, -t).astype(np.int16)
+
+
+# Lookup tables: encoding indexes by the sample's 16-bit pattern, decoding by the code
+_ALL_SAMPLES = np.arange(65536, dtype=np.uint16).view(np.int16)
+_ALL_CODES = np.arange(256, dtype=np.uint8)
+_MULAW_ENCODE = _mulaw_encode_formula(_ALL_SAMPLES)
+_MULAW_DECODE = _mulaw_decode_formula(_ALL_CODES)
+_ALAW_ENCODE = _alaw_encode_formula(_ALL_SAMPLES)
+_ALAW_DECODE = _alaw_decode_formula(_ALL_CODES)
+
+_IMA_STEPS = np.array([
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+    32767
+], dtype=np.int32)
+_IMA_INDEX_ADJUST = np.array([-1, -1, -1, -1, 2, 4, 6, 8], dtype=np.int32)
+
+
+def _ima_tables() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per (step index, 3-bit code magnitude) tables, so the sequential loop is
+    a few lookups per sample position
+    
+    Returns:
+        (delta, next_index, thresholds): the predictor change a code
+        decodes to, the step index after it, and the smallest difference
+        the encoder's successive approximation maps to each magnitude 1-7
+    """
+    step = _IMA_STEPS[:, None]
+    magnitude = np.arange(8)[None, :]
+    parts = ((magnitude >> 2) & 1) * step + ((magnitude >> 1) & 1) * (step >> 1) + (magnitude & 1) * (step >> 2)
+    delta = (step >> 3) + parts
+    next_index = np.clip(np.arange(89)[:, None] + _IMA_INDEX_ADJUST[None, :], 0, 88)
+    return delta.astype(np.int32), next_index.astype(np.int32), parts[:, 1:].astype(np.int32)
+
+
+_IMA_DELTA, _IMA_NEXT_INDEX, _IMA_THRESHOLDS = _ima_tables()
+# The same tables as nested lists, for the plain-Python path
+_IMA_DELTA_LISTS = _IMA_DELTA.tolist()
+_IMA_NEXT_INDEX_LISTS = _IMA_NEXT_INDEX.tolist()
+_IMA_THRESHOLD_LISTS = _IMA_THRESHOLDS.tolist()
+_IMA_DELTA = _IMA_DELTA.reshape(-1)  # Indexed by step index * 8 + magnitude
+_IMA_NEXT_INDEX = _IMA_NEXT_INDEX.reshape(-1)
+
+
+class AudioCodec:
+    """
+    Raw PCM16 passthrough, and the interface the other codecs implement
+    
+    Stateless codecs encode every payload independently, so a sentence can
+    be encoded once and cached; stateful ones (Opus) must see one
+    connection's audio in playback order. Each encoded payload is decoded
+    on its own (block codecs can't be split or joined at arbitrary bytes).
+    """
+    
+    name = CODEC_PCM16
+    frame_flag = 0
+    bits_per_sample = 16.0
+    stateless = True
+    
+    def __init__(self, sample_rate: int = SAMPLE_RATE):
+        self.sample_rate = sample_rate
+    
+    @classmethod
+    def supports_rate(cls, sample_rate: int) -> bool:
+        return True
+    
+    def encode(self, pcm: bytes) -> bytes:
+        return pcm
+    
+    def decode(self, data: bytes) -> bytes:
+        return data
+    
+    def flush(self) -> bytes:
+        """Encoded audio still buffered at the end of a response"""
+        return b""
+    
+    def reset(self):
+        """Drop buffered audio (the response was interrupted)"""
+    
+    def duration_ms(self, nbytes: int) -> float:
+        return nbytes * 8 / self.bits_per_sample * 1000 / self.sample_rate
+
+
+class MulawCodec(AudioCodec):
+    """G.711 μ-law: 8 bits per sample through 64K/256-entry lookup tables"""
+    
+    name = CODEC_MULAW
+    frame_flag = 1
+    bits_per_sample = 8.0
+    
+    def encode(self, pcm: bytes) -> bytes:
+        return _MULAW_ENCODE[np.frombuffer(pcm, dtype=np.uint16)].tobytes()
+    
+    def decode(self, data: bytes) -> bytes:
+        return _MULAW_DECODE[np.frombuffer(data, dtype=np.uint8)].tobytes()
+
+
+class AlawCodec(AudioCodec):
+    """G.711 A-law: 8 bits per sample through 64K/256-entry lookup tables"""
+    
+    name = CODEC_ALAW
+    frame_flag = 2
+    bits_per_sample = 8.0
+    
+    def encode(self, pcm: bytes) -> bytes:
+        return _ALAW_ENCODE[np.frombuffer(pcm, dtype=np.uint16)].tobytes()
+    
+    def decode(self, data: bytes) -> bytes:
+        return _ALAW_DECODE[np.frombuffer(data, dtype=np.uint8)].tobytes()
+
+
+class ImaAdpcmCodec(AudioCodec):
+    """
+    IMA-ADPCM in independent blocks (the WAV/Microsoft block layout)
+    
+    Each block is a 4-byte header (first sample as int16, step index, flags)
+    followed by 4-bit codes, low nibble first. The last block may be short;
+    its flags byte (reserved in the WAV layout) is 1 when the final code is
+    padding for an even sample count, so decoding gives back exactly the
+    encoded samples and streamed chunks don't drift.
+    
+    ADPCM is sequential within a block. Long payloads (cached sentences)
+    step through sample positions vectorized across all their blocks; for
+    short ones (streamed chunks of a few blocks) NumPy's per-call overhead
+    outweighs that, so they run a plain loop over table lookups instead.
+    Both produce identical output.
+    """
+    
+    name = CODEC_IMA_ADPCM
+    frame_flag = 3
+    block_size = 68  # Bytes: header + 64 bytes of codes = 129 samples (~8 ms)
+    block_samples = (block_size - 4) * 2 + 1
+    bits_per_sample = block_size * 8 / block_samples
+    vectorize_blocks = 64  # Payloads with at least this many blocks (~0.5 s)
+    
+    def encode(self, pcm: bytes) -> bytes:
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        count = len(samples)
+        if not count:
+            return b""
+        
+        blocks = -(-count // self.block_samples)
+        padded = np.zeros(blocks * self.block_samples, dtype=np.int32)
+        padded[:count] = samples
+        padded = padded.reshape(blocks, self.block_samples)
+        
+        # Start each block at a step size matching its opening slope, rather than
+        # the smallest step, which would take a dozen samples to adapt
+        slope = np.abs(np.diff(padded[:, :9], axis=1)).mean(axis=1)
+        index = np.minimum(np.searchsorted(_IMA_STEPS, slope), 88)
+        
+        if blocks >= self.vectorize_blocks:
+            codes = self._encode_vectorized(padded, index)
+        else:
+            codes = np.array([
+                _ima_encode_block(block, start) for block, start in zip(padded.tolist(), index.tolist())
+            ], dtype=np.uint8)
+        
+        out = np.zeros((blocks, self.block_size), dtype=np.uint8)
+        out[:, :2] = padded[:, :1].astype("<i2").view(np.uint8)
+        out[:, 2] = index
+        out[:, 4:] = codes[:, 0::2] | (codes[:, 1::2] << 4)
+        
+        # Trim the padding of the last block
+        last = count - (blocks - 1) * self.block_samples
+        if last % 2 == 0:
+            out[-1, 3] = 1
+        size = (blocks - 1) * self.block_size + 4 + last // 2
+        return out.tobytes()[:size]
+    
+    def decode(self, data: bytes) -> bytes:
+        raw = np.frombuffer(data, dtype=np.uint8)
+        if not len(raw):
+            return b""
+        last = len(raw) % self.block_size or self.block_size
+        if last < 4:
+            raise ValueError("Truncated IMA-ADPCM block header")
+        
+        blocks = -(-len(raw) // self.block_size)
+        padded = np.zeros(blocks * self.block_size, dtype=np.uint8)
+        padded[:len(raw)] = raw
+        padded = padded.reshape(blocks, self.block_size)
+        
+        first = padded[:, :2].copy().view("<i2")[:, 0].astype(np.int32)
+        index = np.minimum(padded[:, 2].astype(np.int32), 88)
+        codes = np.empty((blocks, self.block_samples - 1), dtype=np.int32)
+        codes[:, 0::2] = padded[:, 4:] & 0x0F
+        codes[:, 1::2] = padded[:, 4:] >> 4
+        
+        if blocks >= self.vectorize_blocks:
+            samples = self._decode_vectorized(first, index, codes)
+        else:
+            samples = np.array([
+                _ima_decode_block(*block) for block in zip(first.tolist(), index.tolist(), codes.tolist())
+            ], dtype=np.int16)
+        
+        count = (blocks - 1) * self.block_samples + 1 + (last - 4) * 2 - int(padded[-1, 3] & 1)
+        return samples.reshape(-1)[:count].tobytes()
+    
+    def _encode_vectorized(self, padded: np.ndarray, index: np.ndarray) -> np.ndarray:
+        # Sample positions first, so each step reads a contiguous row
+        columns = np.ascontiguousarray(padded.T)
+        predictor = columns[0].copy()
+        index = index.astype(np.int64)
+        codes = np.empty((self.block_samples - 1, len(padded)), dtype=np.uint8)
+        
+        for i in range(1, self.block_samples):
+            diff = columns[i] - predictor
+            negative = diff < 0
+            magnitude = (np.abs(diff)[:, None] >= _IMA_THRESHOLDS.take(index, axis=0)).sum(axis=1)
+            flat = index * 8 + magnitude
+            delta = _IMA_DELTA.take(flat)
+            delta[negative] *= -1
+            predictor = np.minimum(np.maximum(predictor + delta, -32768), 32767)
+            index = _IMA_NEXT_INDEX.take(flat)
+            codes[i - 1] = magnitude | (negative << 3)
+        return codes.T
+    
+    def _decode_vectorized(self, first: np.ndarray, index: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        codes = np.ascontiguousarray(codes.T)
+        magnitudes = codes & 7
+        signs = 1 - (codes >> 3) * 2
+        predictor = first
+        index = index.astype(np.int64)
+        
+        samples = np.empty((self.block_samples, len(first)), dtype=np.int16)
+        samples[0] = predictor
+        for i in range(1, self.block_samples):
+            flat = index * 8 + magnitudes[i - 1]
+            predictor = np.minimum(np.maximum(predictor + signs[i - 1] * _IMA_DELTA.take(flat), -32768), 32767)
+            index = _IMA_NEXT_INDEX.take(flat)
+            samples[i] = predictor
+        return samples.T
+
+
+def _ima_encode_block(block: List[int], index: int) -> List[int]:
+    """Codes for one block's samples after the first (plain-Python path)"""
+    predictor = block[0]
+    codes = []
+    for sample in block[1:]:
+        diff = sample - predictor
+        sign = 0
+        if diff < 0:
+            sign = 8
+            diff = -diff
+        thresholds = _IMA_THRESHOLD_LISTS[index]
+        magnitude = 0
+        while magnitude < 7 and diff >= thresholds[magnitude]:
+            magnitude += 1
+        
+        if sign:
+            predictor -= _IMA_DELTA_LISTS[index][magnitude]
+            if predictor < -32768:
+                predictor = -32768
+        else:
+            predictor += _IMA_DELTA_LISTS[index][magnitude]
+            if predictor > 32767:
+                predictor = 32767
+        index = _IMA_NEXT_INDEX_LISTS[index][magnitude]
+        codes.append(sign | magnitude)
+    return codes
+
+
+def _ima_decode_block(predictor: int, index: int, codes: List[int]) -> List[int]:
+    """One block's samples (plain-Python path)"""
+    samples = [predictor]
+    for code in codes:
+        magnitude = code & 7
+        if code & 8:
+            predictor -= _IMA_DELTA_LISTS[index][magnitude]
+            if predictor < -32768:
+                predictor = -32768
+        else:
+            predictor += _IMA_DELTA_LISTS[index][magnitude]
+            if predictor > 32767:
+                predictor = 32767
+        index = _IMA_NEXT_INDEX_LISTS[index][magnitude]
+        samples.append(predictor)
+    return samples
+
+
+try:
+    import opuslib  # Optional: enables the "opus" codec
+except ImportError:
+    opuslib = None
+
+
+class OpusCodec(AudioCodec):
+    """
+    Opus via opuslib (libopus), as 20 ms packets each prefixed with its
+    length (uint16, little-endian)
+    
+    Stateful: one instance per connection, fed in playback order. Audio
+    short of a whole packet is held until more arrives or flush().
+    """
+    
+    name = CODEC_OPUS
+    frame_flag = 4
+    bits_per_sample = 1.5  # ~24 kbit/s for speech
+    stateless = False
+    rates = (8000, 12000, 16000, 24000, 48000)
+    
+    def __init__(self, sample_rate: int = SAMPLE_RATE):
+        if sample_rate not in self.rates:
+            raise ValueError(f"Opus doesn't support {sample_rate} Hz")
+        super().__init__(sample_rate)
+        self.frame_samples = sample_rate // 50
+        self.encoder = opuslib.Encoder(sample_rate, 1, opuslib.APPLICATION_VOIP)
+        self.decoder = opuslib.Decoder(sample_rate, 1)
+        self.pending = b""
+    
+    @classmethod
+    def supports_rate(cls, sample_rate: int) -> bool:
+        return sample_rate in cls.rates
+    
+    def encode(self, pcm: bytes) -> bytes:
+        pcm = self.pending + bytes(pcm)
+        frame_bytes = self.frame_samples * 2
+        whole = len(pcm) - len(pcm) % frame_bytes
+        self.pending = pcm[whole:]
+        packets = []
+        for offset in range(0, whole, frame_bytes):
+            packet = self.encoder.encode(pcm[offset:offset + frame_bytes], self.frame_samples)
+            packets.append(len(packet).to_bytes(2, "little") + packet)
+        return b"".join(packets)
+    
+    def decode(self, data: bytes) -> bytes:
+        data = bytes(data)
+        pcm = []
+        offset = 0
+        while offset + 2 <= len(data):
+            size = int.from_bytes(data[offset:offset + 2], "little")
+            pcm.append(self.decoder.decode(data[offset + 2:offset + 2 + size], self.frame_samples))
+            offset += 2 + size
+        return b"".join(pcm)
+    
+    def flush(self) -> bytes:
+        if not self.pending:
+            return b""
+        padding = b"\x00" * (self.frame_samples * 2 - len(self.pending))
+        return self.encode(padding)
+    
+    def reset(self):
+        self.pending = b""
+
+
+CODECS = {codec.name: codec for codec in (AudioCodec, MulawCodec, AlawCodec, ImaAdpcmCodec)}
+if opuslib is not None:
+    CODECS[OpusCodec.name] = OpusCodec
+
+CODECS_BY_FLAG = {codec.frame_flag: codec for codec in CODECS.values()}
+
+
+def register_codec(codec: type):
+    """Add a codec (an AudioCodec subclass with a unique name and frame flag)"""
+    CODECS[codec.name] = codec
+    CODECS_BY_FLAG[codec.frame_flag] = codec
+
+
+def create_codec(name: str, sample_rate: int = SAMPLE_RATE) -> AudioCodec:
+    """New codec instance by name (KeyError if it isn't available)"""
+    return CODECS[name](sample_rate)
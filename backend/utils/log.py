@@ -0,0 +1,131 @@
+import contextvars
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+from typing import Dict, Optional
+from config.settings import settings
+
+# Correlation ID of the connection being served; asyncio tasks inherit it
+session_id_var: contextvars.ContextVar = contextvars.ContextVar("session_id", default="-")
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class SessionFilter(logging.Filter):
+    """Stamp records with the session ID unless the caller already set one"""
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, "session"):
+            record.session = session_id_var.get()
+        return True
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Per-category token bucket (records per second)
+    
+    Runs in the caller's thread before the record is queued, so suppressed
+    records cost almost nothing. The next record let through for a category
+    reports how many were dropped since the last one.
+    """
+    
+    def __init__(self, limits: Dict[str, float]):
+        super().__init__()
+        self.limits = limits
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, list] = {}  # category -> [tokens, last refill, suppressed]
+    
+    def _limit_for(self, name: str) -> Optional[float]:
+        # Most specific configured prefix wins (voice.stt.partial before voice.stt)
+        while name:
+            if name in self.limits:
+                return self.limits[name]
+            name = name.rpartition(".")[0]
+        return None
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._limit_for(record.name)
+        if rate is None:
+            return True
+        
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.setdefault(record.name, [rate, now, 0])
+            bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            suppressed, bucket[2] = bucket[2], 0
+        
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar suppressed)"
+        return True
+
+
+def parse_rate_limits(spec: str) -> Dict[str, float]:
+    """Parse "voice.stt.partial=5,voice.audio=1" into {category: records/sec}"""
+    limits = {}
+    for item in spec.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            limits[name.strip()] = float(rate)
+    return limits
+
+
+def setup_logging():
+    """
+    Route all "voice.*" logging through a queue drained by a background thread
+    
+    Logging calls from the event loop and from Speech SDK callback threads
+    only enqueue a record; formatting and the stdout write happen on the
+    listener thread, so a slow terminal can't stall audio handling.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(SessionFilter())
+    queue_handler.addFilter(RateLimitFilter(parse_rate_limits(settings.LOG_RATE_LIMITS)))
+    
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(
+        "%(asctime)s %(levelname)s %(name)s [%(session)s] %(message)s"
+    ))
+    
+    root = logging.getLogger("voice")
+    root.setLevel(settings.LOG_LEVEL.upper())
+    root.addHandler(queue_handler)
+    root.propagate = False
+    
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name: str, session_id: Optional[str] = None):
+    """
+    Logger for a category under "voice"
+    
+    Pass session_id for code that runs outside the connection's asyncio
+    context (e.g. Speech SDK callback threads) so records stay correlated.
+    """
+    logger = logging.getLogger(f"voice.{name}")
+    if session_id is not None:
+        return logging.LoggerAdapter(logger, {"session": session_id})
+    return logger
@@ -0,0 +1,74 @@
+import threading
+from collections import defaultdict, deque
+from typing import Deque, Dict
+import numpy as np
+
+class Metrics:
+    """
+    Process-wide counters and latency samples
+    
+    Safe to update from Azure SDK callback threads as well as the event loop.
+    Observations keep a bounded window of recent samples for percentiles.
+    """
+    
+    def __init__(self, window: int = 2048):
+        self.window = window
+        self._lock = threading.Lock()
+        self._counters: Dict[str, float] = defaultdict(float)
+        self._gauges: Dict[str, float] = {}
+        self._samples: Dict[str, Deque[float]] = {}
+    
+    def incr(self, name: str, value: float = 1):
+        """Add to a counter"""
+        with self._lock:
+            self._counters[name] += value
+    
+    def gauge(self, name: str, value: float):
+        """Set a point-in-time value (e.g. pool size, queue depth)"""
+        with self._lock:
+            self._gauges[name] = value
+    
+    def observe(self, name: str, value: float):
+        """Record one sample (e.g. a latency in ms)"""
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(value)
+    
+    def counter(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+    
+    def snapshot(self) -> Dict:
+        """Counters, gauges, and count/mean/p50/p95/p99 for every observed series"""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            samples = {name: list(values) for name, values in self._samples.items()}
+        
+        summaries = {}
+        for name, values in samples.items():
+            if not values:
+                continue
+            data = np.asarray(values, dtype=np.float64)
+            p50, p95, p99 = np.percentile(data, [50, 95, 99])
+            summaries[name] = {
+                "count": len(values),
+                "mean": float(data.mean()),
+                "p50": float(p50),
+                "p95": float(p95),
+                "p99": float(p99)
+            }
+        
+        return {"counters": counters, "gauges": gauges, "observations": summaries}
+    
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._samples.clear()
+
+
+# Create a singleton instance
+metrics = Metrics()
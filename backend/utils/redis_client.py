@@ -0,0 +1,31 @@
+from typing import Optional
+from config.settings import settings
+
+try:
+    import redis.asyncio as aioredis
+except ImportError:  # Redis is optional
+    aioredis = None
+
+_client = None
+
+
+def get_redis() -> Optional["aioredis.Redis"]:
+    """
+    Shared async Redis client built from REDIS_HOST/REDIS_PORT/REDIS_DB
+    
+    Returns None when the redis package isn't installed. The client connects
+    lazily, so this doesn't fail if the server is down; callers treat Redis
+    errors as cache misses.
+    """
+    global _client
+    if aioredis is None:
+        return None
+    if _client is None:
+        _client = aioredis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            socket_timeout=0.5,
+            socket_connect_timeout=0.5
+        )
+    return _client
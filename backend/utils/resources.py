@@ -0,0 +1,84 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+from openai import AsyncOpenAI
+from config.settings import settings
+from auth.auth import TokenValidator, VoiceBiometric
+from llm.openai_client import LLMClient
+from speech.recognizer_pool import RecognizerPool
+from speech.sdk_executor import sdk_executor
+from speech.stt import AzureSTT
+from speech.synthesizer_pool import SynthesizerPool
+from speech.tts import AzureTTS
+from utils.audio import AudioCodec, SAMPLE_RATE
+
+class ResourceRegistry:
+    """
+    Process-wide owner of expensive clients
+    
+    Connection handlers borrow from here instead of building their own
+    SpeechConfig/SpeechSynthesizer and AsyncOpenAI (with its HTTP pool) on
+    every connection, and take recognizers that are already connected.
+    """
+    
+    def __init__(self):
+        self.synthesizers = SynthesizerPool(
+            max_keys=settings.TTS_POOL_MAX_VOICES,
+            max_idle_per_key=settings.TTS_POOL_MAX_IDLE
+        )
+        self.token_validator = TokenValidator()
+        self.voice_biometric = VoiceBiometric()
+        self.recognizers = None
+        if settings.STT_POOL_SIZE > 0:
+            self.recognizers = RecognizerPool(settings.STT_POOL_SIZE, settings.STT_POOL_MAX_AGE_S)
+        self._openai_client: Optional[AsyncOpenAI] = None
+        self._maintenance: Optional[asyncio.Task] = None
+    
+    def start(self):
+        """Start warming the recognizer pool (call from the running event loop)"""
+        if self.recognizers and self._maintenance is None:
+            self._maintenance = asyncio.create_task(self.recognizers.maintain())
+    
+    def close(self):
+        if self._maintenance:
+            self._maintenance.cancel()
+            self._maintenance = None
+        if self.recognizers:
+            self.recognizers.close()
+    
+    @property
+    def openai_client(self) -> AsyncOpenAI:
+        """One keep-alive OpenAI client shared by every connection"""
+        if self._openai_client is None:
+            self._openai_client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        return self._openai_client
+    
+    def create_stt(
+        self,
+        on_recognized: Callable[[str], Awaitable],
+        on_recognizing: Optional[Callable[[str], Awaitable]] = None,
+        session_id: str = "-"
+    ) -> AzureSTT:
+        # Each connection needs its own recognizer and push stream; a pooled one is already connected
+        prepared = self.recognizers.acquire() if self.recognizers else None
+        return AzureSTT(on_recognized, on_recognizing, session_id=session_id, prepared=prepared)
+    
+    def create_tts(
+        self,
+        voice_name: str = "en-US-JennyNeural",
+        codec: Optional[AudioCodec] = None,
+        output_rate: int = SAMPLE_RATE
+    ) -> AzureTTS:
+        return AzureTTS(voice_name, pool=self.synthesizers, codec=codec, output_rate=output_rate)
+    
+    def create_llm(self) -> LLMClient:
+        return LLMClient(client=self.openai_client)
+    
+    def stats(self) -> Dict:
+        stats = {"synthesizers": self.synthesizers.stats(), "sdk_executor": sdk_executor.stats()}
+        if self.recognizers:
+            stats["recognizers"] = self.recognizers.stats()
+        return stats
+
+
+# Create a singleton instance
+registry = ResourceRegistry()
@@ -0,0 +1,108 @@
+import json
+import threading
+import time
+from typing import Dict, Optional
+from config.settings import settings
+from utils.metrics import metrics
+
+# Turn stages in pipeline order
+SPEECH_END = "speech_end"              # VAD saw the user stop talking
+STT_FINAL = "stt_final"                # Recognizer delivered the final transcript
+INTENT_DONE = "intent_done"
+FIRST_LLM_TOKEN = "first_llm_token"
+FIRST_SENTENCE = "first_sentence"      # First text segment handed to TTS
+FIRST_TTS_BYTE = "first_tts_byte"      # First synthesized audio available
+FIRST_AUDIO_SENT = "first_audio_sent"  # First audio frame queued for the socket
+TURN_COMPLETE = "turn_complete"
+
+STAGES = (
+    SPEECH_END, STT_FINAL, INTENT_DONE, FIRST_LLM_TOKEN,
+    FIRST_SENTENCE, FIRST_TTS_BYTE, FIRST_AUDIO_SENT, TURN_COMPLETE
+)
+
+
+class TurnTrace:
+    """Monotonic timestamps for the stages of one conversational turn"""
+    
+    def __init__(self, session_id: str, turn: int):
+        self.session_id = session_id
+        self.turn = turn
+        self.wall_time = time.time()
+        self.marks: Dict[str, float] = {}
+        self.interrupted = False
+    
+    def mark(self, stage: str, at: Optional[float] = None):
+        """Record a stage; only the first occurrence counts"""
+        if stage not in self.marks:
+            self.marks[stage] = time.monotonic() if at is None else at
+    
+    @property
+    def origin(self) -> Optional[float]:
+        return min(self.marks.values()) if self.marks else None
+    
+    def offsets_ms(self) -> Dict[str, float]:
+        """Each recorded stage in ms since the earliest mark"""
+        origin = self.origin
+        return {
+            stage: round((self.marks[stage] - origin) * 1000, 2)
+            for stage in STAGES if stage in self.marks
+        }
+    
+    def durations_ms(self) -> Dict[str, float]:
+        """
+        Time spent reaching each stage from the mark just before it
+        
+        Marks are taken in time order, so stages that run concurrently
+        (e.g. intent extraction alongside the LLM) never get negative durations.
+        """
+        durations = {}
+        ordered = sorted(self.marks.items(), key=lambda item: item[1])
+        for (_, previous_at), (stage, at) in zip(ordered, ordered[1:]):
+            durations[stage] = round((at - previous_at) * 1000, 2)
+        return durations
+    
+    def to_dict(self) -> Dict:
+        return {
+            "session": self.session_id,
+            "turn": self.turn,
+            "time": self.wall_time,
+            "interrupted": self.interrupted,
+            "offsets_ms": self.offsets_ms(),
+            "durations_ms": self.durations_ms()
+        }
+
+
+class TraceRecorder:
+    """
+    Aggregates finished turn traces into per-stage latency histograms
+    (via the metrics registry) and optionally exports them as JSON lines
+    """
+    
+    def __init__(self, path: str = ""):
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", buffering=1) if path else None  # Line buffered
+    
+    def record(self, trace: TurnTrace):
+        offsets = trace.offsets_ms()
+        if not trace.interrupted:
+            for stage, offset in offsets.items():
+                metrics.observe(f"turn.{stage}_ms", offset)
+            for stage, duration in trace.durations_ms().items():
+                metrics.observe(f"turn.stage.{stage}_ms", duration)
+        else:
+            metrics.incr("turn.interrupted")
+        
+        if self._file:
+            line = json.dumps(trace.to_dict())
+            with self._lock:
+                self._file.write(line + "\n")
+    
+    def histograms(self) -> Dict:
+        """p50/p95/p99 per stage: time since turn start and time spent in the stage"""
+        observations = metrics.snapshot()["observations"]
+        return {name: summary for name, summary in observations.items() if name.startswith("turn.")}
+
+
+# Create a singleton instance
+trace_recorder = TraceRecorder(settings.TRACE_FILE)
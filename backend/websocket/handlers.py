@@ -1,87 +1,226 @@
 import json
 import asyncio
-from typing import Dict, Any
-from speech.stt import AzureSTT
-from speech.tts import AzureTTS
-from llm.openai_client import LLMClient
-from auth.auth import TokenValidator, VoiceBiometric
+import struct
+import time
+import uuid
+from typing import Dict, Any, Optional, Union
+import numpy as np
+from auth.voiceprint import VoiceprintExtractor
+from config.settings import settings
+from speech.vad import StreamingVAD, SPEECH_END
+from utils.admission import Deadline, tenant_var, turn_deadline_var
+from utils.audio import AudioCodec, CODECS, CODECS_BY_FLAG, SAMPLE_RATE, StreamingResampler, create_codec
+from utils.log import get_logger, session_id_var
+from utils.metrics import metrics
+from utils.resources import ResourceRegistry, registry
+from utils.tracing import (
+    TurnTrace, trace_recorder, SPEECH_END as TRACE_SPEECH_END, STT_FINAL, INTENT_DONE,
+    FIRST_LLM_TOKEN, FIRST_SENTENCE, FIRST_TTS_BYTE, FIRST_AUDIO_SENT, TURN_COMPLETE
+)
+from websocket.protocol import (
+    PROTOCOL_BINARY_V1, FRAME_AUDIO, FLAG_CODEC_MASK, FrameError,
+    negotiate_protocol, negotiate_codec, negotiate_sample_rate, encode_audio_frame, decode_frame
+)
+from websocket.sender import OutboundQueue
+from websocket.sessions import session_store
+
+logger = get_logger("handler")
+audio_logger = get_logger("audio")
+chunk_logger = get_logger("tts.chunk")
+partial_logger = get_logger("stt.partial")
 
 class AudioMessageHandler:
-    def __init__(self, websocket):
+    def __init__(self, websocket, resources: ResourceRegistry = registry):
         self.websocket = websocket
+        self.resources = resources
+        self.session_id = uuid.uuid4().hex[:12]
         self.stt = None
-        self.tts = AzureTTS()
-        self.llm = LLMClient()
-        self.token_validator = TokenValidator()
-        self.voice_biometric = VoiceBiometric()
+        # TTS and LLM clients are borrowed from the registry once the user is authenticated
+        self.tts = None
+        self.llm = None
+        self.token_validator = resources.token_validator
+        self.voice_biometric = resources.voice_biometric
+        self.token = None
+        self.resume_id = None  # Session the client asks to resume, from its auth message
+        self.auth_received_at = None
+        self.voiceprint: Optional[VoiceprintExtractor] = None  # Until passive verification has scored
         
         self.user_context = {}
+        self.session_context = {}  # Per-connection state carried across turns
         self.is_processing = False
+        self.turn_task: Optional[asyncio.Task] = None
+        self.turn_count = 0
+        self.turn_lock = asyncio.Lock()
+        self.turn_llm_chunks = 0
+        self.turn_llm_chunks_heard = 0  # LLM chunks received when the last audio was sent
         self.audio_chunks_received = 0
+        self.vad = StreamingVAD() if settings.VAD_ENABLED else None
+        self.last_speech_end = None  # time.monotonic() of the last VAD speech end
         
+        # Audio protocol, negotiated during auth (JSON arrays for legacy clients)
+        self.protocol = negotiate_protocol(None)
+        self.codec = create_codec(negotiate_codec(None))
+        self.uplink_codecs: Dict[int, AudioCodec] = {}  # By frame flag, created on first use
+        # Client audio rates; the server converts to/from SAMPLE_RATE
+        self.input_rate = SAMPLE_RATE
+        self.output_rate = SAMPLE_RATE
+        self.input_resampler: Optional[StreamingResampler] = None
+        self.audio_frames_sent = 0
+        # Every outbound message goes through this queue's single writer task
+        self.outbound = OutboundQueue(websocket)
+    
     async def handle_connection(self):
         """Main handler for WebSocket connection"""
+        # Tasks spawned from here (turns, intent) inherit the session ID for logging
+        session_id_var.set(self.session_id)
+        self.outbound.start()
         try:
-            print("[HANDLER] Starting connection handler...")
+            logger.info("Starting connection handler...")
             
             # Authenticate user
             auth_success = await self.authenticate()
             if not auth_success:
-                print("[HANDLER] Authentication failed!")
-                await self.websocket.send(json.dumps({
+                logger.warning("Authentication failed")
+                self.outbound.send_control(json.dumps({
                     "type": "error",
                     "message": "Authentication failed"
                 }))
                 return
             
-            print(f"[HANDLER] Authentication successful! User: {self.user_context}")
+            logger.info("Authentication successful, user: %s", self.user_context.get("user_id"))
             
-            # Initialize STT with callbacks
-            print("[HANDLER] Initializing Azure Speech-to-Text...")
-            try:
-                self.stt = AzureSTT(
-                    on_recognized=self.on_text_recognized,
-                    on_recognizing=self.on_text_recognizing
-                )
-                self.stt.start()
-                print("[HANDLER] STT started successfully!")
-            except Exception as e:
-                print(f"[HANDLER] STT initialization failed: {e}")
-                await self.websocket.send(json.dumps({
-                    "type": "error",
-                    "message": f"Speech service failed: {str(e)}"
-                }))
-                return
+            # A client reconnecting within the resumption window picks up its recognizer and conversation
+            state = session_store.claim(self.resume_id, self.token) if self.resume_id else None
+            if state:
+                self.restore(state)
+                logger.info("Resumed session after %d turns", self.turn_count)
+            
+            # Stateless codecs are applied by TTS, so cached sentences are encoded
+            # once; a stateful one (Opus) needs this connection's audio in order
+            self.tts = self.resources.create_tts(
+                codec=self.codec if self.codec.stateless else None,
+                output_rate=self.output_rate
+            )
+            
+            if state is None:
+                self.llm = self.resources.create_llm()
+                
+                user_id = self.user_context.get("user_id")
+                if settings.VOICE_VERIFY_ENABLED and user_id and self.voice_biometric.is_enrolled(user_id):
+                    self.voiceprint = self.voice_biometric.extractor()
+                
+                # Initialize STT with callbacks
+                logger.info("Initializing Azure Speech-to-Text...")
+                try:
+                    self.stt = self.resources.create_stt(
+                        on_recognized=self.on_text_recognized,
+                        on_recognizing=self.on_text_recognizing,
+                        session_id=self.session_id
+                    )
+                    await self.stt.start()
+                    logger.info("STT started")
+                except Exception as e:
+                    logger.error("STT initialization failed: %s", e)
+                    self.outbound.send_control(json.dumps({
+                        "type": "error",
+                        "message": f"Speech service failed: {str(e)}"
+                    }))
+                    return
             
             # Send ready signal
-            await self.websocket.send(json.dumps({"type": "ready"}))
-            print("[HANDLER] Sent 'ready' signal to client. Waiting for audio...")
+            self.outbound.send_control(json.dumps({
+                "type": "ready",
+                "protocol": self.protocol,
+                "codec": self.codec.name,
+                "sample_rate": self.input_rate,
+                "playback_rate": self.output_rate,
+                "session_id": self.session_id,
+                "resumed": state is not None
+            }))
+            # Server-side time to ready, from the auth message, by how the recognizer was obtained
+            path = "resumed" if state else "warm" if self.stt.warm else "cold"
+            metrics.observe(f"session.ready_ms.{path}", (time.monotonic() - self.auth_received_at) * 1000)
+            logger.info(
+                "Sent 'ready' signal to client (protocol: %s, codec: %s, %d/%d Hz, %s). Waiting for audio...",
+                self.protocol, self.codec.name, self.input_rate, self.output_rate, path
+            )
             
             # Process messages
             async for message in self.websocket:
                 await self.process_message(message)
-                
+        
         except Exception as e:
-            print(f"[HANDLER] Connection error: {e}")
+            logger.error("Connection error: %s", e)
         finally:
-            print("[HANDLER] Cleaning up connection...")
-            if self.stt:
-                self.stt.stop()
+            logger.info("Cleaning up connection...")
+            if self.turn_task and not self.turn_task.done():
+                # Client went away mid-response: stop the LLM stream and synthesis
+                self.turn_task.cancel()
+                await asyncio.gather(self.turn_task, return_exceptions=True)
+            if self.vad:
+                logger.info("VAD session stats: %s", self.vad.stats())
+            if self.stt and self.stt.is_running:
+                # Dropped without a stop: keep the session a while in case the client reconnects
+                # (the store closes it instead if resumption is off or the worker is shutting down)
+                if session_store.park(self.session_id, self.token, self.suspend(), self.close_session):
+                    logger.info("Session kept for %ss for the client to resume", settings.SESSION_RESUME_WINDOW_S)
+            else:
+                self.close_session({"stt": self.stt, "llm": self.llm})
+            await self.outbound.close()
+            logger.info("Send queue stats: %s", self.outbound.stats())
+    
+    # Handler attributes that make up a session, carried over when a client resumes
+    RESUMABLE = (
+        "session_id", "user_context", "session_context", "stt", "llm",
+        "voiceprint", "vad", "turn_count", "last_speech_end"
+    )
+    
+    def suspend(self) -> Dict[str, Any]:
+        """Detach the session from this connection; results recognized meanwhile are dropped"""
+        if self.stt:
+            self.stt.rebind(None, None)
+        return {name: getattr(self, name) for name in self.RESUMABLE}
+    
+    def restore(self, state: Dict[str, Any]):
+        """Adopt a suspended session in place of the one this connection started"""
+        for name, value in state.items():
+            setattr(self, name, value)
+        session_id_var.set(self.session_id)
+        self.stt.rebind(self.on_text_recognized, self.on_text_recognizing)
+    
+    @staticmethod
+    def close_session(state: Dict[str, Any]):
+        """Release what a session holds upstream (its recognizer and LLM client)"""
+        if state.get("stt"):
+            state["stt"].stop()
+        if state.get("llm"):
+            state["llm"].close()
     
     async def authenticate(self) -> bool:
         """Authenticate the user via token or voice"""
-        print("[AUTH] Waiting for authentication message...")
+        logger.debug("Waiting for authentication message...")
         first_msg = await self.websocket.recv()
+        self.auth_received_at = time.monotonic()
         data = json.loads(first_msg)
-        print(f"[AUTH] Received: {data}")
+        logger.debug("Auth message received (type: %s)", data.get("type"))
         
         if data.get("type") == "auth":
             token = data.get("token")
+            self.token = token
+            self.resume_id = data.get("resume")
+            self.protocol = negotiate_protocol(data.get("protocols"))
+            codec_name = negotiate_codec(data.get("codecs"))
+            self.output_rate = negotiate_sample_rate(data.get("playback_rate"))
+            if not CODECS[codec_name].supports_rate(self.output_rate):
+                # Opus only runs at its own rates; the client resamples instead
+                self.output_rate = SAMPLE_RATE
+            self.codec = create_codec(codec_name, self.output_rate)
+            self.set_input_rate(data.get("sample_rate"))
             
             # For demo/testing: accept demo tokens
             if token == "demo-token":
                 self.user_context = {"user_id": "demo-user", "name": "Demo User"}
-                print("[AUTH] Demo token accepted!")
+                logger.info("Demo token accepted")
                 return True
             
             # For production: validate JWT tokens
@@ -91,94 +230,363 @@ class AudioMessageHandler:
                 self.user_context = user_data
                 return True
         
-        print("[AUTH] Authentication failed - no valid token")
+        logger.warning("Authentication failed - no valid token")
         return False
     
-    async def process_message(self, message: str):
+    async def process_message(self, message: Union[str, bytes]):
         """Process incoming WebSocket messages"""
+        if isinstance(message, (bytes, bytearray)):
+            self.process_binary_frame(message)
+            return
+        
         try:
             data = json.loads(message)
             msg_type = data.get("type")
             
             if msg_type == "audio":
-                self.audio_chunks_received += 1
-                # Convert Int16 audio data to bytes
-                # The frontend sends Int16 values as a JSON array
+                # Legacy protocol: the frontend sends Int16 values as a JSON array
                 raw_data = data.get("data", [])
                 
                 # Convert Int16 array to bytes (little-endian)
-                import struct
                 audio_bytes = struct.pack(f'<{len(raw_data)}h', *raw_data)
-                
-                # Log every 10th chunk to avoid spam
-                if self.audio_chunks_received % 10 == 0:
-                    print(f"[AUDIO] Received {self.audio_chunks_received} audio chunks ({len(audio_bytes)} bytes each)")
-                
-                # Push to STT
-                if self.stt:
-                    self.stt.push_audio(audio_bytes)
+                self.push_audio(audio_bytes)
+            
+            elif msg_type == "audio_format":
+                # Capture started at a rate the client didn't know during auth
+                self.set_input_rate(data.get("sample_rate"))
+                self.outbound.send_control(json.dumps({
+                    "type": "audio_format",
+                    "sample_rate": self.input_rate
+                }))
+            
+            elif msg_type == "interrupt":
+                await self.interrupt("client request")
             
             elif msg_type == "stop":
-                print("[HANDLER] Received stop command")
+                logger.info("Received stop command")
                 if self.stt:
                     self.stt.stop()
-                    
+        
         except json.JSONDecodeError:
-            print("[HANDLER] Invalid message format received")
+            logger.warning("Invalid message format received")
+    
+    def process_binary_frame(self, frame: bytes):
+        """Handle a binary audio frame (header + PCM or encoded audio)"""
+        try:
+            kind, flags, _sequence, payload = decode_frame(frame)
+        except FrameError as e:
+            logger.warning("Invalid binary frame: %s", e)
+            return
+        
+        if kind != FRAME_AUDIO:
+            return
+        
+        codec_flag = flags & FLAG_CODEC_MASK
+        if codec_flag:
+            codec = self.uplink_codecs.get(codec_flag)
+            if codec is None:
+                if codec_flag not in CODECS_BY_FLAG:
+                    logger.warning("Unsupported audio codec in frame flags: %d", codec_flag)
+                    return
+                try:
+                    codec = CODECS_BY_FLAG[codec_flag](self.input_rate)
+                except ValueError as e:
+                    logger.warning("Unusable uplink codec: %s", e)
+                    return
+                self.uplink_codecs[codec_flag] = codec
+            try:
+                payload = codec.decode(payload)
+            except ValueError as e:
+                logger.warning("Invalid %s audio frame: %s", codec.name, e)
+                return
+        # Raw PCM payload is a memoryview into the frame, no copy is made
+        self.push_audio(payload)
+    
+    def set_input_rate(self, requested):
+        """Switch the rate of inbound audio, converted to SAMPLE_RATE for VAD and STT"""
+        rate = negotiate_sample_rate(requested)
+        if rate == self.input_rate:
+            return
+        self.input_rate = rate
+        self.input_resampler = StreamingResampler(rate, SAMPLE_RATE) if rate != SAMPLE_RATE else None
+        # Decoders of stateful codecs (Opus) are built for one rate
+        self.uplink_codecs = {}
+        logger.info("Inbound audio at %d Hz", rate)
+    
+    def push_audio(self, audio: Union[bytes, memoryview]):
+        """Forward one inbound audio chunk to STT"""
+        self.audio_chunks_received += 1
+        audio_logger.debug("Received %d audio chunks (%d bytes)", self.audio_chunks_received, len(audio))
+        
+        if self.input_resampler:
+            # Filter history carries over, so chunk boundaries leave no seams
+            resampled = self.input_resampler.process(np.frombuffer(audio, dtype=np.int16))
+            audio = memoryview(resampled).cast("B")
+        
+        if self.vad:
+            audio, events = self.vad.process(audio)
+            for event, stream_time in events:
+                self.on_vad_event(event, stream_time)
+        
+        if self.voiceprint and len(audio):
+            self.verify_voiceprint(audio)
+        
+        if self.stt and len(audio):
+            self.stt.push_audio(audio)
+    
+    def verify_voiceprint(self, audio: Union[bytes, memoryview]):
+        """Feed speech to passive voice verification until there is enough to score, once"""
+        self.voiceprint.push(audio)
+        if self.voiceprint.voiced_ms < settings.VOICE_VERIFY_SPEECH_MS:
+            return
+        
+        user_id = self.user_context.get("user_id")
+        score = self.voice_biometric.verify_embedding(user_id, self.voiceprint.embedding())
+        self.voiceprint = None
+        verified = score >= self.voice_biometric.threshold
+        self.session_context["voice_verified"] = verified
+        metrics.observe("voice.verify_score", score)
+        metrics.incr("voice.verified" if verified else "voice.rejected")
+        logger.info("Voice verification for %s: %.3f (%s)", user_id, score, "match" if verified else "no match")
+    
+    def on_vad_event(self, event: str, stream_time: float):
+        """Handle speech start/end detected by the VAD"""
+        logger.debug("VAD %s at %.2fs (suppressed %.1fs so far)", event, stream_time, self.vad.seconds_suppressed)
+        if event == SPEECH_END:
+            self.last_speech_end = time.monotonic()
+        self.outbound.send_control(json.dumps({
+            "type": "vad",
+            "event": event
+        }))
+    
+    async def send_audio(self, audio_chunk: bytes):
+        """
+        Queue synthesized audio for the client using the negotiated protocol
+        
+        Chunks from TTS are already in a stateless codec; a stateful codec
+        encodes them here. Waits while the client is behind on reading, which
+        slows synthesis down to the client's pace instead of buffering
+        without bound.
+        """
+        if not self.codec.stateless:
+            audio_chunk = self.codec.encode(audio_chunk)
+        if audio_chunk:
+            await self.send_encoded_audio(audio_chunk)
+    
+    async def send_encoded_audio(self, payload: bytes):
+        if self.protocol == PROTOCOL_BINARY_V1:
+            await self.outbound.send_audio(encode_audio_frame(payload, self.audio_frames_sent, self.codec.frame_flag))
+        else:
+            await self.outbound.send_audio(json.dumps({
+                "type": "audio",
+                "codec": self.codec.name,
+                "data": list(payload)
+            }))
+        self.audio_frames_sent += 1
     
     async def on_text_recognizing(self, text: str):
         """Handle partial recognition results"""
-        print(f"[STT PARTIAL] '{text}'")
-        # Send partial transcription to client for UI feedback
-        await self.websocket.send(json.dumps({
+        # Scheduled from an SDK thread, so the connection's context isn't inherited
+        session_id_var.set(self.session_id)
+        partial_logger.debug("'%s'", text)
+        # Send partial transcription to client for UI feedback (only the latest
+        # one is kept if the client is behind)
+        self.outbound.send_partial(json.dumps({
             "type": "partial_transcript",
             "text": text
         }))
+        
+        # The user started talking over the response: stop it now rather than
+        # waiting for the final transcript
+        if (self.is_processing and settings.BARGE_IN_ENABLED and settings.BARGE_IN_ON_PARTIAL
+                and len(text.split()) >= settings.BARGE_IN_MIN_WORDS):
+            await self.interrupt("partial transcript")
     
     async def on_text_recognized(self, text: str):
         """Handle final recognition results"""
-        print(f"[STT FINAL] '{text}'")
+        session_id_var.set(self.session_id)
+        logger.info("STT final: '%s'", text)
         
-        if self.is_processing:
-            print("[STT] Already processing, skipping...")
+        async with self.turn_lock:
+            if self.is_processing:
+                if not settings.BARGE_IN_ENABLED:
+                    logger.info("Already processing, skipping...")
+                    return
+                await self.interrupt("final transcript")
+            
+            self.is_processing = True
+            self.turn_task = asyncio.create_task(self.run_turn(text))
+    
+    async def interrupt(self, reason: str):
+        """
+        Cancel the in-flight turn (LLM stream and pending TTS) and tell the
+        client to flush its playback queue
+        """
+        task = self.turn_task
+        if task is None or task.done():
             return
         
+        logger.info("Barge-in: interrupting current turn (%s)", reason)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        
+        metrics.incr("barge_in.interrupts")
+        # Chunks streamed after the last audio sent were paid for but never heard
+        metrics.incr("barge_in.wasted_llm_chunks", self.turn_llm_chunks - self.turn_llm_chunks_heard)
+        
+        # Audio still queued for the interrupted turn would play after the flush
+        self.outbound.flush_audio()
+        self.codec.reset()
+        self.outbound.send_control(json.dumps({"type": "interrupt"}))
+    
+    async def run_turn(self, text: str):
+        """Respond to one final transcript"""
         self.is_processing = True
+        self.turn_llm_chunks = 0
+        self.turn_llm_chunks_heard = 0
+        intent_task = None
+        trace = self.start_trace()
+        
+        # Upstream calls of this turn are charged to the user, and until its first audio
+        # is sent its LLM calls must be admitted within its budget (counted from end of speech)
+        tenant_var.set(self.user_context.get("user_id"))
+        deadline = Deadline(settings.TURN_BUDGET_MS / 1000, trace.origin) if settings.TURN_BUDGET_MS > 0 else None
+        turn_deadline_var.set(deadline)
         
         try:
             # Send final transcript
-            await self.websocket.send(json.dumps({
+            self.outbound.send_control(json.dumps({
                 "type": "final_transcript",
                 "text": text
-            }))
+            }), replaces_partial=True)
+            
+            intent = None
+            mode = settings.INTENT_MODE
             
-            # Extract intent
-            print("[LLM] Extracting intent...")
-            intent = await self.llm.extract_intent(text)
-            print(f"[LLM] Intent: {intent}")
+            if mode == "blocking":
+                # Extract intent
+                logger.debug("Extracting intent...")
+                intent = (await self.timed_intent(text, trace))[0]
+                logger.info("Intent: %s", intent)
+            elif mode == "concurrent":
+                intent_task = asyncio.create_task(self.timed_intent(text, trace))
             
             # Generate and stream response
-            print("[LLM] Generating response...")
-            async for audio_chunk in self.generate_and_synthesize(text, intent):
-                print(f"[TTS] Sending audio chunk ({len(audio_chunk)} bytes)")
-                await self.websocket.send(json.dumps({
-                    "type": "audio",
-                    "data": list(audio_chunk)
-                }))
+            logger.debug("Generating response...")
+            response = self.generate_and_synthesize(text, intent, trace)
+            try:
+                async for audio_chunk in response:
+                    trace.mark(FIRST_TTS_BYTE)
+                    chunk_logger.debug("Sending audio chunk (%d bytes)", len(audio_chunk))
+                    await self.send_audio(audio_chunk)
+                    trace.mark(FIRST_AUDIO_SENT)
+                    if deadline:
+                        deadline.clear()
+                    self.turn_llm_chunks_heard = self.turn_llm_chunks
+                # Audio a stateful codec still holds for a whole packet
+                tail = self.codec.flush()
+                if tail:
+                    await self.send_encoded_audio(tail)
+            finally:
+                # Close the stream now if sending failed, rather than at garbage collection
+                await response.aclose()
+            trace.mark(TURN_COMPLETE)
+            
+            if mode == "deferred":
+                # Runs in the background so the next turn isn't held up
+                intent_task = asyncio.create_task(self.timed_intent(text))
+                intent_task.add_done_callback(self.remember_intent)
+            elif intent_task:
+                self.remember_intent(await intent_task)
+            else:
+                self.session_context["last_intent"] = intent
         
+        except asyncio.CancelledError:
+            trace.interrupted = True
+            if intent_task and not intent_task.done():
+                intent_task.cancel()
+            raise
         except Exception as e:
-            print(f"[ERROR] Processing failed: {e}")
+            logger.error("Processing failed: %s", e)
+            if intent_task and settings.INTENT_MODE == "concurrent":
+                intent_task.cancel()
         finally:
             self.is_processing = False
+            trace_recorder.record(trace)
     
-    async def generate_and_synthesize(self, text: str, intent: Dict):
-        """Generate LLM response and synthesize to audio"""
+    def start_trace(self) -> TurnTrace:
+        """Open the latency trace for a new turn, back-dated to end of speech"""
+        self.turn_count += 1
+        trace = TurnTrace(self.session_id, self.turn_count)
+        
+        final_at = self.stt.last_final_at if self.stt else None
+        trace.mark(STT_FINAL, final_at)
+        
+        # Only use the VAD speech end if it belongs to this utterance
+        if self.last_speech_end and final_at and 0 <= final_at - self.last_speech_end < 10:
+            trace.mark(TRACE_SPEECH_END, self.last_speech_end)
+        return trace
+    
+    def remember_intent(self, result):
+        """Attach a non-blocking intent result to the session context for later turns"""
+        if isinstance(result, asyncio.Task):
+            if result.cancelled() or result.exception():
+                return
+            result = result.result()
+        
+        intent, elapsed = result
+        logger.info("Intent (%s): %s", settings.INTENT_MODE, intent)
+        self.session_context["last_intent"] = intent
+        # Intent was off the critical path, so its whole round trip was saved
+        metrics.observe("intent.time_saved_ms", elapsed * 1000)
+    
+    async def timed_intent(self, text: str, trace: Optional[TurnTrace] = None):
+        """Run intent extraction and return (intent, elapsed seconds)"""
+        start = time.monotonic()
+        intent = await self.llm.extract_intent(text)
+        elapsed = time.monotonic() - start
+        if trace:
+            trace.mark(INTENT_DONE)
+        metrics.observe("intent.latency_ms", elapsed * 1000)
+        return intent, elapsed
+    
+    async def generate_and_synthesize(self, text: str, intent: Optional[Dict], trace: Optional[TurnTrace] = None):
+        """
+        Generate LLM response and synthesize to audio
+        
+        When intent is None (non-blocking intent modes) the previous turn's
+        intent is passed as context instead.
+        """
+        if intent is not None:
+            context = {"intent": intent, **self.user_context}
+        else:
+            context = {"previous_intent": self.session_context.get("last_intent"), **self.user_context}
+        
         # Stream LLM response
-        llm_stream = self.llm.generate_response(
-            text,
-            context={"intent": intent, **self.user_context}
-        )
+        llm_stream = self.llm.generate_response(text, context=context)
         
         # Stream TTS synthesis
-        async for audio_data in self.tts.synthesize_stream(llm_stream):
-            yield audio_data
\ No newline at end of file
+        on_segment = (lambda _segment: trace.mark(FIRST_SENTENCE)) if trace else None
+        audio_stream = self.tts.synthesize_stream(
+            self.count_llm_chunks(llm_stream, trace),
+            on_segment=on_segment
+        )
+        try:
+            async for audio_data in audio_stream:
+                yield audio_data
+        finally:
+            # TTS first: its pipeline may still be reading the LLM stream
+            await audio_stream.aclose()
+            # Closes the upstream HTTP stream right away when the turn is interrupted
+            await llm_stream.aclose()
+    
+    async def count_llm_chunks(self, llm_stream, trace: Optional[TurnTrace] = None):
+        """Pass LLM chunks through, counting them for barge-in waste metrics"""
+        async for chunk in llm_stream:
+            if trace:
+                trace.mark(FIRST_LLM_TOKEN)
+            self.turn_llm_chunks += 1
+            yield chunk
\ No newline at end of file
@@ -0,0 +1,122 @@
+import struct
+from typing import List, Optional, Tuple
+from config.settings import settings
+from utils.audio import CODECS, CODEC_PCM16, SAMPLE_RATE
+
+# Binary audio frame layout (all fields little-endian):
+#
+#   offset  size  field
+#   0       1     version   protocol version, currently 1
+#   1       1     kind      frame kind (FRAME_AUDIO)
+#   2       2     flags     bits 0-7: payload codec ID (0 = raw PCM, see
+#                           utils.audio), bits 8-15 reserved (0)
+#   4       4     sequence  per-direction frame counter (wraps at 2**32)
+#   8       ...   payload   mono audio: 16-bit little-endian PCM or that
+#                           audio in the negotiated codec, at the negotiated
+#                           sample rate for that direction (16 kHz default)
+#
+# Binary frames carry audio only; control messages stay JSON text frames.
+
+PROTOCOL_JSON = "json"
+PROTOCOL_BINARY_V1 = "pcm-binary/1"
+
+# Preference order when the client offers more than one protocol
+SUPPORTED_PROTOCOLS = (PROTOCOL_BINARY_V1, PROTOCOL_JSON)
+
+FRAME_VERSION = 1
+FRAME_AUDIO = 1
+
+FLAG_CODEC_MASK = 0x00FF
+
+# Client sample rates the server converts from/to (see StreamingResampler)
+MIN_SAMPLE_RATE = 8000
+MAX_SAMPLE_RATE = 96000
+
+_HEADER = struct.Struct("<BBHI")
+HEADER_SIZE = _HEADER.size
+
+
+class FrameError(ValueError):
+    """Raised when a binary frame cannot be decoded"""
+
+
+def negotiate_protocol(offered: Optional[List[str]]) -> str:
+    """
+    Pick the audio protocol for a connection from the client's offer
+    
+    Args:
+        offered: Protocol names from the auth message, in client preference order.
+                 Clients that don't send the field get the legacy JSON protocol.
+    """
+    if not offered:
+        return PROTOCOL_JSON
+    if isinstance(offered, str):
+        offered = [offered]
+    for name in offered:
+        if name in SUPPORTED_PROTOCOLS:
+            return name
+    return PROTOCOL_JSON
+
+
+def negotiate_codec(offered: Optional[List[str]]) -> str:
+    """
+    Pick the audio codec for a connection from the client's offer
+    
+    Args:
+        offered: Codec names from the auth message, in client preference order.
+                 The first one that is available and allowed by AUDIO_CODECS
+                 wins; clients that don't send the field get raw PCM.
+    """
+    if not offered:
+        return CODEC_PCM16
+    if isinstance(offered, str):
+        offered = [offered]
+    allowed = {name.strip() for name in settings.AUDIO_CODECS.split(",")}
+    for name in offered:
+        if name in allowed and name in CODECS:
+            return name
+    return CODEC_PCM16
+
+
+def negotiate_sample_rate(requested) -> int:
+    """
+    Sample rate for one direction of a connection's audio
+    
+    Args:
+        requested: Rate in Hz from the client (its native capture or playback
+                   rate); clients that don't send one, or send a rate out of
+                   range, get the server's own SAMPLE_RATE.
+    """
+    try:
+        rate = int(requested)
+    except (TypeError, ValueError):
+        return SAMPLE_RATE
+    if MIN_SAMPLE_RATE <= rate <= MAX_SAMPLE_RATE:
+        return rate
+    return SAMPLE_RATE
+
+
+def encode_audio_frame(payload: bytes, sequence: int, flags: int = 0) -> bytes:
+    """Build a binary audio frame (header + audio payload)"""
+    return _HEADER.pack(FRAME_VERSION, FRAME_AUDIO, flags, sequence & 0xFFFFFFFF) + payload
+
+
+def decode_frame(frame: bytes) -> Tuple[int, int, int, memoryview]:
+    """
+    Parse a binary frame without copying the payload
+    
+    Returns:
+        (kind, flags, sequence, payload) where payload is a memoryview into frame
+    """
+    if len(frame) < HEADER_SIZE:
+        raise FrameError(f"Frame too short ({len(frame)} bytes)")
+    
+    version, kind, flags, sequence = _HEADER.unpack_from(frame, 0)
+    if version != FRAME_VERSION:
+        raise FrameError(f"Unsupported frame version {version}")
+    
+    payload = memoryview(frame)[HEADER_SIZE:]
+    if kind == FRAME_AUDIO and not flags & FLAG_CODEC_MASK and len(payload) % 2:
+        raise FrameError("Audio payload is not a whole number of 16-bit samples")
+    
+    return kind, flags, sequence, payload
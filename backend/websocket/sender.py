@@ -0,0 +1,211 @@
+import asyncio
+from collections import deque
+from typing import Deque, Optional, Union
+from config.settings import settings
+from utils.log import get_logger
+from utils.metrics import metrics
+
+logger = get_logger("sender")
+
+# What to do when a client stops reading for WS_SLOW_CONSUMER_TIMEOUT
+SLOW_CONSUMER_CLOSE = "close"  # Disconnect it (the call can't keep up anyway)
+SLOW_CONSUMER_BLOCK = "block"  # Keep applying backpressure to the TTS pipeline
+
+# Close code for clients that can't keep up (1008 = policy violation)
+SLOW_CONSUMER_CLOSE_CODE = 1008
+
+Message = Union[str, bytes]
+
+
+class SlowConsumerError(Exception):
+    """Raised to the sender of audio when the client was shed for not reading"""
+
+
+class OutboundQueue:
+    """
+    Single writer for everything sent on one connection
+    
+    Messages are sent by one task in priority order:
+    
+    1. control: ready, errors, final transcripts, VAD events, interrupts
+    2. partial transcript: one slot, a newer partial replaces a pending one
+    3. audio: bounded; send_audio() waits for space, which backpressures
+       synthesis instead of letting pending sends pile up in memory
+    
+    Control messages and audio are never dropped by the queue itself; only
+    flush_audio() (barge-in) discards queued audio.
+    """
+    
+    # Messages queued across all connections in this process
+    total_depth = 0
+    
+    def __init__(
+        self,
+        websocket,
+        max_audio: Optional[int] = None,
+        slow_consumer_timeout: Optional[float] = None,
+        slow_consumer_policy: Optional[str] = None
+    ):
+        self.websocket = websocket
+        self.max_audio = max_audio or settings.WS_SEND_QUEUE_MAX
+        self.slow_consumer_timeout = slow_consumer_timeout or settings.WS_SLOW_CONSUMER_TIMEOUT
+        self.slow_consumer_policy = slow_consumer_policy or settings.WS_SLOW_CONSUMER_POLICY
+        
+        self._control: Deque[Message] = deque()
+        self._audio: Deque[Message] = deque()
+        self._partial: Optional[Message] = None
+        self._ready = asyncio.Event()      # Something to send
+        self._has_space = asyncio.Event()  # Audio queue below its bound
+        self._has_space.set()
+        self._task: Optional[asyncio.Task] = None
+        self.error: Optional[BaseException] = None
+        
+        self.sent = 0
+        self.partials_coalesced = 0
+        self.audio_flushed = 0
+    
+    @property
+    def depth(self) -> int:
+        return len(self._control) + len(self._audio) + (self._partial is not None)
+    
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+    
+    def send_control(self, message: Message, replaces_partial: bool = False):
+        """
+        Queue a message that must be delivered, ahead of audio
+        
+        Args:
+            replaces_partial: Drop a pending partial transcript (e.g. when
+                              sending the final transcript it would overwrite)
+        """
+        if replaces_partial and self._partial is not None:
+            self._partial = None
+            self._changed(-1)
+        self._control.append(message)
+        self._changed(1)
+    
+    def send_partial(self, message: Message):
+        """Queue a partial transcript, replacing one that hasn't been sent yet"""
+        if self._partial is not None:
+            self.partials_coalesced += 1
+            metrics.incr("ws.send_queue.partials_coalesced")
+        else:
+            self._changed(1)
+        self._partial = message
+        self._ready.set()
+    
+    async def send_audio(self, message: Message):
+        """
+        Queue an audio frame, waiting while the audio queue is full
+        
+        Raises:
+            SlowConsumerError: the client was disconnected for not reading
+            the connection's send error, if the writer has already failed
+        """
+        while len(self._audio) >= self.max_audio:
+            self._raise_if_failed()
+            self._has_space.clear()
+            try:
+                await asyncio.wait_for(self._has_space.wait(), self.slow_consumer_timeout)
+            except asyncio.TimeoutError:
+                await self._on_slow_consumer()
+        self._raise_if_failed()
+        
+        self._audio.append(message)
+        self._changed(1)
+    
+    def flush_audio(self) -> int:
+        """Discard queued audio (the turn it belongs to was interrupted)"""
+        flushed = len(self._audio)
+        if flushed:
+            self._audio.clear()
+            self._changed(-flushed)
+            self._has_space.set()
+            self.audio_flushed += flushed
+            metrics.incr("ws.send_queue.audio_flushed", flushed)
+        return flushed
+    
+    async def close(self, timeout: float = 2.0):
+        """Give queued messages a moment to go out, then stop the writer"""
+        if self._task is None:
+            return
+        if self.error is None and self.depth:
+            try:
+                await asyncio.wait_for(self._drained(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._changed(-self.depth)
+        self._control.clear()
+        self._audio.clear()
+        self._partial = None
+    
+    async def _drained(self):
+        while self.depth and self.error is None:
+            await asyncio.sleep(0.01)
+    
+    async def _run(self):
+        try:
+            while True:
+                await self._ready.wait()
+                message = self._next()
+                if message is None:
+                    self._ready.clear()
+                    continue
+                await self.websocket.send(message)
+                self.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Connection is gone; producers see this on their next send_audio()
+            self.error = e
+            self._has_space.set()
+    
+    def _next(self) -> Optional[Message]:
+        if self._control:
+            message = self._control.popleft()
+        elif self._partial is not None:
+            message, self._partial = self._partial, None
+        elif self._audio:
+            message = self._audio.popleft()
+            if len(self._audio) < self.max_audio:
+                self._has_space.set()
+        else:
+            return None
+        self._changed(-1)
+        return message
+    
+    def _changed(self, delta: int):
+        OutboundQueue.total_depth += delta
+        metrics.gauge("ws.send_queue.depth", OutboundQueue.total_depth)
+        if delta > 0:
+            metrics.observe("ws.send_queue.connection_depth", self.depth)
+            self._ready.set()
+    
+    def _raise_if_failed(self):
+        if self.error is not None:
+            raise self.error
+    
+    async def _on_slow_consumer(self):
+        metrics.incr("ws.send_queue.slow_consumers")
+        if self.slow_consumer_policy == SLOW_CONSUMER_BLOCK:
+            logger.warning("Client has not read for %.1fs, still waiting", self.slow_consumer_timeout)
+            return
+        
+        logger.warning("Client has not read for %.1fs, disconnecting", self.slow_consumer_timeout)
+        self.error = SlowConsumerError("Client too slow")
+        self._task.cancel()
+        # Don't wait for the closing handshake: the client isn't reading
+        asyncio.ensure_future(self.websocket.close(SLOW_CONSUMER_CLOSE_CODE, "Client too slow"))
+        raise self.error
+    
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "queued_audio": len(self._audio),
+            "sent": self.sent,
+            "partials_coalesced": self.partials_coalesced,
+            "audio_flushed": self.audio_flushed
+        }
@@ -0,0 +1,99 @@
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+from config.settings import settings
+from utils.log import get_logger
+from utils.metrics import metrics
+
+logger = get_logger("sessions")
+
+
+def token_digest(token: Optional[str]) -> str:
+    return hashlib.sha256((token or "").encode("utf-8")).hexdigest()
+
+
+class SessionStore:
+    """
+    State of dropped connections, kept for window_s so the client can resume
+    
+    A connection that goes away without a "stop" parks its session here
+    (recognizer, conversation, context) under its session ID. A reconnect
+    that names that session ID and authenticates with the same token takes
+    it back and skips setup; the token is checked so a session ID alone
+    can't take over someone else's session (tokens are kept as SHA-256
+    digests only). Sessions not claimed in time are closed by their
+    on_expire callback, and so are sessions parked while resumption is
+    off or after close().
+    
+    Per worker process: with WS_WORKERS > 1 a reconnect resumes only if it
+    reaches the same worker. Event loop thread only.
+    """
+    
+    def __init__(self, window_s: float, max_sessions: int):
+        self.window_s = window_s
+        self.max_sessions = max_sessions
+        self.closed = False
+        # session ID -> (token digest, state, expiry timer, on_expire); oldest first
+        self._sessions: "OrderedDict[str, Tuple[str, Dict, asyncio.TimerHandle, Callable[[Dict], None]]]" = OrderedDict()
+    
+    def __len__(self) -> int:
+        return len(self._sessions)
+    
+    def park(self, session_id: str, token: Optional[str], state: Dict, on_expire: Callable[[Dict], None]) -> bool:
+        """Keep a session for resumption; if it can't be kept it is closed now and False returned"""
+        if self.closed or self.window_s <= 0 or self.max_sessions <= 0:
+            self._close_session(session_id, state, on_expire)
+            return False
+        while len(self._sessions) >= self.max_sessions:
+            self._expire(next(iter(self._sessions)))
+        
+        timer = asyncio.get_running_loop().call_later(self.window_s, self._expire, session_id)
+        self._sessions[session_id] = (token_digest(token), state, timer, on_expire)
+        metrics.incr("session.parked")
+        metrics.gauge("session.parked_now", len(self._sessions))
+        return True
+    
+    def claim(self, session_id: str, token: Optional[str]) -> Optional[Dict]:
+        """Take back a parked session (None if unknown, expired or the token doesn't match)"""
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            metrics.incr("session.resume_missed")
+            return None
+        digest, state, timer, _ = entry
+        if digest != token_digest(token):
+            logger.warning("Refused to resume session %s: token does not match", session_id)
+            metrics.incr("session.resume_refused")
+            return None
+        
+        del self._sessions[session_id]
+        timer.cancel()
+        metrics.incr("session.resumed")
+        metrics.gauge("session.parked_now", len(self._sessions))
+        return state
+    
+    def _expire(self, session_id: str):
+        entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            return
+        _, state, timer, on_expire = entry
+        timer.cancel()
+        metrics.incr("session.expired")
+        metrics.gauge("session.parked_now", len(self._sessions))
+        self._close_session(session_id, state, on_expire)
+    
+    def _close_session(self, session_id: str, state: Dict, on_expire: Callable[[Dict], None]):
+        try:
+            on_expire(state)
+        except Exception as e:
+            logger.error("Closing session %s failed: %s", session_id, e)
+    
+    def close(self):
+        """Close every parked session now, and any parked from now on (shutdown)"""
+        self.closed = True
+        for session_id in list(self._sessions):
+            self._expire(session_id)
+
+
+# Create a singleton instance (shared by every connection in the process)
+session_store = SessionStore(settings.SESSION_RESUME_WINDOW_S, settings.SESSION_RESUME_MAX)
@@ -61,15 +61,23 @@ micBtn.addEventListener('click', async () => {
             console.log('[MIC] Starting microphone capture...');
             audioChunksSent = 0;
 
+            // The server resamples from the microphone's own rate; slow links
+            // downsample here to keep the uplink small
             audioHandler = new AudioCapture((pcmData) => {
                 audioChunksSent++;
                 if (audioChunksSent % 10 === 0) {
                     console.log(`[MIC] Sent ${audioChunksSent} audio chunks`);
                 }
                 wsClient.sendAudio(pcmData);
-            });
+            }, { nativeRate: !isSlowConnection() });
             await audioHandler.start();
 
+            // Sent before the first chunk: audio callbacks only run after this
+            wsClient.send({
+                type: 'audio_format',
+                sample_rate: audioHandler.sampleRate
+            });
+
             console.log('[MIC] Microphone started!');
             micBtn.innerHTML = '<span class="mic-icon">🔴</span> Stop Speaking';
             setStatus('Listening...', true);
@@ -106,13 +114,26 @@ wsClient.on('final_transcript', (message) => {
 });
 
 wsClient.on('audio', (message) => {
-    console.log(`[TTS] Received audio chunk (${message.data.length} samples)`);
+    console.log(`[TTS] Received audio chunk (${message.data.length} bytes)`);
     // Play received audio
     if (!audioPlayer) {
-        audioPlayer = new AudioPlayer();
+        audioPlayer = new AudioPlayer(wsClient.playbackRate);
+    }
+    // Binary frames already arrive as a Uint8Array; legacy JSON frames carry a byte array
+    const audioData = message.data instanceof Uint8Array ? message.data : new Uint8Array(message.data);
+    const codec = AUDIO_CODECS[message.codec || 'pcm16'];
+    if (!codec) {
+        console.warn(`[TTS] Unsupported audio codec: ${message.codec}`);
+        return;
+    }
+    audioPlayer.playPCM(codec.decode(audioData));
+});
+
+wsClient.on('interrupt', () => {
+    console.log('[TTS] Response interrupted, flushing playback');
+    if (audioPlayer) {
+        audioPlayer.flush();
     }
-    const audioData = new Uint8Array(message.data);
-    audioPlayer.playPCM(audioData);
 });
 
 wsClient.on('error', (message) => {
@@ -1,6 +1,11 @@
 class AudioCapture {
-    constructor(onAudioData) {
+    // nativeRate: send audio at the browser's capture rate for the server to
+    // resample (with a proper anti-aliasing filter); otherwise it is
+    // downsampled to 16 kHz here
+    constructor(onAudioData, { nativeRate = false } = {}) {
         this.onAudioData = onAudioData;
+        this.nativeRate = nativeRate;
+        this.sampleRate = 16000;
         this.stream = null;
         this.audioContext = null;
         this.processor = null;
@@ -21,6 +26,9 @@ class AudioCapture {
 
             // Create audio context with default sample rate (browser decides)
             this.audioContext = new (window.AudioContext || window.webkitAudioContext)();
+            if (this.nativeRate) {
+                this.sampleRate = this.audioContext.sampleRate;
+            }
 
             const source = this.audioContext.createMediaStreamSource(this.stream);
 
@@ -31,9 +39,8 @@ class AudioCapture {
                 if (this.isRecording) {
                     const inputData = e.inputBuffer.getChannelData(0);
 
-                    // Resample to 16kHz if needed for Azure Speech
-                    const targetSampleRate = 16000;
-                    const resampledData = this.resample(inputData, this.audioContext.sampleRate, targetSampleRate);
+                    // Resample to the rate announced to the server if needed
+                    const resampledData = this.resample(inputData, this.audioContext.sampleRate, this.sampleRate);
 
                     const pcmData = this.float32ToPCM16(resampledData);
                     this.onAudioData(pcmData);
@@ -0,0 +1,205 @@
+// Audio codecs for the client link (mirrors backend/utils/audio.py). All of them
+// carry mono at the connection's rate for that direction; the flag is the codec ID
+// in the binary frame header.
+// encode() takes an Int16Array of PCM, decode() returns 16-bit little-endian PCM
+// bytes (a Uint8Array, as AudioPlayer.playPCM expects).
+
+function isSlowConnection() {
+    const connection = navigator.connection;
+    return Boolean(connection && (connection.saveData || ['slow-2g', '2g', '3g'].includes(connection.effectiveType)));
+}
+
+// Offered during auth in preference order; the server picks the first it allows.
+// ADPCM halves μ-law's bitrate but costs more CPU, so it leads only on slow links.
+function offeredCodecs() {
+    return isSlowConnection() ? ['ima-adpcm', 'mulaw', 'alaw', 'pcm16'] : ['mulaw', 'ima-adpcm', 'alaw', 'pcm16'];
+}
+
+const MULAW_SEGMENT_ENDS = [0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF];
+const ALAW_SEGMENT_ENDS = [0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF];
+
+const IMA_STEPS = [
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+    32767
+];
+const IMA_INDEX_ADJUST = [-1, -1, -1, -1, 2, 4, 6, 8];
+const IMA_BLOCK_SIZE = 68; // 4-byte header + 64 bytes of 4-bit codes
+const IMA_BLOCK_SAMPLES = (IMA_BLOCK_SIZE - 4) * 2 + 1;
+
+function segmentOf(value, ends) {
+    let segment = 0;
+    while (segment < ends.length && value > ends[segment]) {
+        segment++;
+    }
+    return segment;
+}
+
+function mulawEncodeSample(sample) {
+    let x = sample >> 2;
+    let mask = 0xFF;
+    if (x < 0) {
+        x = -x;
+        mask = 0x7F;
+    }
+    x = Math.min(x, 8159) + 0x21;
+    const segment = segmentOf(x, MULAW_SEGMENT_ENDS);
+    if (segment >= 8) {
+        return 0x7F ^ mask;
+    }
+    return ((segment << 4) | ((x >> (segment + 1)) & 0x0F)) ^ mask;
+}
+
+function mulawDecodeSample(code) {
+    const u = ~code & 0xFF;
+    const magnitude = ((((u & 0x0F) << 3) + 0x84) << ((u >> 4) & 0x07)) - 0x84;
+    return u & 0x80 ? -magnitude : magnitude;
+}
+
+function alawEncodeSample(sample) {
+    let x = sample >> 3;
+    let mask = 0xD5;
+    if (x < 0) {
+        x = -x - 1;
+        mask = 0x55;
+    }
+    const segment = segmentOf(x, ALAW_SEGMENT_ENDS);
+    if (segment >= 8) {
+        return 0x7F ^ mask;
+    }
+    return ((segment << 4) | ((x >> Math.max(segment, 1)) & 0x0F)) ^ mask;
+}
+
+function alawDecodeSample(code) {
+    const a = code ^ 0x55;
+    const segment = (a & 0x70) >> 4;
+    let t = (a & 0x0F) << 4;
+    t = segment === 0 ? t + 8 : (t + 0x108) << (segment - 1);
+    return a & 0x80 ? t : -t;
+}
+
+function tableCodec(flag, encodeSample, decodeSample) {
+    const decodeTable = new Int16Array(256);
+    for (let code = 0; code < 256; code++) {
+        decodeTable[code] = decodeSample(code);
+    }
+    return {
+        flag: flag,
+        encode(pcm) {
+            const out = new Uint8Array(pcm.length);
+            for (let i = 0; i < pcm.length; i++) {
+                out[i] = encodeSample(pcm[i]);
+            }
+            return out;
+        },
+        decode(bytes) {
+            const pcm = new Int16Array(bytes.length);
+            for (let i = 0; i < bytes.length; i++) {
+                pcm[i] = decodeTable[bytes[i]];
+            }
+            return new Uint8Array(pcm.buffer);
+        }
+    };
+}
+
+// IMA-ADPCM in independent blocks: int16 first sample, step index, flags, then codes (low nibble
+// first); flags is 1 in a short last block whose final code is padding
+const imaAdpcm = {
+    flag: 3,
+    encode(pcm) {
+        const blocks = Math.ceil(pcm.length / IMA_BLOCK_SAMPLES);
+        const out = new Uint8Array(blocks * IMA_BLOCK_SIZE);
+        let size = 0;
+        for (let block = 0; block < blocks; block++) {
+            const start = block * IMA_BLOCK_SAMPLES;
+            const end = Math.min(start + IMA_BLOCK_SAMPLES, pcm.length);
+            const base = block * IMA_BLOCK_SIZE;
+            let predictor = pcm[start];
+            out[base] = predictor & 0xFF;
+            out[base + 1] = (predictor >> 8) & 0xFF;
+
+            // Start at a step size matching the block's opening slope (mean of 8 differences)
+            let slope = 0;
+            for (let i = start + 1; i < start + 9; i++) {
+                slope += Math.abs((i < end ? pcm[i] : 0) - (i - 1 < end ? pcm[i - 1] : 0));
+            }
+            let index = 0;
+            while (index < 88 && IMA_STEPS[index] < slope / 8) {
+                index++;
+            }
+            out[base + 2] = index;
+
+            for (let i = start + 1; i < end; i++) {
+                const step = IMA_STEPS[index];
+                let diff = pcm[i] - predictor;
+                let code = diff < 0 ? 8 : 0;
+                diff = Math.abs(diff);
+                let delta = step >> 3;
+                if (diff >= step) { code |= 4; diff -= step; delta += step; }
+                if (diff >= step >> 1) { code |= 2; diff -= step >> 1; delta += step >> 1; }
+                if (diff >= step >> 2) { code |= 1; delta += step >> 2; }
+
+                predictor = Math.max(-32768, Math.min(32767, code & 8 ? predictor - delta : predictor + delta));
+                index = Math.max(0, Math.min(88, index + IMA_INDEX_ADJUST[code & 7]));
+                const nibble = i - start - 1;
+                out[base + 4 + (nibble >> 1)] |= nibble & 1 ? code << 4 : code;
+            }
+            size = base + 4 + ((end - start) >> 1);
+            if ((end - start) % 2 === 0) {
+                out[base + 3] = 1;
+            }
+        }
+        return out.subarray(0, size);
+    },
+    decode(bytes) {
+        const blocks = Math.ceil(bytes.length / IMA_BLOCK_SIZE);
+        const pcm = new Int16Array(blocks * IMA_BLOCK_SAMPLES);
+        let count = 0;
+        for (let block = 0; block < blocks; block++) {
+            const base = block * IMA_BLOCK_SIZE;
+            const end = Math.min(base + IMA_BLOCK_SIZE, bytes.length);
+            if (end - base < 4) {
+                break;
+            }
+            let predictor = (bytes[base] | (bytes[base + 1] << 8)) << 16 >> 16;
+            let index = Math.min(bytes[base + 2], 88);
+            pcm[count++] = predictor;
+
+            for (let offset = base + 4; offset < end; offset++) {
+                for (const code of [bytes[offset] & 0x0F, bytes[offset] >> 4]) {
+                    const step = IMA_STEPS[index];
+                    let delta = step >> 3;
+                    if (code & 4) delta += step;
+                    if (code & 2) delta += step >> 1;
+                    if (code & 1) delta += step >> 2;
+                    predictor = Math.max(-32768, Math.min(32767, code & 8 ? predictor - delta : predictor + delta));
+                    index = Math.max(0, Math.min(88, index + IMA_INDEX_ADJUST[code & 7]));
+                    pcm[count++] = predictor;
+                }
+            }
+            if (bytes[base + 3] & 1) {
+                count--;
+            }
+        }
+        return new Uint8Array(pcm.buffer, 0, count * 2);
+    }
+};
+
+const AUDIO_CODECS = {
+    'pcm16': {
+        flag: 0,
+        encode: (pcm) => new Uint8Array(pcm.buffer, pcm.byteOffset, pcm.byteLength),
+        decode: (bytes) => bytes
+    },
+    'mulaw': tableCodec(1, mulawEncodeSample, mulawDecodeSample),
+    'alaw': tableCodec(2, alawEncodeSample, alawDecodeSample),
+    'ima-adpcm': imaAdpcm
+};
+
+function codecForFlag(flag) {
+    return Object.keys(AUDIO_CODECS).find((name) => AUDIO_CODECS[name].flag === flag);
+}
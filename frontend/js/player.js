@@ -1,9 +1,10 @@
 class AudioPlayer {
-    constructor() {
+    constructor(sourceSampleRate = 16000) {
         this.audioContext = new (window.AudioContext || window.webkitAudioContext)();
         this.queuedAudio = [];
         this.isPlaying = false;
-        this.sourceSampleRate = 16000; // Azure TTS output rate
+        this.currentSource = null;
+        this.sourceSampleRate = sourceSampleRate; // Playback rate negotiated with the server
 
         console.log(`[PLAYER] Initialized. Browser sample rate: ${this.audioContext.sampleRate}Hz, Source: ${this.sourceSampleRate}Hz`);
     }
@@ -22,27 +23,17 @@ class AudioPlayer {
             floatData[i] = int16 / 32768.0;
         }
 
-        // Resample if browser sample rate is different from source
-        let finalData = floatData;
-        let finalSampleRate = this.sourceSampleRate;
-
-        if (this.audioContext.sampleRate !== this.sourceSampleRate) {
-            // Resample to browser's sample rate
-            finalData = this.resample(floatData, this.sourceSampleRate, this.audioContext.sampleRate);
-            finalSampleRate = this.audioContext.sampleRate;
-            console.log(`[PLAYER] Resampled from ${this.sourceSampleRate}Hz to ${this.audioContext.sampleRate}Hz`);
-        }
-
-        // Create audio buffer at browser's sample rate
+        // Buffer at the source rate: Web Audio converts to the output device's
+        // rate natively, with better filtering than a JS interpolation
         const audioBuffer = this.audioContext.createBuffer(
             1, // mono
-            finalData.length,
-            finalSampleRate
+            floatData.length,
+            this.sourceSampleRate
         );
 
-        audioBuffer.getChannelData(0).set(finalData);
+        audioBuffer.getChannelData(0).set(floatData);
 
-        console.log(`[PLAYER] Playing ${finalData.length} samples at ${finalSampleRate}Hz`);
+        console.log(`[PLAYER] Playing ${floatData.length} samples at ${this.sourceSampleRate}Hz`);
 
         // Queue or play immediately
         if (this.isPlaying) {
@@ -52,31 +43,26 @@ class AudioPlayer {
         }
     }
 
-    resample(audioData, fromSampleRate, toSampleRate) {
-        const ratio = fromSampleRate / toSampleRate;
-        const newLength = Math.round(audioData.length / ratio);
-        const result = new Float32Array(newLength);
-
-        for (let i = 0; i < newLength; i++) {
-            const srcIndex = i * ratio;
-            const srcIndexFloor = Math.floor(srcIndex);
-            const srcIndexCeil = Math.min(srcIndexFloor + 1, audioData.length - 1);
-            const t = srcIndex - srcIndexFloor;
-
-            // Linear interpolation
-            result[i] = audioData[srcIndexFloor] * (1 - t) + audioData[srcIndexCeil] * t;
+    flush() {
+        // Drop queued audio and stop what's playing (the user barged in)
+        this.queuedAudio = [];
+        if (this.currentSource) {
+            this.currentSource.onended = null;
+            this.currentSource.stop();
+            this.currentSource = null;
         }
-
-        return result;
+        this.isPlaying = false;
     }
 
     playBuffer(buffer) {
         const source = this.audioContext.createBufferSource();
         source.buffer = buffer;
         source.connect(this.audioContext.destination);
+        this.currentSource = source;
 
         source.onended = () => {
             this.isPlaying = false;
+            this.currentSource = null;
 
             // Play next in queue
             if (this.queuedAudio.length > 0) {
@@ -1,9 +1,22 @@
+// Binary audio frame: version(u8) kind(u8) flags(u16) sequence(u32), little-endian, then audio
+// in the negotiated codec (flags carry its ID, see codecs.js)
+const PROTOCOL_BINARY_V1 = 'pcm-binary/1';
+const FRAME_VERSION = 1;
+const FRAME_AUDIO = 1;
+const FRAME_HEADER_SIZE = 8;
+
 class WebSocketClient {
     constructor(url) {
         this.url = url;
         this.socket = null;
         this.messageHandlers = {};
         this.isConnected = false;
+        this.protocol = 'json';
+        this.codec = 'pcm16';
+        this.playbackRate = 16000;
+        this.framesSent = 0;
+        // Sent back on reconnect so the server can resume the session if it still has it
+        this.sessionId = null;
     }
 
     async connect(token) {
@@ -15,16 +28,35 @@ class WebSocketClient {
                 this.isConnected = true;
 
                 // Send authentication
-                this.send({
+                const auth = {
                     type: 'auth',
-                    token: token
-                });
+                    token: token,
+                    protocols: [PROTOCOL_BINARY_V1, 'json'],
+                    codecs: offeredCodecs()
+                };
+                if (this.sessionId) {
+                    auth.resume = this.sessionId;
+                }
+                this.send(auth);
 
                 resolve();
             };
 
             this.socket.onmessage = (event) => {
-                const message = JSON.parse(event.data);
+                const message = event.data instanceof ArrayBuffer
+                    ? this.decodeFrame(event.data)
+                    : JSON.parse(event.data);
+                if (!message) {
+                    return;
+                }
+
+                if (message.type === 'ready' && message.protocol) {
+                    this.protocol = message.protocol;
+                    this.codec = message.codec || 'pcm16';
+                    this.playbackRate = message.playback_rate || 16000;
+                    this.sessionId = message.session_id || null;
+                }
+
                 const handler = this.messageHandlers[message.type];
 
                 if (handler) {
@@ -51,12 +83,49 @@ class WebSocketClient {
     }
 
     sendAudio(pcmData) {
+        if (this.protocol === PROTOCOL_BINARY_V1) {
+            if (this.isConnected && this.socket.readyState === WebSocket.OPEN) {
+                this.socket.send(this.encodeFrame(pcmData));
+            }
+            return;
+        }
+
         this.send({
             type: 'audio',
             data: Array.from(pcmData)
         });
     }
 
+    encodeFrame(pcmData) {
+        // pcmData is an Int16Array; Int16Array is little-endian on all browser platforms
+        const codec = AUDIO_CODECS[this.codec];
+        const payload = codec.encode(pcmData);
+        const frame = new Uint8Array(FRAME_HEADER_SIZE + payload.byteLength);
+        const header = new DataView(frame.buffer);
+        header.setUint8(0, FRAME_VERSION);
+        header.setUint8(1, FRAME_AUDIO);
+        header.setUint16(2, codec.flag, true);
+        header.setUint32(4, this.framesSent++ >>> 0, true);
+        frame.set(payload, FRAME_HEADER_SIZE);
+        return frame.buffer;
+    }
+
+    decodeFrame(buffer) {
+        if (buffer.byteLength < FRAME_HEADER_SIZE) {
+            return null;
+        }
+        const header = new DataView(buffer, 0, FRAME_HEADER_SIZE);
+        if (header.getUint8(0) !== FRAME_VERSION || header.getUint8(1) !== FRAME_AUDIO) {
+            return null;
+        }
+        return {
+            type: 'audio',
+            codec: codecForFlag(header.getUint16(2, true) & 0xFF),
+            sequence: header.getUint32(4, true),
+            data: new Uint8Array(buffer, FRAME_HEADER_SIZE)
+        };
+    }
+
     on(messageType, handler) {
         this.messageHandlers[messageType] = handler;
     }